@@ -0,0 +1,441 @@
+import argparse
+import collections
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import sys
+import time
+
+import eye_jud_converter as conversor
+
+# ***************************************************************************
+# *** Geração de bases sintéticas no formato dos arquivos JSON do DataJud ***
+# ***************************************************************************
+
+# Tabelas copiadas da pasta raiz real para a base sintética: os códigos dos processos gerados são sorteados a partir delas
+ARQUIVOS_TABELAS = ['sgt_assuntos.csv', 'sgt_classes.csv', 'sgt_movimentos.csv', 'ibge.csv']
+# Descrição da base gerada, gravada na pasta da base sintética: permite reaproveitar a base quando os parâmetros não mudam
+ARQUIVO_DESCRICAO_BASE = 'base_sintetica.json'
+# Valores de dataHora rejeitados pela validação das datas do conversor: o processo inteiro é descartado (ver formata_datas_movimentos)
+DATAS_INVALIDAS = ['00000000000000', '20201345250000', '2020', '99999999999999']
+GRAUS = ['G1', 'G2', 'JE']
+
+# Parâmetros da base sintética e da conversão medida:
+#  - processos: quantidade de processos gerados, distribuídos igualmente em 'arquivos' arquivos JSON
+#  - movimentos: média de movimentos por processo (sorteada uniformemente entre 1 e 2 * movimentos - 1)
+#  - proporcao_locais: proporção dos movimentos (e dos assuntos) com código local em vez do código nacional
+#  - proporcao_datas_invalidas: proporção dos movimentos com dataHora inválida (o conversor descarta os processos que os contêm)
+#  - semente: semente do gerador de números aleatórios, para que a mesma base seja gerada em todas as execuções
+#  - workers e formato: parâmetros da conversão (ver Converter)
+Cenario = collections.namedtuple('Cenario', ['processos', 'movimentos', 'proporcao_locais', 'proporcao_datas_invalidas', 'arquivos',
+                                             'semente', 'workers', 'formato'])
+CAMPOS_BASE = ['processos', 'movimentos', 'proporcao_locais', 'proporcao_datas_invalidas', 'arquivos', 'semente']
+
+
+def nome_cenario(cenario):
+    # Identificação do cenário nas baselines
+    return '{}p_{}m_{}l_{}i_{}a_{}s_{}w_{}'.format(*cenario)
+
+
+def le_codigos(arquivo, *colunas):
+    # Registros (tuplas com as colunas informadas) de uma tabela auxiliar cujo código (primeira coluna) é numérico
+    with open(arquivo, newline='', encoding='utf-8-sig') as f:
+        return [tuple(linha[coluna] for coluna in colunas) for linha in csv.DictReader(f, delimiter=';') if linha[colunas[0]].strip().isdigit()]
+
+
+def data_hora(instante):
+    return time.strftime('%Y%m%d%H%M%S', time.gmtime(instante))
+
+
+class GeradorProcessos:
+    # Gera processos sintéticos com a estrutura dos arquivos JSON do DataJud (dadosBasicos, movimento, grau e siglaTribunal),
+    # sorteando assuntos, classes, movimentos e municípios entre os códigos reais das tabelas do SGT e do IBGE
+
+    def __init__(self, pasta_tabelas, cenario):
+        self.cenario = cenario
+        self.rng = random.Random(cenario.semente)
+        self.assuntos = [int(codigo) for codigo, in le_codigos(os.path.join(pasta_tabelas, 'sgt_assuntos.csv'), 'codigo')]
+        self.classes = [int(codigo) for codigo, in le_codigos(os.path.join(pasta_tabelas, 'sgt_classes.csv'), 'codigo')]
+        self.movimentos = [int(codigo) for codigo, in le_codigos(os.path.join(pasta_tabelas, 'sgt_movimentos.csv'), 'codigo')]
+        municipios = [(int(codigo), uf) for codigo, uf in le_codigos(os.path.join(pasta_tabelas, 'ibge.csv'), 'codigo', 'sig_uf')]
+        self.orgaos = []
+        for n in range(max(10, cenario.processos // 500)):
+            municipio, uf = self.rng.choice(municipios)
+            self.orgaos.append(({'nomeOrgao': 'Órgão Julgador Sintético {}'.format(n), 'codigoMunicipioIBGE': municipio,
+                                 'codigoOrgao': 100000 + n, 'instancia': 'ORIG'}, uf))
+        self.identificador = 0
+        # Linhas do event log que o conversor gera para os processos gerados até o momento
+        self.eventos = 0
+
+    def codigo_local(self, codigos):
+        # Código local (fora das tabelas nacionais) com o código nacional do pai
+        return 900000 + self.rng.randrange(1000), self.rng.choice(codigos)
+
+    def processo(self, numero):
+        rng = self.rng
+        orgao, uf = rng.choice(self.orgaos)
+        ajuizamento = rng.randrange(1262304000, 1609459200)
+        assuntos = []
+        for n in range(rng.randint(1, 3)):
+            if rng.random() < self.cenario.proporcao_locais:
+                codigo, pai = self.codigo_local(self.assuntos)
+                assuntos.append({'principal': n == 0, 'assuntoLocal': {'codigoAssunto': codigo, 'codigoPaiNacional': pai}})
+            else:
+                assuntos.append({'principal': n == 0, 'codigoNacional': rng.choice(self.assuntos)})
+        movimentos = []
+        instante = ajuizamento
+        datas_validas = True
+        for n in range(rng.randint(1, 2 * self.cenario.movimentos - 1)):
+            instante += rng.randrange(3600, 30 * 86400)
+            self.identificador += 1
+            movimento = {'identificadorMovimento': self.identificador, 'tipoResponsavelMovimento': rng.randint(0, 1),
+                         'nivelSigilo': 0, 'orgaoJulgador': orgao}
+            if rng.random() < self.cenario.proporcao_locais:
+                codigo, pai = self.codigo_local(self.movimentos)
+                movimento['movimentoLocal'] = {'codigoMovimento': codigo, 'codigoPaiNacional': pai}
+            else:
+                movimento['movimentoNacional'] = {'codigoNacional': rng.choice(self.movimentos)}
+            if rng.random() < self.cenario.proporcao_datas_invalidas:
+                movimento['dataHora'] = rng.choice(DATAS_INVALIDAS)
+                datas_validas = False
+            else:
+                movimento['dataHora'] = data_hora(instante)
+            movimentos.append(movimento)
+        movimentos.reverse()
+        if datas_validas:
+            self.eventos += len(movimentos)
+        return {'millisInsercao': ajuizamento * 1000,
+                'dadosBasicos': {'assunto': assuntos,
+                                 'numero': '{:07d}{:013d}'.format(numero, rng.randrange(10 ** 13)),
+                                 'procEl': rng.randint(1, 2),
+                                 'dataAjuizamento': data_hora(ajuizamento),
+                                 'totalAssuntos': len(assuntos),
+                                 'classeProcessual': rng.choice(self.classes),
+                                 'nivelSigilo': 0,
+                                 'valorCausa': round(rng.uniform(0, 100000), 2),
+                                 'orgaoJulgador': orgao,
+                                 'codigoLocalidade': str(orgao['codigoMunicipioIBGE'])},
+                'grau': rng.choice(GRAUS),
+                'siglaTribunal': 'TJ' + uf,
+                'movimento': movimentos}
+
+
+def gera_base_sintetica(pasta_tabelas, pasta_base, tipo_justica, cenario, regerar=False):
+    # Gera a base sintética em {pasta_base}/{tipo_justica}/processos-sintetico/processos-sintetico_{n}.json, com as tabelas de
+    # ARQUIVOS_TABELAS copiadas de 'pasta_tabelas' e uma tabela de serventias com os órgãos julgadores gerados.
+    # Os arquivos JSON são gravados um processo de cada vez, de modo que a memória não depende do tamanho da base.
+    # A base existente é reaproveitada quando foi gerada com os mesmos parâmetros (exceto com 'regerar' verdadeiro).
+    # Retorna a descrição da base: parâmetros, quantidade de linhas do event log gerado pelo conversor e tamanho em bytes.
+    parametros = dict(zip(CAMPOS_BASE, [getattr(cenario, campo) for campo in CAMPOS_BASE]), tipo_justica=tipo_justica)
+    arquivo_descricao = os.path.join(pasta_base, ARQUIVO_DESCRICAO_BASE)
+    if not regerar:
+        try:
+            with open(arquivo_descricao, 'r', encoding='utf8') as f:
+                descricao = json.load(f)
+            if descricao['parametros'] == parametros:
+                print('Base sintética {} reaproveitada'.format(pasta_base))
+                return descricao
+        except (OSError, ValueError, KeyError):
+            pass
+
+    shutil.rmtree(os.path.join(pasta_base, tipo_justica), ignore_errors=True)
+    shutil.rmtree(os.path.join(pasta_base, 'tmp'), ignore_errors=True)
+    pasta_json = os.path.join(pasta_base, tipo_justica, 'processos-sintetico')
+    os.makedirs(pasta_json)
+    for arquivo in ARQUIVOS_TABELAS:
+        shutil.copyfile(os.path.join(pasta_tabelas, arquivo), os.path.join(pasta_base, arquivo))
+    gerador = GeradorProcessos(pasta_tabelas, cenario)
+    with open(os.path.join(pasta_base, 'mpm_serventias.csv'), 'w', newline='', encoding='utf8') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(['SEQ_ORGAO', 'NOME', 'DSC_TIP_ORGAO'])
+        for orgao, uf in gerador.orgaos:
+            writer.writerow([orgao['codigoOrgao'], orgao['nomeOrgao'], 'Tipo {}'.format(orgao['codigoOrgao'] % 20)])
+
+    inicio = time.perf_counter()
+    tamanho = 0
+    numero = 0
+    for n in range(cenario.arquivos):
+        arquivo = os.path.join(pasta_json, 'processos-sintetico_{}.json'.format(n + 1))
+        quantidade = cenario.processos // cenario.arquivos + (1 if n < cenario.processos % cenario.arquivos else 0)
+        with open(arquivo, 'w', encoding='utf8') as f:
+            f.write('[')
+            for i in range(quantidade):
+                numero += 1
+                f.write((',\n' if i else '') + json.dumps(gerador.processo(numero), ensure_ascii=False))
+            f.write(']')
+        tamanho += os.path.getsize(arquivo)
+    descricao = {'parametros': parametros, 'eventos': gerador.eventos, 'bytes': tamanho}
+    with open(arquivo_descricao, 'w', encoding='utf8') as f:
+        json.dump(descricao, f, indent=1)
+    print('Base sintética gerada em {:.1f}s: {} processo(s), {} evento(s) no event log, {:.1f} MB'.format(
+        time.perf_counter() - inicio, cenario.processos, gerador.eventos, tamanho / (1 << 20)))
+    return descricao
+
+
+# *****************************************************************************
+# *** Medição das etapas (hierarquização das tabelas e conversão dos JSONs) ***
+# *****************************************************************************
+
+def pico_memoria():
+    # Pico de memória residente (MB) do processo atual e dos seus processos filhos já encerrados (workers da conversão)
+    try:
+        import resource
+    except ImportError:
+        # Windows: pico do próprio processo, quando o pacote psutil estiver disponível
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset / (1 << 20)
+    pico = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss é informado em bytes no macOS e em KB nos demais sistemas
+    return pico / (1 << 20) if sys.platform == 'darwin' else pico / 1024
+
+
+def etapa_hierarquizacao(pasta_base, tipo_justica, cenario):
+    # Hierarquiza as tabelas do SGT e carrega as tabelas auxiliares, ignorando o cache (ver prepara_tabelas)
+    conversor.prepara_tabelas(pasta_base, tipo_justica, reconstruir=True)
+
+
+def etapa_conversao(pasta_base, tipo_justica, cenario):
+    # Converte a base sintética com as tabelas em cache (geradas pela etapa de hierarquização)
+    conversor.Converter(pasta_base, tipo_justica, formato=cenario.formato, workers=cenario.workers).gera_csv()
+
+
+ETAPAS = {'hierarquizacao': etapa_hierarquizacao, 'conversao': etapa_conversao}
+
+
+def executa_etapa(etapa, pasta_base, tipo_justica, cenario, silencioso, conexao):
+    # Executada em um processo novo (ver mede_etapa), para que o pico de memória seja o da própria etapa
+    if silencioso:
+        # As mensagens do conversor (inclusive as dos workers) são descartadas no nível do descritor de arquivo
+        nulo = os.open(os.devnull, os.O_WRONLY)
+        sys.stdout.flush()
+        os.dup2(nulo, 1)
+    inicio = time.perf_counter()
+    ETAPAS[etapa](pasta_base, tipo_justica, cenario)
+    conexao.send((time.perf_counter() - inicio, pico_memoria()))
+    conexao.close()
+
+
+def mede_etapa(etapa, pasta_base, tipo_justica, cenario, silencioso=True):
+    # Executa a etapa em um processo iniciado do zero (spawn) e retorna (duração em segundos, pico de memória em MB)
+    contexto = multiprocessing.get_context('spawn')
+    recepcao, envio = contexto.Pipe(duplex=False)
+    processo = contexto.Process(target=executa_etapa, args=(etapa, pasta_base, tipo_justica, cenario, silencioso, envio))
+    processo.start()
+    envio.close()
+    try:
+        resultado = recepcao.recv()
+    except EOFError:
+        resultado = None
+    processo.join()
+    if resultado is None or processo.exitcode != 0:
+        raise RuntimeError('A etapa {} terminou com erro (código {})'.format(etapa, processo.exitcode))
+    return resultado
+
+
+def executa_benchmark(pasta_base, tipo_justica, cenario, descricao, repeticoes=1, silencioso=True):
+    # Mede cada etapa 'repeticoes' vezes e mantém a execução mais rápida de cada uma.
+    # Retorna {etapa: {'segundos', 'pico_rss_mb'[, 'registros_s', 'mb_s']}}; a vazão é calculada somente para a conversão,
+    # em linhas do event log e em MB de JSON lidos por segundo.
+    resultados = {}
+    for etapa in ETAPAS:
+        medicoes = [mede_etapa(etapa, pasta_base, tipo_justica, cenario, silencioso) for n in range(repeticoes)]
+        segundos, pico = min(medicoes, key=lambda medicao: medicao[0])
+        resultados[etapa] = {'segundos': round(segundos, 3), 'pico_rss_mb': None if pico is None else round(pico, 1)}
+        if etapa == 'conversao':
+            resultados[etapa]['registros_s'] = round(descricao['eventos'] / segundos, 1)
+            resultados[etapa]['mb_s'] = round(descricao['bytes'] / (1 << 20) / segundos, 2)
+    return resultados
+
+
+# **********************************************************************
+# *** Comparação dos decodificadores de JSON na leitura dos processos ***
+# **********************************************************************
+
+def arquivos_decodificacao(pasta):
+    return sorted(os.path.join(raiz, nome) for raiz, _, nomes in os.walk(pasta) for nome in nomes
+                  if nome.startswith('processos-') and nome.endswith(conversor.EXTENSOES_JSON))
+
+
+def compara_decodificadores(pasta, repeticoes=1):
+    # Mede a leitura (le_processos) de todos os arquivos JSON da pasta com cada decodificador instalado, mantendo a
+    # execução mais rápida de cada um, e verifica se todos produzem os mesmos processos.
+    # Retorna {decodificador: {'segundos', 'processos_s', 'mb_s'}}.
+    arquivos = arquivos_decodificacao(pasta)
+    if not arquivos:
+        raise ValueError('Nenhum arquivo JSON de processos em {}'.format(pasta))
+    tamanho = sum(os.path.getsize(arquivo) for arquivo in arquivos)
+    decodificadores = [nome for nome in conversor.DECODIFICADORES_JSON if nome != 'auto']
+    try:
+        conversor.importa_orjson()
+    except ImportError:
+        print('Pacote orjson não instalado: somente o decodificador json é medido')
+        decodificadores.remove('orjson')
+    resultados = {}
+    for nome in decodificadores:
+        conversor.define_decodificador_json(nome)
+        medicoes = []
+        for n in range(repeticoes):
+            inicio = time.perf_counter()
+            processos = sum(1 for arquivo in arquivos for processo in conversor.le_processos(arquivo))
+            medicoes.append(time.perf_counter() - inicio)
+        segundos = min(medicoes)
+        resultados[nome] = {'segundos': round(segundos, 3), 'processos_s': round(processos / segundos, 1),
+                            'mb_s': round(tamanho / (1 << 20) / segundos, 2)}
+    # Verificação, fora da medição: os processos de cada arquivo devem ser iguais com todos os decodificadores
+    for arquivo in arquivos:
+        lidos = []
+        for nome in decodificadores:
+            conversor.define_decodificador_json(nome)
+            lidos.append(list(conversor.le_processos(arquivo)))
+        if any(processos != lidos[0] for processos in lidos[1:]):
+            raise RuntimeError('Os decodificadores produziram processos diferentes no arquivo {}'.format(arquivo))
+    conversor.define_decodificador_json()
+    return resultados
+
+
+# ********************************************************************
+# *** Baselines: resultados de referência para detectar regressões ***
+# ********************************************************************
+
+# Métricas comparadas com a baseline: (métrica, True se maior é melhor)
+METRICAS_BASELINE = [('segundos', False), ('registros_s', True), ('mb_s', True), ('pico_rss_mb', False)]
+
+
+def carrega_baselines(arquivo):
+    try:
+        with open(arquivo, 'r', encoding='utf8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def maquina():
+    # Identificação da máquina em que os resultados foram medidos, gravada com a baseline
+    return {'sistema': platform.system(), 'arquitetura': platform.machine(), 'cpus': os.cpu_count()}
+
+
+def salva_baseline(arquivo, cenario, resultados):
+    # As baselines são gravadas por cenário (ver nome_cenario), de modo que um arquivo guarda as referências de vários cenários
+    baselines = carrega_baselines(arquivo)
+    baselines[nome_cenario(cenario)] = {'cenario': cenario._asdict(), 'resultados': resultados,
+                                        'data': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': sys.version.split()[0], 'maquina': maquina()}
+    with open(arquivo + '.tmp', 'w', encoding='utf8') as f:
+        json.dump(baselines, f, indent=1, ensure_ascii=False)
+    os.replace(arquivo + '.tmp', arquivo)
+
+
+def compara_baseline(baseline, resultados, tolerancia):
+    # Regressões: métricas piores que a baseline além da tolerância (proporção, por exemplo 0.2 = 20%)
+    regressoes = []
+    for etapa, metricas in resultados.items():
+        for metrica, maior_melhor in METRICAS_BASELINE:
+            atual = metricas.get(metrica)
+            referencia = baseline['resultados'].get(etapa, {}).get(metrica)
+            if atual is None or not referencia:
+                continue
+            variacao = atual / referencia - 1
+            if (variacao < -tolerancia) if maior_melhor else (variacao > tolerancia):
+                regressoes.append('{} {}: {} (baseline {}, {:+.1%})'.format(etapa, metrica, atual, referencia, variacao))
+    return regressoes
+
+
+def imprime_resultados(cenario, resultados):
+    print('Cenário {}'.format(nome_cenario(cenario)))
+    for etapa, metricas in resultados.items():
+        print('  {}: {}'.format(etapa, ', '.join('{} = {}'.format(metrica, valor) for metrica, valor in metricas.items())))
+
+
+# *******************************************************************
+# *** Configura argumentos externos do script (command line args) ***
+# *******************************************************************
+
+def cria_parser():
+    parser = argparse.ArgumentParser(description='Gera uma base sintética no formato dos arquivos JSON do DataJud a partir das tabelas reais do SGT e do IBGE '
+                                                 'e mede a hierarquização das tabelas e a conversão (gera_csv): registros/s, MB/s e pico de memória.')
+    parser.add_argument('pastaRaiz', help='Pasta contendo as tabelas sgt_assuntos.csv, sgt_classes.csv, sgt_movimentos.csv e ibge.csv utilizadas na geração da base')
+    parser.add_argument('--pasta-base', help='Pasta onde a base sintética é gerada e convertida (argumento opcional, padrão {pastaRaiz}/tmp/benchmark)')
+    parser.add_argument('--tipo-justica', choices=conversor.TIPOS_JUSTICA, default='justica_estadual', help='Tipo de justiça da base sintética (argumento opcional, padrão justica_estadual)')
+    parser.add_argument('--processos', type=int, default=10000, help='Quantidade de processos gerados (argumento opcional, padrão 10000)')
+    parser.add_argument('--movimentos', type=int, default=10, help='Média de movimentos por processo (argumento opcional, padrão 10)')
+    parser.add_argument('--proporcao-locais', type=float, default=0.1, help='Proporção dos movimentos e assuntos com código local (argumento opcional, padrão 0.1)')
+    parser.add_argument('--proporcao-datas-invalidas', type=float, default=0.01, help='Proporção dos movimentos com data/hora inválida (argumento opcional, padrão 0.01)')
+    parser.add_argument('--arquivos', type=int, default=4, help='Quantidade de arquivos JSON gerados (argumento opcional, padrão 4)')
+    parser.add_argument('--semente', type=int, default=0, help='Semente do gerador de números aleatórios (argumento opcional, padrão 0)')
+    parser.add_argument('--paralelismo', type=int, default=1, help='Quantidade de processos da conversão (argumento opcional, padrão 1)')
+    parser.add_argument('--formato', choices=list(conversor.FORMATOS_SAIDA), default='csv', help='Formato dos arquivos gerados pela conversão (argumento opcional, padrão csv)')
+    parser.add_argument('--repeticoes', type=int, default=1, help='Quantidade de medições de cada etapa; a mais rápida é mantida (argumento opcional, padrão 1)')
+    parser.add_argument('--regera', action='store_true', help='Gera novamente a base sintética, mesmo que já exista com os mesmos parâmetros (argumento opcional)')
+    parser.add_argument('--somente-gera', action='store_true', help='Somente gera a base sintética, sem medir as etapas (argumento opcional)')
+    parser.add_argument('--baseline', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json'),
+                        help='Arquivo com as baselines de cada cenário (argumento opcional, padrão benchmark_baseline.json ao lado do script)')
+    parser.add_argument('--salva-baseline', action='store_true', help='Grava os resultados como a baseline do cenário em vez de compará-los (argumento opcional)')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='Piora admitida em relação à baseline antes de acusar regressão, como proporção (argumento opcional, padrão 0.2)')
+    parser.add_argument('--decodificadores', nargs='?', const='', metavar='PASTA',
+                        help='Somente compara a leitura dos arquivos JSON da pasta (padrão {pastaRaiz}/justica_militar) com cada decodificador de JSON instalado, sem gerar a base sintética (argumento opcional)')
+    parser.add_argument('--verbose', action='store_true', help='Exibe as mensagens do conversor durante as medições (argumento opcional)')
+
+    # Argumentos retornados por parse_args:
+    # args.pastaRaiz conterá a pasta com as tabelas reais
+    # args.pasta_base conterá a pasta da base sintética ou None
+    # args.tipo_justica, args.processos, args.movimentos, args.proporcao_locais, args.proporcao_datas_invalidas, args.arquivos,
+    # args.semente, args.paralelismo e args.formato conterão os parâmetros do cenário (ver Cenario)
+    # args.repeticoes conterá a quantidade de medições de cada etapa
+    # args.regera e args.somente_gera controlarão a geração da base
+    # args.baseline, args.salva_baseline e args.tolerancia controlarão a gravação e a comparação das baselines
+    # args.decodificadores conterá a pasta dos arquivos JSON lidos com cada decodificador ('' para a pasta padrão) ou None
+    # args.verbose indicará se as mensagens do conversor devem ser exibidas
+    return parser
+
+
+def main(argv=None):
+    args = cria_parser().parse_args(argv)
+
+    # Obtém caminho completo da pasta raiz quando o argumento for '.'
+    if args.pastaRaiz == '.':
+        args.pastaRaiz = os.path.dirname(os.path.abspath(__file__))
+    if args.decodificadores is not None:
+        pasta = args.decodificadores or os.path.join(args.pastaRaiz, 'justica_militar')
+        resultados = compara_decodificadores(pasta, args.repeticoes)
+        print('Leitura dos arquivos JSON de {}'.format(pasta))
+        for nome, metricas in resultados.items():
+            print('  {}: {}, {:.2f}x'.format(nome, ', '.join('{} = {}'.format(metrica, valor) for metrica, valor in metricas.items()),
+                                            resultados['json']['segundos'] / metricas['segundos']))
+        return 0
+    pasta_base = args.pasta_base or os.path.join(args.pastaRaiz, 'tmp', 'benchmark')
+    cenario = Cenario(args.processos, args.movimentos, args.proporcao_locais, args.proporcao_datas_invalidas, args.arquivos,
+                      args.semente, args.paralelismo, args.formato)
+
+    descricao = gera_base_sintetica(args.pastaRaiz, pasta_base, args.tipo_justica, cenario, args.regera)
+    if args.somente_gera:
+        return 0
+    resultados = executa_benchmark(pasta_base, args.tipo_justica, cenario, descricao, args.repeticoes, not args.verbose)
+    imprime_resultados(cenario, resultados)
+
+    if args.salva_baseline:
+        salva_baseline(args.baseline, cenario, resultados)
+        print('Baseline do cenário gravada em {}'.format(args.baseline))
+        return 0
+    baseline = carrega_baselines(args.baseline).get(nome_cenario(cenario))
+    if baseline is None:
+        print('Nenhuma baseline para o cenário em {} (utilize --salva-baseline para gravá-la)'.format(args.baseline))
+        return 0
+    if baseline.get('maquina') != maquina() or baseline.get('python') != sys.version.split()[0]:
+        print('Atenção: baseline medida em outra máquina ou versão do Python ({}, Python {}); os tempos podem não ser comparáveis'.format(
+            baseline.get('maquina'), baseline.get('python')))
+    regressoes = compara_baseline(baseline, resultados, args.tolerancia)
+    for regressao in regressoes:
+        print('Regressão: {}'.format(regressao))
+    if not regressoes:
+        print('Sem regressões em relação à baseline de {}'.format(baseline['data']))
+    return 1 if regressoes else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
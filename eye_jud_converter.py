@@ -1,588 +1,3380 @@
 import argparse
+import bz2
+import gzip
+import io
+import queue
+import threading
+import zlib
 import textwrap
 import os
 import csv
-import pandas
-import numpy
+import datetime
+import collections
+import concurrent.futures
+import contextlib
+import copy
 import glob
 import json
+import hashlib
+import heapq
+import mmap
+import pickle
+import re
 import time
+import multiprocessing
+import operator
+import shutil
+import signal
+import sqlite3
+import tempfile
+import xml.sax.saxutils
 
-# *******************************************************************
-# *** Configura argumentos externos do script (command line args) ***
-# *******************************************************************
+# Tipos de justiça aceitos (nome da pasta dos arquivos JSON dentro da pasta raiz)
+TIPOS_JUSTICA = ['justica_eleitoral', 'justica_estadual', 'justica_federal', 'justica_militar', 'justica_trabalho', 'tribunais_superiores']
+
+# ****************************************************
+# *** Colunas dos arquivos CSV gerados (event log) ***
+# ****************************************************
 
-parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter,
-                                 description='Gera arquivos CSV a partir dos arquivos JSON do Tipo de Justiça informado. Gera também as tabelas processuais unificadas de forma hierarquizada.',
-                                 epilog=textwrap.dedent('''\
-                                    Caso seja fornecida uma lista de assuntos, serão gerados arquivos CSV para cada assunto,
-                                    caso contrário, será gerado um único arquivo CSV com todos os assuntos.
-                                    É importante que a estrutura de pastas contendo os JSONs a partir da pasta raiz respeitem o formato:
-                                        {pastaRaiz}/{tipoJustica}/**/*.json
-                                        Exemplo:
-                                        ./justica_trabalho/processos-trt23/processos-tre-ac_1.json
-                                    '''))
-parser.add_argument('pastaRaiz', help='Caminho para a pasta raiz contendo a respectiva pasta do tipo de justiça e os arquivos auxiliares (sgt_assuntos.csv, sgt_classes.csv.')
-parser.add_argument('tipoJustica', choices=['justica_eleitoral', 'justica_estadual', 'justica_federal', 'justica_militar', 'justica_trabalho', 'tribunais_superiores'],
-                    help='Tipo de Justiça cujos CSVs serão gerados.')
-parser.add_argument('--assuntos', nargs='*', type=int, help='Lista de assuntos (números inteiros) para separar os CSVs (argumento opcional)')
-
-# Cria objeto args contendo os argumentos do script
-# args.pastaRaiz conterá a pasta raiz
-# args.tipoJustica conterá o tipo de justiça
-# args.assuntos conterá a lista de assuntos ou None
-args = parser.parse_args()
+# Cada movimento de um processo gera um evento: (nome do campo do Evento, nome da coluna no CSV)
+CAMPOS_EVENTO = [('ProcessoNumero', 'ProcessoNumero'),
+                 ('MovimentoSecundario', 'MovimentoSecundario'),
+                 ('MovimentoDataHora', 'MovimentoDataHora'),
+                 ('MovimentoId', '5-Movi ID'),
+                 ('ProcessoGrau', '1-Grau'),
+                 ('ProcessoSiglaTribunal', '4-Sigla Tribunal'),
+                 ('ProcessoAssuntoPrimario', '2-Assunto Primário'),
+                 ('ProcessoAssuntoSecundario', '2-Assunto Secundário'),
+                 ('ProcessoAssuntoTerciario', '2-Assunto Terciário'),
+                 ('ProcessoAssuntoLocal', '4-Assunto Local'),
+                 ('ProcessoAssuntoDescricao', '2-Assunto Descrição'),
+                 ('ProcessoVinculado', '4-Vinculado'),
+                 ('ProcessoRelacaoIncidental', '4-Relação Incidental'),
+                 ('ProcessoPrioridade', '4-Prioridade'),
+                 ('ProcessoValorCausa', '4-Valor Causa'),
+                 ('ProcessoOrgaoJulgador', 'ProcessoOrgaoJulgador'),
+                 ('ProcessoOrgaoJulgadorTipo', 'ProcessoOrgaoJulgadorTipo'),
+                 ('ProcessoOrgaoJulgadorInstancia', '4-Instância'),
+                 ('ProcessoOrgaoJulgadorMunicipio', '3-Orgão Julgador Município'),
+                 ('ProcessoOrgaoJulgadorUF', '3-Orgão Julgador UF'),
+                 ('ProcessoCompetencia', '4-Competência'),
+                 ('ProcessoOutrosNumeros', '4-Outros Números'),
+                 ('ProcessoClassePrimaria', '1-Classe Primária'),
+                 ('ProcessoClasseSecundaria', '1-Classe Secundária'),
+                 ('ProcessoMunicipio', '3-Processo Município'),
+                 ('ProcessoUF', '3-Processo UF'),
+                 ('ProcessoNivelSigilo', '4-Nível Sigilo'),
+                 ('ProcessoIntervencaoMP', '4-Intervenção MP'),
+                 ('ProcessoTamanho', '4-Tamanho'),
+                 ('ProcessoDataAjuizamento', '4-Data Ajuizamento'),
+                 ('ProcessoEl', '4-Processo EL'),
+                 ('ProcessoSistema', '4-Sistema'),
+                 ('MovimentoPrimario', '4-Movi Primário'),
+                 ('MovimentoNivelSigilo', '5-Movi Nível Sigilo'),
+                 ('MovimentoTipoResponsavel', '4-Movi Tipo Respo'),
+                 ('MovimentoLocal', '5-Movi Local'),
+                 ('MovimentoComplemento', '5-Movi Complemento'),
+                 ('MovimentoCodComplemento', '5-Movi Cód Comple'),
+                 ('MovimentoIdDocumentoVinculado', '5-Movi Doc Vinculado'),
+                 ('MovimentoOrgaoJulgador', '5-Movi Órgão Julgador'),
+                 ('MovimentoOrgaoJulgadorTipo', '5-Movi Órgão Julg Tipo'),
+                 ('MovimentoOrgaoJulgadorInstancia', '5-Movi Órgão Julg Inst'),
+                 ('MovimentoOrgaoJulgadorMunicipio', '5-Movi Órgão Julg Município'),
+                 ('MovimentoOrgaoJulgadorUF', '5-Movi Órgão Julg UF'),
+                 ('MovimentoTipoDecisao', '5-Movi Tipo Decisão')]
+
+# Registro de um evento (movimento) do event log, com os campos na ordem das colunas do CSV
+Evento = collections.namedtuple('Evento', [campo for campo, coluna in CAMPOS_EVENTO])
+CAMPOS_CSV = [coluna for campo, coluna in CAMPOS_EVENTO]
+
+# Saída normalizada: tabela de processos (uma linha por processo, identificado por CAMPOS_CHAVE_PROCESSO) e tabela de
+# movimentos (uma linha por movimento, somente com a chave do processo e as colunas do próprio movimento)
+CAMPOS_CHAVE_PROCESSO = ['ProcessoNumero', 'ProcessoGrau', 'ProcessoSiglaTribunal']
+CAMPOS_PROCESSO = [campo for campo in Evento._fields if campo.startswith('Processo')]
+CAMPOS_MOVIMENTO = CAMPOS_CHAVE_PROCESSO + [campo for campo in Evento._fields if campo.startswith('Movimento')]
+COLUNAS_PROCESSO = [CAMPOS_CSV[Evento._fields.index(campo)] for campo in CAMPOS_PROCESSO]
+COLUNAS_MOVIMENTO = [CAMPOS_CSV[Evento._fields.index(campo)] for campo in CAMPOS_MOVIMENTO]
+# Extraem de um Evento a linha da tabela de processos e a da tabela de movimentos
+linha_processo = operator.itemgetter(*[Evento._fields.index(campo) for campo in CAMPOS_PROCESSO])
+linha_movimento = operator.itemgetter(*[Evento._fields.index(campo) for campo in CAMPOS_MOVIMENTO])
+# Extrai de uma linha da tabela de processos a chave do processo
+chave_linha_processo = operator.itemgetter(*[CAMPOS_PROCESSO.index(campo) for campo in CAMPOS_CHAVE_PROCESSO])
 
 
 # **********************************************************************************
 # *** Funções que hierarquizam as tabelas processuais unificadas oriundas do SGT ***
 # **********************************************************************************
 
-def hierarquiza_assuntos():
+def constroi_hierarquia(arquivo):
+    # Lê um arquivo sgt_*.csv e monta a árvore da tabela processual uma única vez.
+    # Retorna os códigos na ordem do arquivo, o dicionário {código: descrição} e o dicionário {código: caminho},
+    # em que o caminho é a tupla de códigos desde a raiz da árvore até o próprio código.
+    # Os caminhos são memoizados: o caminho de cada código é obtido a partir do caminho já calculado do seu pai,
+    # de modo que cada nó da árvore é visitado uma única vez.
+    import pandas
+    sgt = pandas.read_csv(arquivo, sep=';', index_col=0)
+    codigos = sgt.index.tolist()
+    descricoes = dict(zip(codigos, sgt['descricao'].tolist()))
+    pais = {}
+    for codigo, cod_pai in zip(codigos, sgt['cod_pai'].tolist()):
+        # Pais inexistentes na tabela são tratados como ausentes: o código passa a ser uma raiz
+        if not pandas.isna(cod_pai) and int(cod_pai) in descricoes:
+            pais[codigo] = int(cod_pai)
+    caminhos = {}
+    for codigo in codigos:
+        pendentes = []
+        caminho = ()
+        atual = codigo
+        while atual is not None:
+            if atual in caminhos:
+                caminho = caminhos[atual]
+                break
+            if atual in pendentes:
+                # Referência circular: o código que fecha o ciclo é tratado como raiz
+                break
+            pendentes.append(atual)
+            atual = pais.get(atual)
+        for pendente in reversed(pendentes):
+            caminho = caminho + (pendente,)
+            caminhos[pendente] = caminho
+    return codigos, descricoes, caminhos
+
+
+def ancestral(caminho, nivel):
+    # Código do ancestral no nível informado (0 é a raiz); para códigos mais rasos, retorna o próprio código
+    return caminho[min(nivel, len(caminho) - 1)]
+
+
+def descricao_hierarquica(caminho, nivel, descricoes):
+    # Descrições do ancestral no nível informado até o próprio código, separadas por ' | '
+    return ' | '.join(descricoes[codigo] for codigo in caminho[min(nivel, len(caminho) - 1):])
+
+
+def hierarquiza_assuntos(pasta_raiz):
     # O requisito para que essa função funcione é a existência do arquivo sgt_assuntos.csv dentro da pasta raiz.
-    sgt_assuntos = pandas.read_csv('{}/sgt_assuntos.csv'.format(args.pastaRaiz), sep=';', index_col=0)
-    with open('{}/assuntos.csv'.format(args.pastaRaiz), 'w', newline='', encoding='utf8') as csvfile:
+    # primario: raiz da árvore; secundario: segundo nível; descricao: do terceiro nível até o próprio assunto.
+    codigos, descricoes, caminhos = constroi_hierarquia('{}/sgt_assuntos.csv'.format(pasta_raiz))
+    with open('{}/assuntos.csv'.format(pasta_raiz), 'w', newline='', encoding='utf8') as csvfile:
         writer = csv.DictWriter(csvfile, fieldnames=['codigo','cod_pri','primario','secundario','descricao'], delimiter=';',quoting=csv.QUOTE_ALL)
         writer.writeheader()
-        for codigo in list(sgt_assuntos.index.values):
-            descricao = sgt_assuntos.loc[int(codigo),'descricao']
-            cod_pai = sgt_assuntos.loc[int(codigo),'cod_pai']
-            cod_avo = None
-            cod_bisavo = None
-            if cod_pai and not numpy.isnan(cod_pai):
-                cod_avo = sgt_assuntos.loc[int(cod_pai),'cod_pai']
-            if cod_avo and not numpy.isnan(cod_avo):
-                cod_bisavo = sgt_assuntos.loc[int(cod_avo),'cod_pai']
-            while cod_bisavo and not numpy.isnan(cod_bisavo):
-                descricao = sgt_assuntos.loc[int(cod_pai),'descricao']+' | '+descricao
-                cod_pai = cod_avo
-                cod_avo = cod_bisavo
-                if cod_avo and not numpy.isnan(cod_avo):
-                    cod_bisavo = sgt_assuntos.loc[int(cod_avo), 'cod_pai']
-            if cod_avo and not numpy.isnan(cod_avo):
-                cod_pri = int(cod_avo)
-                primario = sgt_assuntos.loc[cod_pri, 'descricao']
-                secundario = sgt_assuntos.loc[int(cod_pai), 'descricao']
-            else:
-                secundario = descricao
-                if cod_pai and not numpy.isnan(cod_pai):
-                    cod_pri = int(cod_pai)
-                    primario = sgt_assuntos.loc[cod_pri, 'descricao']
-                else:
-                    cod_pri = int(codigo)
-                    primario = descricao
-            writer.writerows([{'codigo':codigo,'cod_pri':cod_pri,'primario':primario,'secundario':secundario,'descricao':descricao}])
+        for codigo in codigos:
+            caminho = caminhos[codigo]
+            writer.writerow({'codigo': codigo,
+                             'cod_pri': caminho[0],
+                             'primario': descricoes[caminho[0]],
+                             'secundario': descricoes[ancestral(caminho, 1)],
+                             'descricao': descricao_hierarquica(caminho, 2, descricoes)})
 
-def hierarquiza_classes():
+def hierarquiza_classes(pasta_raiz):
     # O requisito para que essa função funcione é a existência do arquivo sgt_classes.csv dentro da pasta raiz.
-
-    sgt_classes = pandas.read_csv('{}/sgt_classes.csv'.format(args.pastaRaiz), sep=';', index_col=0)
-    with open('{}/classes.csv'.format(args.pastaRaiz), 'w', newline='', encoding='utf8') as csvfile:
+    # primario: raiz da árvore; descricao: do segundo nível até a própria classe.
+    codigos, descricoes, caminhos = constroi_hierarquia('{}/sgt_classes.csv'.format(pasta_raiz))
+    with open('{}/classes.csv'.format(pasta_raiz), 'w', newline='', encoding='utf8') as csvfile:
         writer = csv.DictWriter(csvfile, fieldnames=['codigo','primario','descricao'], delimiter=';',quoting=csv.QUOTE_ALL)
         writer.writeheader()
-        for codigo in list(sgt_classes.index.values):
-            descricao = sgt_classes.loc[int(codigo),'descricao']
-            primario = descricao
-            cod_pai = sgt_classes.loc[int(codigo),'cod_pai']
-            while not numpy.isnan(cod_pai):
-                descricao_pai = sgt_classes.loc[int(cod_pai), 'descricao']
-                cod_pai = sgt_classes.loc[int(cod_pai),'cod_pai']
-                if not numpy.isnan(cod_pai):
-                    descricao = descricao_pai+' | '+descricao
-                else: primario = descricao_pai
-            writer.writerows([{'codigo':codigo,'primario':primario,'descricao':descricao}])
-
-def hierarquiza_movimentos(local_ou_nacional):
+        for codigo in codigos:
+            caminho = caminhos[codigo]
+            writer.writerow({'codigo': codigo,
+                             'primario': descricoes[caminho[0]],
+                             'descricao': descricao_hierarquica(caminho, 1, descricoes)})
+
+def hierarquiza_movimentos(pasta_raiz, tipo_justica, local_ou_nacional):
     # O requisito para que essa função funcione é a existência do arquivo sgt_movimentos.csv e/ou sgt_movimentos_{tipoJustica}.csv dentro da pasta raiz.
     # Isso se justifica pelo fato de que em várias modalidades de justiça os códigos de andamento que estão nos arquivos JSON são códigos locais
     # e, portanto, não estão na tabela processual unificada nacional (sgt_movimentos.csv).
     # Nesse caso, pode optar-se por obter a respectiva tabela local de uma determinada justiça (sgt_movimentos_{tipoJustica}.csv).
     # A função deverá ser chamada uma vez para cada opção 'local' ou 'nacional'
+    # cod_pri e primario: código e descrição do segundo nível da árvore; descricao: do terceiro nível até o próprio movimento.
 
     if local_ou_nacional == 'local':
-        ifile = '{}/sgt_movimentos_{}.csv'.format(args.pastaRaiz, args.tipoJustica)
-        ofile = '{}/movimentos_{}.csv'.format(args.pastaRaiz, args.tipoJustica)
+        ifile = '{}/sgt_movimentos_{}.csv'.format(pasta_raiz, tipo_justica)
+        ofile = '{}/movimentos_{}.csv'.format(pasta_raiz, tipo_justica)
     else:
-        ifile = '{}/sgt_movimentos.csv'.format(args.pastaRaiz)
-        ofile = '{}/movimentos.csv'.format(args.pastaRaiz)
+        ifile = '{}/sgt_movimentos.csv'.format(pasta_raiz)
+        ofile = '{}/movimentos.csv'.format(pasta_raiz)
     try:
-        sgt_movimentos = pandas.read_csv(ifile, sep=';', index_col=0)
-        with open(ofile, 'w', newline='', encoding='utf8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=['codigo','primario','descricao'], delimiter=';',quoting=csv.QUOTE_ALL)
-            writer.writeheader()
-            for codigo in list(sgt_movimentos.index.values):
-                descricao = sgt_movimentos.loc[int(codigo),'descricao']
-                cod_pai = sgt_movimentos.loc[int(codigo),'cod_pai']
-                cod_avo = None
-                cod_bisavo = None
-                if cod_pai and not numpy.isnan(cod_pai):
-                    cod_avo = sgt_movimentos.loc[int(cod_pai),'cod_pai']
-                if cod_avo and not numpy.isnan(cod_avo):
-                    cod_bisavo = sgt_movimentos.loc[int(cod_avo),'cod_pai']
-                while cod_bisavo and not numpy.isnan(cod_bisavo):
-                    descricao = sgt_movimentos.loc[int(cod_pai),'descricao']+' | '+descricao
-                    cod_pai = cod_avo
-                    cod_avo = cod_bisavo
-                    if cod_avo and not numpy.isnan(cod_avo):
-                        cod_bisavo = sgt_movimentos.loc[int(cod_avo),'cod_pai']
-                if cod_avo and not numpy.isnan(cod_avo):
-                    if cod_pai and not numpy.isnan(cod_pai):
-                        primario = sgt_movimentos.loc[int(cod_pai), 'descricao']
-                else:
-                    primario = descricao
-                writer.writerows([{'codigo':codigo,'primario':primario,'descricao':descricao}])
+        codigos, descricoes, caminhos = constroi_hierarquia(ifile)
     except FileNotFoundError:
         print('Arquivo de movimentos local não encontrado!')
+        return
+    with open(ofile, 'w', newline='', encoding='utf8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=['codigo','cod_pri','primario','descricao'], delimiter=';',quoting=csv.QUOTE_ALL)
+        writer.writeheader()
+        for codigo in codigos:
+            caminho = caminhos[codigo]
+            writer.writerow({'codigo': codigo,
+                             'cod_pri': ancestral(caminho, 1),
+                             'primario': descricoes[ancestral(caminho, 1)],
+                             'descricao': descricao_hierarquica(caminho, 2, descricoes)})
+
+# ********************************************************************************************
+# *** Tabelas auxiliares indexadas em memória para as consultas durante a geração dos CSVs ***
+# ********************************************************************************************
+
+class TabelaLookup:
+    # Tabela auxiliar carregada uma única vez em um dicionário {código inteiro: tupla com as colunas}.
+    # Códigos inválidos (que não podem ser convertidos em inteiro) ou inexistentes na tabela são tratados
+    # explicitamente, sem exceções, e contabilizados em 'encontrados'/'nao_encontrados' para o relatório da execução.
+
+    def __init__(self, nome, colunas, registros):
+        self.nome = nome
+        self.colunas = colunas
+        self.registros = registros
+        self.encontrados = 0
+        self.nao_encontrados = 0
+
+    def busca(self, codigo):
+        # Retorna a tupla de colunas do código informado ou None caso o código seja inválido ou não exista na tabela
+        try:
+            registro = self.registros.get(int(codigo))
+        except (TypeError, ValueError, OverflowError):
+            registro = None
+        if registro is None:
+            self.nao_encontrados += 1
+        else:
+            self.encontrados += 1
+        return registro
+
+
+def carrega_tabela(nome, arquivo, colunas, **kwargs):
+    # Lê um CSV auxiliar indexado pela primeira coluna e o converte em uma TabelaLookup com as colunas informadas.
+    # Caso um código esteja repetido no arquivo, prevalece a primeira ocorrência.
+    import pandas
+    tabela = pandas.read_csv(arquivo, sep=';', index_col=0, **kwargs)
+    registros = {}
+    for codigo, registro in zip(tabela.index.tolist(), zip(*[tabela[coluna].tolist() for coluna in colunas])):
+        registros.setdefault(codigo, registro)
+    return TabelaLookup(nome, colunas, registros)
+
+
+def carrega_tabelas(pasta_raiz, tipo_justica):
+    # Carrega todas as tabelas auxiliares utilizadas por gera_csv. Os requisitos estão descritos em gera_csv.
+    tabelas = {
+        'assuntos': carrega_tabela('assuntos', '{}/assuntos.csv'.format(pasta_raiz), ['cod_pri', 'primario', 'secundario', 'descricao']),
+        'classes': carrega_tabela('classes', '{}/classes.csv'.format(pasta_raiz), ['primario', 'descricao']),
+        'movimentos': carrega_tabela('movimentos', '{}/movimentos.csv'.format(pasta_raiz), ['cod_pri', 'primario', 'descricao']),
+        'serventias': carrega_tabela('serventias', '{}/mpm_serventias.csv'.format(pasta_raiz), ['DSC_TIP_ORGAO'], usecols=['SEQ_ORGAO', 'DSC_TIP_ORGAO']),
+        'ibge': carrega_tabela('ibge', '{}/ibge.csv'.format(pasta_raiz), ['municipio', 'sig_uf']),
+    }
+    tabelas['movimentos_local'] = carrega_movimentos_local(pasta_raiz, tipo_justica)
+    return tabelas
+
 
-def gera_csv(assunto):
-    # O requisito para que essa função funcione é a existência dos arquivos:
-    #  - assuntos hierarquizados: {pastaRaiz}/assuntos.csv
-    #  - classes hierarquizadas: {pastaRaiz}/classes.csv
-    #  - assuntos hierarquizados: {pastaRaiz}/assuntos.csv
-    #  - movimentos hierarquizados: {pastaRaiz}/movimentos.csv e/ou {pastaRaiz}/movimentos_{tipoJustica}.csv
-    #  - serventias: {pastaRaiz}/serventias.csv
-    #  - tabela de municípios do IBGE: {pastaRaiz}/ibge.csv
-
-    sgt_assuntos = pandas.read_csv('{}/assuntos.csv'.format(args.pastaRaiz), sep=';', index_col=0)
-    sgt_classes = pandas.read_csv('{}/classes.csv'.format(args.pastaRaiz), sep=';', index_col=0)
-    sgt_movimentos = pandas.read_csv('{}/movimentos.csv'.format(args.pastaRaiz), sep=';', index_col=0)
+def carrega_movimentos_local(pasta_raiz, tipo_justica):
+    # Tabela de movimentos locais do tipo de justiça (movimentos_{tipoJustica}.csv), a única que varia entre os tipos de justiça
     try:
-        sgt_movimentos_local = pandas.read_csv('{}/movimentos_{}.csv'.format(args.pastaRaiz, args.tipoJustica), sep=';', index_col=0)
+        return carrega_tabela('movimentos_local', '{}/movimentos_{}.csv'.format(pasta_raiz, tipo_justica), ['cod_pri', 'primario', 'descricao'])
     except FileNotFoundError:
-        sgt_movimentos_local = None
-    mpm_serventias = pandas.read_csv('{}/mpm_serventias.csv'.format(args.pastaRaiz), sep=';', usecols=["SEQ_ORGAO", "DSC_TIP_ORGAO"],index_col=0)
-    ibge = pandas.read_csv('{}/ibge.csv'.format(args.pastaRaiz), sep=';', index_col=0)
-    ifile = '{}/{}/**/*.json'.format(args.pastaRaiz, args.tipoJustica)
-    if assunto is None:
-        ofile = '{}/tmp/{}.csv'.format(args.pastaRaiz, args.tipoJustica)
+        # Sem tabela local, todos os códigos de movimentos locais são tratados como não encontrados
+        return TabelaLookup('movimentos_local', ['cod_pri', 'primario', 'descricao'], {})
+
+
+def imprime_contagem_tabelas(tabelas):
+    for tabela in tabelas.values():
+        print('Tabela {}: {} códigos encontrados, {} códigos não encontrados'.format(tabela.nome, tabela.encontrados, tabela.nao_encontrados))
+
+
+# Versão do formato do cache de tabelas: deve ser incrementada sempre que a hierarquização ou a estrutura das tabelas mudar
+VERSAO_CACHE_TABELAS = 3
+
+
+def hash_arquivos(arquivos):
+    # Hash SHA-256 do conteúdo dos arquivos informados (arquivos inexistentes também compõem o hash)
+    h = hashlib.sha256('versao {}'.format(VERSAO_CACHE_TABELAS).encode())
+    for arquivo in arquivos:
+        h.update(os.path.basename(arquivo).encode('utf8'))
+        try:
+            with open(arquivo, 'rb') as f:
+                for bloco in iter(lambda: f.read(1 << 20), b''):
+                    h.update(bloco)
+        except FileNotFoundError:
+            h.update(b'\0ausente')
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def arquivos_fonte_tabelas(pasta_raiz, tipo_justica):
+    # Arquivos de origem das tabelas auxiliares: qualquer alteração neles invalida o cache de tabelas e a conversão incremental
+    return ['{}/sgt_assuntos.csv'.format(pasta_raiz),
+            '{}/sgt_classes.csv'.format(pasta_raiz),
+            '{}/sgt_movimentos.csv'.format(pasta_raiz),
+            '{}/sgt_movimentos_{}.csv'.format(pasta_raiz, tipo_justica),
+            '{}/mpm_serventias.csv'.format(pasta_raiz),
+            '{}/ibge.csv'.format(pasta_raiz)]
+
+
+def prepara_tabelas(pasta_raiz, tipo_justica, reconstruir=False, metricas=None):
+    # Hierarquiza as tabelas processuais unificadas e carrega as tabelas auxiliares de gera_csv.
+    # O resultado é gravado em {pastaRaiz}/tmp/cache/tabelas_{tipoJustica}.pickle junto com o hash do conteúdo
+    # dos arquivos de origem (sgt_*.csv, mpm_serventias.csv e ibge.csv). Enquanto esses arquivos não mudarem,
+    # (e os CSVs hierarquizados existirem), as próximas execuções carregam as tabelas diretamente do cache, sem hierarquizá-las novamente.
+    # Com 'reconstruir' verdadeiro, o cache é ignorado e as tabelas são sempre geradas novamente.
+    metricas = metricas if metricas is not None else Metricas()
+    chave = hash_arquivos(arquivos_fonte_tabelas(pasta_raiz, tipo_justica))
+    arquivo_cache = '{}/tmp/cache/tabelas_{}.pickle'.format(pasta_raiz, tipo_justica)
+    derivados = ['{}/{}.csv'.format(pasta_raiz, nome) for nome in ('assuntos', 'classes', 'movimentos')]
+    if not reconstruir and all(os.path.exists(derivado) for derivado in derivados):
+        with metricas.etapa('cache_tabelas'):
+            tabelas = le_cache_tabelas(arquivo_cache, chave)
+        if tabelas is not None:
+            return tabelas
+
+    # Gera tabelas processuais unificadas de forma hierarquizada
+    with metricas.etapa('hierarquizacao'):
+        hierarquiza_assuntos(pasta_raiz)
+        hierarquiza_classes(pasta_raiz)
+        hierarquiza_movimentos(pasta_raiz, tipo_justica, 'nacional')
+        hierarquiza_movimentos(pasta_raiz, tipo_justica, 'local')
+    with metricas.etapa('carga_tabelas'):
+        tabelas = carrega_tabelas(pasta_raiz, tipo_justica)
+
+    grava_cache_tabelas(arquivo_cache, chave, tabelas)
+    return tabelas
+
+
+def le_cache_tabelas(arquivo_cache, chave):
+    # Tabelas gravadas por grava_cache_tabelas, ou None se o cache não existir ou tiver sido gerado de outros arquivos de origem
+    try:
+        with open(arquivo_cache, 'rb') as f:
+            cache = pickle.load(f)
+        if cache['chave'] == chave:
+            print('Tabelas carregadas do cache {}'.format(arquivo_cache))
+            return {nome: TabelaLookup(nome, colunas, registros) for nome, (colunas, registros) in cache['tabelas'].items()}
+    except (OSError, pickle.UnpicklingError, EOFError, KeyError, AttributeError):
+        pass
+    return None
+
+
+def grava_cache_tabelas(arquivo_cache, chave, tabelas):
+    os.makedirs(os.path.dirname(arquivo_cache), exist_ok=True)
+    with open(arquivo_cache + '.tmp', 'wb') as f:
+        # Somente as colunas e os registros são gravados (sem objetos TabelaLookup), para que o cache gerado pela linha de comando
+        # (módulo __main__) também possa ser lido quando o script é importado como biblioteca, e vice-versa
+        pickle.dump({'chave': chave, 'tabelas': {nome: (tabela.colunas, tabela.registros) for nome, tabela in tabelas.items()}},
+                    f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(arquivo_cache + '.tmp', arquivo_cache)
+
+
+def prepara_tabelas_lote(pasta_raiz, tipos_justica, reconstruir=False, metricas=None):
+    # Prepara as tabelas auxiliares de vários tipos de justiça de uma vez (ver converte_lote) e retorna {tipo_justica: tabelas}.
+    # As tabelas comuns a todos os tipos (assuntos, classes, movimentos nacionais, serventias e municípios) são preparadas
+    # (ou obtidas do cache) uma única vez, com o primeiro tipo, e os demais tipos preparam somente a sua tabela de movimentos
+    # locais, também mantida em cache ({pastaRaiz}/tmp/cache/movimentos_local_{tipoJustica}.pickle, com o hash do conteúdo de
+    # sgt_movimentos_{tipoJustica}.csv). Cada tipo recebe as suas próprias TabelaLookup, com contagens separadas, sobre os
+    # mesmos registros.
+    metricas = metricas if metricas is not None else Metricas()
+    comuns = prepara_tabelas(pasta_raiz, tipos_justica[0], reconstruir, metricas)
+    lote = {tipos_justica[0]: comuns}
+    for tipo_justica in tipos_justica[1:]:
+        chave = hash_arquivos(['{}/sgt_movimentos_{}.csv'.format(pasta_raiz, tipo_justica)])
+        arquivo_cache = '{}/tmp/cache/movimentos_local_{}.pickle'.format(pasta_raiz, tipo_justica)
+        locais = None
+        if not reconstruir:
+            with metricas.etapa('cache_tabelas'):
+                locais = le_cache_tabelas(arquivo_cache, chave)
+        if locais is None:
+            with metricas.etapa('hierarquizacao'):
+                hierarquiza_movimentos(pasta_raiz, tipo_justica, 'local')
+            with metricas.etapa('carga_tabelas'):
+                locais = {'movimentos_local': carrega_movimentos_local(pasta_raiz, tipo_justica)}
+            grava_cache_tabelas(arquivo_cache, chave, locais)
+        tabelas = {nome: TabelaLookup(nome, tabela.colunas, tabela.registros) for nome, tabela in comuns.items() if nome != 'movimentos_local'}
+        tabelas.update(locais)
+        lote[tipo_justica] = tabelas
+    return lote
+
+
+# ***********************************************************************************************************
+# *** Métricas da execução: tempos por etapa, contadores, descartes por motivo e estatísticas por arquivo ***
+# ***********************************************************************************************************
+
+# Versão do formato do relatório de métricas (JSON e Prometheus)
+VERSAO_METRICAS = 1
+# Prefixo das métricas no formato textfile do Prometheus (node_exporter --collector.textfile)
+PREFIXO_PROMETHEUS = 'eyejud'
+# Etapas cronometradas:
+#  - hierarquizacao e carga_tabelas: geração das tabelas hierarquizadas e carga das tabelas auxiliares (ou cache_tabelas)
+#  - deduplicacao: registro das ocorrências dos processos (ver Deduplicacao.registra)
+#  - leitura_json: leitura e decodificação dos processos dos arquivos JSON
+#  - consultas: validação, filtros, consultas às tabelas auxiliares e montagem dos eventos de cada processo
+#  - gravacao: gravação dos eventos nos arquivos de saída (ou nos segmentos)
+#  - anexacao_segmentos: montagem dos arquivos finais a partir dos segmentos das conversões paralela e incremental
+# Nas conversões paralelas, os tempos das etapas executadas pelos workers são somados; 'total' é o tempo decorrido.
+ETAPAS_METRICAS = ['hierarquizacao', 'carga_tabelas', 'cache_tabelas', 'deduplicacao', 'leitura_json', 'consultas', 'gravacao',
+                   'anexacao_segmentos']
+# Motivos de descarte dos processos lidos (ver eventos_processos)
+MOTIVOS_DESCARTE = ['duplicado', 'sem_numero_ou_movimentos', 'filtro_processo', 'filtro_movimentos', 'data_hora_invalida',
+                    'fora_dos_assuntos']
+
+
+class Metricas:
+    # Instrumentação de uma execução. As métricas de cada worker são enviadas ao processo principal junto com os segmentos
+    # convertidos e somadas às da execução (ver soma). Com 'perfilar' verdadeiro, o laço de conversão dos processos
+    # (ver converte_arquivo) é executado sob o cProfile e as estatísticas de todos os processos são gravadas juntas (ver grava_perfil).
+
+    def __init__(self, perfilar=False):
+        self.tempos = collections.Counter()
+        self.contadores = collections.Counter()
+        self.descartes = collections.Counter()
+        self.arquivos = []
+        self.perfilar = perfilar
+        self.perfis = []
+        self.inicio = time.time()
+
+    @contextlib.contextmanager
+    def etapa(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.tempos[nome] += time.perf_counter() - inicio
+
+    def cronometra(self, iteravel, nome):
+        # Repassa os itens de 'iteravel', acumulando em 'nome' somente o tempo gasto para obtê-los
+        iterador = iter(iteravel)
+        while True:
+            inicio = time.perf_counter()
+            try:
+                item = next(iterador)
+            except StopIteration:
+                self.tempos[nome] += time.perf_counter() - inicio
+                return
+            self.tempos[nome] += time.perf_counter() - inicio
+            yield item
+
+    @contextlib.contextmanager
+    def perfila(self):
+        if not self.perfilar:
+            yield
+            return
+        import cProfile
+        perfil = cProfile.Profile()
+        perfil.enable()
+        try:
+            yield
+        finally:
+            perfil.disable()
+            perfil.create_stats()
+            self.perfis.append(perfil.stats)
+
+    def soma(self, outras):
+        self.tempos.update(outras.tempos)
+        self.contadores.update(outras.contadores)
+        self.descartes.update(outras.descartes)
+        self.arquivos.extend(outras.arquivos)
+        self.perfis.extend(outras.perfis)
+
+    def relatorio(self, tabelas=None, **execucao):
+        # Relatório da execução: 'execucao' descreve a configuração (tipo de justiça, workers, formato...) e 'tabelas'
+        # fornece as consultas encontradas/não encontradas de cada tabela auxiliar (ver TabelaLookup)
+        duracao = time.time() - self.inicio
+        bytes_lidos = sum(arquivo['bytes'] for arquivo in self.arquivos)
+        tempos = {etapa: round(self.tempos[etapa], 6) for etapa in ETAPAS_METRICAS if etapa in self.tempos}
+        tempos.update({etapa: round(segundos, 6) for etapa, segundos in self.tempos.items() if etapa not in tempos})
+        tempos['total'] = round(duracao, 6)
+        return {'versao': VERSAO_METRICAS,
+                'inicio': datetime.datetime.fromtimestamp(self.inicio).isoformat(timespec='seconds'),
+                'execucao': execucao,
+                'etapas_segundos': tempos,
+                'contadores': dict(self.contadores),
+                'descartes': {motivo: self.descartes[motivo] for motivo in MOTIVOS_DESCARTE},
+                'tabelas': {nome: {'encontrados': tabela.encontrados, 'nao_encontrados': tabela.nao_encontrados}
+                            for nome, tabela in (tabelas or {}).items()},
+                'vazao': {'eventos_s': round(self.contadores['eventos'] / duracao, 1) if duracao else None,
+                          'mb_s': round(bytes_lidos / (1 << 20) / duracao, 3) if duracao else None},
+                'arquivos': sorted(self.arquivos, key=lambda arquivo: arquivo['arquivo'])}
+
+    def grava_relatorio(self, arquivo, tabelas=None, **execucao):
+        # Grava o relatório em JSON ou, quando o arquivo tiver a extensão .prom, no formato textfile do Prometheus
+        relatorio = self.relatorio(tabelas, **execucao)
+        with open(arquivo + '.tmp', 'w', encoding='utf8') as f:
+            if arquivo.endswith('.prom'):
+                f.write(relatorio_prometheus(relatorio))
+            else:
+                json.dump(relatorio, f, indent=1, ensure_ascii=False)
+        os.replace(arquivo + '.tmp', arquivo)
+
+    def grava_perfil(self, arquivo):
+        # Grava as estatísticas do cProfile de todos os processos em um único arquivo, para leitura com pstats ou snakeviz
+        import pstats
+        import types
+        if not self.perfis:
+            return
+        estatisticas = pstats.Stats(types.SimpleNamespace(stats=self.perfis[0], create_stats=lambda: None))
+        for perfil in self.perfis[1:]:
+            estatisticas.add(types.SimpleNamespace(stats=perfil, create_stats=lambda: None))
+        estatisticas.dump_stats(arquivo)
+
+
+def rotulo_prometheus(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def relatorio_prometheus(relatorio):
+    # Converte o relatório (ver Metricas.relatorio) para o formato textfile do Prometheus
+    linhas = []
+
+    def metrica(nome, tipo, descricao, valores):
+        nome = '{}_{}'.format(PREFIXO_PROMETHEUS, nome)
+        linhas.append('# HELP {} {}'.format(nome, descricao))
+        linhas.append('# TYPE {} {}'.format(nome, tipo))
+        for rotulos, valor in valores:
+            if valor is None:
+                continue
+            texto_rotulos = ','.join('{}="{}"'.format(chave, rotulo_prometheus(rotulo)) for chave, rotulo in rotulos.items())
+            linhas.append('{}{} {}'.format(nome, '{' + texto_rotulos + '}' if texto_rotulos else '', valor))
+
+    metrica('etapa_segundos', 'gauge', 'Tempo gasto em cada etapa da execução (somado entre os workers)',
+            [({'etapa': etapa}, segundos) for etapa, segundos in relatorio['etapas_segundos'].items()])
+    metrica('contador_total', 'counter', 'Processos, eventos e arquivos contabilizados na execução',
+            [({'contador': contador}, valor) for contador, valor in sorted(relatorio['contadores'].items())])
+    metrica('processos_descartados_total', 'counter', 'Processos lidos e descartados, por motivo',
+            [({'motivo': motivo}, valor) for motivo, valor in relatorio['descartes'].items()])
+    metrica('tabela_consultas_total', 'counter', 'Consultas às tabelas auxiliares, por tabela e resultado',
+            [({'tabela': nome, 'resultado': resultado}, contagens[resultado]) for nome, contagens in relatorio['tabelas'].items()
+             for resultado in ('encontrados', 'nao_encontrados')])
+    metrica('vazao', 'gauge', 'Vazão da execução (eventos por segundo e MB de JSON por segundo)',
+            [({'unidade': unidade}, valor) for unidade, valor in relatorio['vazao'].items()])
+    for campo, descricao in [('segundos', 'Tempo de conversão de cada arquivo JSON'), ('bytes', 'Tamanho de cada arquivo JSON'),
+                             ('processos_lidos', 'Processos lidos de cada arquivo JSON'),
+                             ('processos_convertidos', 'Processos convertidos de cada arquivo JSON'),
+                             ('eventos', 'Eventos gerados a partir de cada arquivo JSON')]:
+        metrica('arquivo_' + campo, 'gauge', descricao, [({'arquivo': arquivo['arquivo']}, arquivo[campo]) for arquivo in relatorio['arquivos']])
+    return '\n'.join(linhas) + '\n'
+
+
+# *******************************************************************
+# *** Leitura incremental dos arquivos JSON (um processo por vez) ***
+# *******************************************************************
+
+# Quantidade de caracteres lidos do arquivo JSON a cada leitura
+TAMANHO_BLOCO_JSON = 1 << 20
+ESPACOS_JSON = re.compile(r'[ \t\n\r]*')
+ESPACOS_JSON_BYTES = re.compile(rb'[ \t\n\r]*')
+# Decodificadores de JSON (ver define_decodificador_json): 'auto' utiliza o orjson quando o pacote estiver instalado e,
+# caso contrário, o módulo json da biblioteca padrão. Os dois produzem os mesmos processos, exceto pelos inteiros com mais
+# de 64 bits, que o orjson converte em float (não há campos assim nos arquivos do DataJud).
+DECODIFICADORES_JSON = ('auto', 'json', 'orjson')
+# Decodificador em uso ('orjson' ou 'json'), definido na primeira leitura quando define_decodificador_json não for chamada
+decodificador_json = None
+# Extensões dos arquivos JSON lidos, descompactados durante a leitura (ver abre_json); .zst requer o pacote zstandard
+EXTENSOES_JSON = ('.json', '.json.gz', '.json.bz2', '.json.zst')
+
+
+def importa_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError('Os arquivos compactados com zstd (.zst) requerem o pacote zstandard (pip install zstandard)')
+    return zstandard
+
+
+def importa_orjson():
+    try:
+        import orjson
+    except ImportError:
+        raise ImportError('O decodificador orjson requer o pacote orjson (pip install orjson)')
+    return orjson
+
+
+def define_decodificador_json(nome='auto'):
+    # Define o decodificador dos arquivos JSON (um de DECODIFICADORES_JSON) e retorna o decodificador efetivamente utilizado
+    global decodificador_json
+    if nome not in DECODIFICADORES_JSON:
+        raise ValueError('Decodificador de JSON desconhecido: {}'.format(nome))
+    if nome == 'auto':
+        try:
+            importa_orjson()
+            nome = 'orjson'
+        except ImportError:
+            nome = 'json'
+    elif nome == 'orjson':
+        importa_orjson()
+    decodificador_json = nome
+    return nome
+
+
+def decodificador_ativo():
+    return decodificador_json if decodificador_json is not None else define_decodificador_json()
+
+
+def decodifica_json(dados):
+    # Decodifica os bytes (UTF-8) de um valor JSON com o decodificador em uso. Os valores recusados pelo orjson, mas aceitos
+    # pela biblioteca padrão (NaN e Infinity), são decodificados pela biblioteca padrão.
+    if decodificador_ativo() == 'orjson':
+        orjson = importa_orjson()
+        try:
+            return orjson.loads(dados)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(dados.decode('utf-8'))
+
+
+def arquivo_compactado(arquivo):
+    return not arquivo.endswith('.json')
+
+
+def abre_json(arquivo):
+    # Abre o arquivo JSON em modo binário, descompactando-o à medida que é lido. Nos arquivos compactados, as posições
+    # (seek/tell) se referem ao conteúdo descompactado e o posicionamento para trás pode exigir a releitura desde o início.
+    if arquivo.endswith('.gz'):
+        return gzip.open(arquivo, 'rb')
+    if arquivo.endswith('.bz2'):
+        return bz2.open(arquivo, 'rb')
+    if arquivo.endswith('.zst'):
+        return importa_zstandard().open(arquivo, 'rb')
+    return open(arquivo, 'rb')
+
+
+def abre_json_texto(arquivo, inicio=0):
+    # Abre o arquivo JSON como texto UTF-8 (a codificação dos arquivos do DataJud, independentemente da plataforma),
+    # posicionado no byte 'inicio', que deve estar fora de qualquer caractere multibyte
+    if not arquivo_compactado(arquivo):
+        f = open(arquivo, 'r', encoding='utf-8', newline='')
     else:
-        ofile = '{}/tmp/{}.csv'.format(args.pastaRaiz, args.tipoJustica+'_'+str(assunto))
-    file = glob.glob(ifile, recursive=True)
-    with open(ofile, 'w', newline='', encoding='utf8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=['ProcessoNumero',
-                                                     'MovimentoSecundario',
-                                                     'MovimentoDataHora',
-                                                     '5-Movi ID',
-                                                     '1-Grau',
-                                                     '4-Sigla Tribunal',
-                                                     '2-Assunto Primário',
-                                                     '2-Assunto Secundário',
-                                                     '2-Assunto Terciário',
-                                                     '4-Assunto Local',
-                                                     '2-Assunto Descrição',
-                                                     '4-Vinculado',
-                                                     '4-Relação Incidental',
-                                                     '4-Prioridade',
-                                                     '4-Valor Causa',
-                                                     'ProcessoOrgaoJulgador',
-                                                     'ProcessoOrgaoJulgadorTipo',
-                                                     '4-Instância',
-                                                     '3-Orgão Julgador Município',
-                                                     '3-Orgão Julgador UF',
-                                                     '4-Competência',
-                                                     '4-Outros Números',
-                                                     '1-Classe Primária',
-                                                     '1-Classe Secundária',
-                                                     '3-Processo Município',
-                                                     '3-Processo UF',
-                                                     '4-Nível Sigilo',
-                                                     '4-Intervenção MP',
-                                                     '4-Tamanho',
-                                                     '4-Data Ajuizamento',
-                                                     '4-Processo EL',
-                                                     '4-Sistema',
-                                                     '4-Movi Primário',
-                                                     '5-Movi Nível Sigilo',
-                                                     '4-Movi Tipo Respo',
-                                                     '5-Movi Local',
-                                                     '5-Movi Complemento',
-                                                     '5-Movi Cód Comple',
-                                                     '5-Movi Doc Vinculado',
-                                                     '5-Movi Órgão Julgador',
-                                                     '5-Movi Órgão Julg Tipo',
-                                                     '5-Movi Órgão Julg Inst',
-                                                     '5-Movi Órgão Julg Município',
-                                                     '5-Movi Órgão Julg UF',
-                                                     '5-Movi Tipo Decisão'])
-        writer.writeheader()
-        for i in file:
-            print('Processando arquivo {}'.format(i))
-            data = json.loads(open(i, 'r').read())
-            for j in data:
-                ProcessoNumero = None
-                ProcessoGrau = None
-                ProcessoSiglaTribunal = None
-                ProcessoAssuntoPrimario = None
-                ProcessoAssuntoSecundario = None
-                ProcessoAssuntoTerciario = None
-                ProcessoAssuntoLocal = None
-                ProcessoAssuntoDescricao = None
-                ProcessoVinculado = None
-                ProcessoRelacaoIncidental = None
-                ProcessoPrioridade = None
-                ProcessoValorCausa = None
-                ProcessoOrgaoJulgador = None
-                ProcessoOrgaoJulgadorTipo = None
-                ProcessoOrgaoJulgadorInstancia = None
-                ProcessoOrgaoJulgadorMunicipio = None
-                ProcessoOrgaoJulgadorUF = None
-                ProcessoCompetencia = None
-                ProcessoOutrosNumeros = None
-                ProcessoClassePrimaria = None
-                ProcessoClasseSecundaria = None
-                ProcessoMunicipio = None
-                ProcessoUF = None
-                ProcessoNivelSigilo = None
-                ProcessoIntervencaoMP = None
-                ProcessoTamanho = None
-                ProcessoDataAjuizamento = None
-                ProcessoEl = None
-                ProcessoSistema = None
-                ListaAssuntos = []
-                ListaAssuntosPrimarios = []
-                ListaAssuntosLocais = []
-                ListaAssuntosDescricao = []
-                datahoraok = True
-                if 'dadosBasicos' in j and j['dadosBasicos'] is not None and 'numero' in j['dadosBasicos'] and j['dadosBasicos']['numero'] is not None and 'movimento' in j and j['movimento'] is not None:
-                    for k in j['movimento']:
+        f = io.TextIOWrapper(abre_json(arquivo), encoding='utf-8', newline='')
+    if inicio:
+        f.seek(inicio)
+    return f
+
+
+def le_processos(arquivo, posicoes=False):
+    # Percorre o array JSON do arquivo retornando um processo de cada vez, sem carregar o arquivo inteiro em memória.
+    # Com 'posicoes' verdadeiro, retorna tuplas (processo, início, fim) com as posições em bytes do processo no arquivo
+    # (ver gera_indice). Com o decodificador orjson, os arquivos não compactados lidos sem as posições são mapeados em
+    # memória e decodificados em lotes de processos (ver le_processos_mapeado); nos demais casos, o arquivo é lido como
+    # texto (ver le_processos_texto).
+    if not posicoes and not arquivo_compactado(arquivo) and decodificador_ativo() == 'orjson':
+        return le_processos_mapeado(arquivo)
+    return le_processos_texto(arquivo, posicoes)
+
+
+def saldo_json(dados, inicio, fim):
+    # Quantidade de '{' menos a quantidade de '}' dos bytes [inicio, fim) (desconsiderando as strings)
+    return dados.count(b'{', inicio, fim) - dados.count(b'}', inicio, fim)
+
+
+def fim_lote_json(janela):
+    # Posição logo após o último processo completo da janela (bytes iniciados no começo de um processo): o último '}' seguido,
+    # após os espaços, de ',' ou ']', em que todos os '{' anteriores foram fechados (como os processos são objetos, as listas
+    # estão sempre dentro de alguma chave aberta). Retorna None se não houver. Chaves dentro de strings podem indicar uma
+    # posição errada, recusada na decodificação do lote.
+    profundidade = saldo_json(janela, 0, len(janela))
+    limite = len(janela)
+    while True:
+        pos = janela.rfind(b'}', 0, limite)
+        if pos < 0:
+            return None
+        # Saldo até o '}' (inclusive)
+        profundidade -= saldo_json(janela, pos + 1, limite)
+        if profundidade == 0:
+            separador = ESPACOS_JSON_BYTES.match(janela, pos + 1).end()
+            if janela[separador:separador + 1] in (b',', b']'):
+                return pos + 1
+        profundidade += 1
+        limite = pos
+
+
+def le_processos_mapeado(arquivo):
+    # Lê os processos de um arquivo JSON não compactado mapeado em memória, entregando os bytes diretamente ao orjson.
+    # Cada janela de TAMANHO_BLOCO_JSON bytes (ampliada enquanto não contiver um processo completo) é cortada após o
+    # último processo completo (ver fim_lote_json) e decodificada de uma vez como um array; o orjson só aceita o lote
+    # quando o corte coincide com o fim de um processo. Se a decodificação falhar (corte errado, valores recusados pelo
+    # orjson ou arquivo inválido), a leitura prossegue desde o início do lote com a biblioteca padrão (le_processos_texto),
+    # que produz os mesmos processos e as mesmas mensagens de erro.
+    orjson = importa_orjson()
+    with open(arquivo, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield from le_processos_texto(arquivo)
+            return
+        dados = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    with dados:
+        pos = ESPACOS_JSON_BYTES.match(dados, 0).end()
+        if dados[pos:pos + 1] != b'[':
+            yield from le_processos_texto(arquivo)
+            return
+        pos += 1
+        esperado = 'processo ou ]'
+        tamanho_janela = TAMANHO_BLOCO_JSON
+        while True:
+            pos = ESPACOS_JSON_BYTES.match(dados, pos).end()
+            if esperado != 'processo' and dados[pos:pos + 1] == b']':
+                return
+            if esperado == ',':
+                if dados[pos:pos + 1] != b',':
+                    break
+                pos += 1
+                esperado = 'processo'
+                continue
+            janela = dados[pos:pos + tamanho_janela]
+            fim = fim_lote_json(janela)
+            if fim is None:
+                if pos + tamanho_janela >= len(dados):
+                    break
+                tamanho_janela *= 2
+                continue
+            try:
+                lote = orjson.loads(b'[' + janela[:fim] + b']')
+            except orjson.JSONDecodeError:
+                break
+            del janela
+            # Os processos são retirados do lote à medida que são entregues, liberando a memória dos já convertidos
+            lote.reverse()
+            while lote:
+                yield lote.pop()
+            pos += fim
+            esperado = ','
+            tamanho_janela = TAMANHO_BLOCO_JSON
+    yield from le_processos_texto(arquivo, posicao_inicial=pos, esperado=esperado)
+
+
+def le_processos_texto(arquivo, posicoes=False, posicao_inicial=0, esperado='['):
+    # O arquivo é lido em blocos e cada elemento do array é decodificado com JSONDecoder.raw_decode assim que estiver
+    # completo no buffer; o consumo de memória fica proporcional ao bloco de leitura e ao maior processo do arquivo.
+    # As quebras de linha não são traduzidas, para que as posições correspondam aos bytes do arquivo (nos arquivos
+    # compactados, aos bytes do conteúdo descompactado). A leitura pode começar no meio do array, no byte 'posicao_inicial',
+    # com 'esperado' indicando o próximo elemento da sintaxe ('processo', 'processo ou ]' ou ',').
+    decodificador = json.JSONDecoder()
+    with abre_json_texto(arquivo, posicao_inicial) as f:
+        # Posição em bytes do caractere 'marca' do buffer, atualizada somente quando as posições são solicitadas
+        marca = 0
+        marca_bytes = posicao_inicial
+        buffer = f.read(TAMANHO_BLOCO_JSON)
+        pos = 0
+        while True:
+            pos = ESPACOS_JSON.match(buffer, pos).end()
+            if pos == len(buffer):
+                if posicoes:
+                    marca_bytes += len(buffer[marca:].encode(f.encoding))
+                    marca = 0
+                buffer = f.read(TAMANHO_BLOCO_JSON)
+                pos = 0
+                if not buffer:
+                    raise ValueError('Arquivo JSON incompleto: {}'.format(arquivo))
+                continue
+            if esperado == '[':
+                if buffer[pos] != '[':
+                    raise ValueError('O arquivo {} não contém um array JSON de processos'.format(arquivo))
+                pos += 1
+                esperado = 'processo ou ]'
+            elif esperado != 'processo' and buffer[pos] == ']':
+                return
+            elif esperado == ',':
+                if buffer[pos] != ',':
+                    raise ValueError('Separador inválido entre os processos do arquivo {}'.format(arquivo))
+                pos += 1
+                esperado = 'processo'
+            else:
+                try:
+                    processo, fim = decodificador.raw_decode(buffer, pos)
+                    completo = fim < len(buffer) or isinstance(processo, (dict, list))
+                except json.JSONDecodeError:
+                    completo = False
+                if not completo:
+                    # O processo continua no próximo bloco: lê mais um bloco (ao menos do tamanho já acumulado,
+                    # para que processos muito grandes não sejam decodificados repetidas vezes) e tenta novamente
+                    bloco = f.read(max(TAMANHO_BLOCO_JSON, len(buffer) - pos))
+                    if not bloco:
+                        decodificador.decode(buffer[pos:])
+                        raise ValueError('Arquivo JSON incompleto: {}'.format(arquivo))
+                    if posicoes:
+                        marca_bytes += len(buffer[marca:pos].encode(f.encoding))
+                        marca = 0
+                    buffer = buffer[pos:] + bloco
+                    pos = 0
+                    continue
+                if posicoes:
+                    inicio = marca_bytes + len(buffer[marca:pos].encode(f.encoding))
+                    marca_bytes = inicio + len(buffer[pos:fim].encode(f.encoding))
+                    marca = fim
+                    yield processo, inicio, marca_bytes
+                else:
+                    yield processo
+                pos = fim
+                esperado = ','
+
+
+# *************************************************************************
+# *** Validação e formatação das datas/horas dos movimentos (dataHora) ***
+# *************************************************************************
+
+# Quantidade de dias de cada mês em anos não bissextos (índice 0 não utilizado)
+DIAS_MES = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+# Validade das datas AAAAMMDD já verificadas (as datas dos movimentos se repetem muito entre processos)
+datas_verificadas = {}
+
+
+def data_valida(data):
+    # Verifica uma data AAAAMMDD composta apenas por dígitos ASCII
+    ano = int(data[0:4])
+    mes = int(data[4:6])
+    dia = int(data[6:8])
+    if ano < 1 or mes < 1 or mes > 12 or dia < 1:
+        return False
+    if mes == 2 and ano % 4 == 0 and (ano % 100 != 0 or ano % 400 == 0):
+        return dia <= 29
+    return dia <= DIAS_MES[mes]
+
+
+def formata_data_hora_strptime(valor):
+    # Validação original por time.strptime, utilizada para os valores que não são compostos por 14 dígitos ASCII
+    try:
+        time.strptime(str(valor)[0:4]+'-'+str(valor)[4:6]+'-'+str(valor)[6:8]+'T'+str(valor)[8:10]+':'+str(valor)[10:12]+':'+str(valor)[12:14],'%Y-%m-%dT%H:%M:%S')
+        segundo = int(str(valor[12:14]))
+    except (TypeError, ValueError):
+        return None
+    if segundo > 59:
+        return None
+    return str(valor)[0:4]+'-'+str(valor)[4:6]+'-'+str(valor)[6:8]+'T'+str(valor)[8:10]+':'+str(valor)[10:12]+':'+str(valor)[12:14]
+
+
+def formata_data_hora(valor):
+    # Valida o 'dataHora' de um movimento (AAAAMMDDhhmmss) e o retorna no formato AAAA-MM-DDThh:mm:ss, ou None se for inválido.
+    # Aceita e rejeita exatamente os mesmos valores da validação por time.strptime (com a verificação adicional de segundo > 59):
+    # os 14 primeiros caracteres são considerados e o restante do texto é ignorado.
+    # O caso comum (texto com 14 dígitos ASCII) é resolvido com comparações de texto e a validade de cada data fica memorizada;
+    # os demais valores seguem pela validação original.
+    if type(valor) is str:
+        texto = valor[:14]
+        if len(texto) == 14 and texto.isdigit() and texto.isascii():
+            data = texto[0:8]
+            valida = datas_verificadas.get(data)
+            if valida is None:
+                if len(datas_verificadas) >= 100000:
+                    datas_verificadas.clear()
+                valida = datas_verificadas[data] = data_valida(data)
+            if valida and texto[8:10] < '24' and texto[10:12] < '60' and texto[12:14] < '60':
+                return f'{texto[0:4]}-{texto[4:6]}-{texto[6:8]}T{texto[8:10]}:{texto[10:12]}:{texto[12:14]}'
+            return None
+    return formata_data_hora_strptime(valor)
+
+
+def formata_datas_movimentos(movimentos):
+    # Valida e formata, em uma única passagem, o 'dataHora' de todos os movimentos de um processo.
+    # Retorna a lista das datas formatadas, na ordem dos movimentos, ou None se algum movimento tiver data/hora inválida
+    # (nesse caso o processo inteiro é descartado).
+    datas = []
+    for movimento in movimentos:
+        data_hora = formata_data_hora(movimento['dataHora'])
+        if data_hora is None:
+            return None
+        datas.append(data_hora)
+    return datas
+
+
+# ************************************************************************************************
+# *** Filtros dos processos, avaliados antes da validação das datas e das consultas às tabelas ***
+# ************************************************************************************************
+
+class FiltroProcessos:
+    # Critérios de seleção dos processos. Os critérios não informados (None ou lista vazia) não restringem a seleção;
+    # nos demais, o processo precisa atender a todos, sendo suficiente coincidir com um dos valores de cada lista:
+    #  - tribunais: siglas dos tribunais (siglaTribunal), por exemplo ['TJMSP']
+    #  - graus: graus de jurisdição (grau), por exemplo ['G1', 'G2']
+    #  - classes: códigos das classes processuais (dadosBasicos.classeProcessual)
+    #  - orgaos: códigos dos órgãos julgadores (dadosBasicos.orgaoJulgador.codigoOrgao)
+    #  - ajuizamento_inicio, ajuizamento_fim: intervalo (inclusive) da data de ajuizamento (datetime.date ou texto AAAA-MM-DD);
+    #    processos sem data de ajuizamento válida são descartados
+    #  - movimentos_inicio, movimentos_fim: intervalo (inclusive) das datas dos movimentos (datetime.date ou texto AAAA-MM-DD);
+    #    somente os movimentos do intervalo geram eventos, e processos sem movimentos no intervalo são descartados
+
+    def __init__(self, tribunais=None, graus=None, classes=None, orgaos=None, ajuizamento_inicio=None, ajuizamento_fim=None,
+                 movimentos_inicio=None, movimentos_fim=None):
+        self.tribunais = {str(tribunal).upper() for tribunal in tribunais} if tribunais else None
+        self.graus = {str(grau).upper() for grau in graus} if graus else None
+        self.classes = {int(classe) for classe in classes} if classes else None
+        self.orgaos = {int(orgao) for orgao in orgaos} if orgaos else None
+        # Datas de ajuizamento no formato do JSON (AAAAMMDD) e datas dos movimentos no formato gerado (AAAA-MM-DD)
+        self.ajuizamento_inicio = self.data(ajuizamento_inicio, '%Y%m%d')
+        self.ajuizamento_fim = self.data(ajuizamento_fim, '%Y%m%d')
+        self.movimentos_inicio = self.data(movimentos_inicio, '%Y-%m-%d')
+        self.movimentos_fim = self.data(movimentos_fim, '%Y-%m-%d')
+        self.filtra_processos = any(criterio is not None for criterio in (self.tribunais, self.graus, self.classes, self.orgaos,
+                                                                          self.ajuizamento_inicio, self.ajuizamento_fim))
+        self.filtra_movimentos = self.movimentos_inicio is not None or self.movimentos_fim is not None
+
+    @staticmethod
+    def data(valor, formato):
+        if valor is None:
+            return None
+        if not isinstance(valor, datetime.date):
+            valor = datetime.date.fromisoformat(str(valor))
+        return valor.strftime(formato)
+
+    def configuracao(self):
+        # Critérios em formato serializável (registrados no manifesto da conversão incremental)
+        return {nome: sorted(valor) if isinstance(valor, set) else valor
+                for nome, valor in vars(self).items() if nome not in ('filtra_processos', 'filtra_movimentos')}
+
+    def aceita_processo(self, j):
+        # Avalia os critérios que dependem somente dos dados do processo (não dos movimentos)
+        if self.tribunais is not None and str(j.get('siglaTribunal')).upper() not in self.tribunais:
+            return False
+        if self.graus is not None and str(j.get('grau')).upper() not in self.graus:
+            return False
+        dados = j['dadosBasicos']
+        if self.classes is not None and not self.contem(self.classes, dados.get('classeProcessual')):
+            return False
+        if self.orgaos is not None:
+            orgao = dados.get('orgaoJulgador')
+            if not isinstance(orgao, dict) or not self.contem(self.orgaos, orgao.get('codigoOrgao')):
+                return False
+        if self.ajuizamento_inicio is not None or self.ajuizamento_fim is not None:
+            data = str(dados.get('dataAjuizamento'))[0:8]
+            if len(data) < 8 or not data.isdigit():
+                return False
+            if self.ajuizamento_inicio is not None and data < self.ajuizamento_inicio:
+                return False
+            if self.ajuizamento_fim is not None and data > self.ajuizamento_fim:
+                return False
+        return True
+
+    @staticmethod
+    def contem(codigos, codigo):
+        try:
+            return int(codigo) in codigos
+        except (TypeError, ValueError, OverflowError):
+            return False
+
+    def aceita_movimento(self, data_hora):
+        # data_hora no formato gerado por formata_data_hora (AAAA-MM-DDThh:mm:ss)
+        data = data_hora[0:10]
+        return (self.movimentos_inicio is None or data >= self.movimentos_inicio) and (self.movimentos_fim is None or data <= self.movimentos_fim)
+
+
+# *******************************************************************************************************
+# *** Índices dos arquivos JSON: posições em bytes dos processos por assunto, classe, tribunal e grau ***
+# *******************************************************************************************************
+
+# Versão do formato dos índices: deve ser incrementada sempre que a estrutura dos índices mudar
+VERSAO_INDICE = 1
+# Extensão do índice, gravado ao lado do próprio arquivo JSON (processos-x.json -> processos-x.json.idx)
+EXTENSAO_INDICE = '.idx'
+
+
+def codigo_indice(codigo):
+    # Chave de um código no índice: códigos numéricos são normalizados para o texto do número inteiro
+    try:
+        return str(int(codigo))
+    except (TypeError, ValueError, OverflowError):
+        return str(codigo).upper()
+
+
+def gera_indice(arquivo):
+    # Percorre o arquivo JSON uma única vez e grava o índice {arquivo}.idx com as posições (início, fim) em bytes de cada
+    # processo e, para cada código nacional de assunto, classe processual, tribunal e grau, a lista dos processos que o contêm.
+    # Os processos sem número ou sem movimentos, que não geram eventos, não são indexados. O índice registra o tamanho e a
+    # data de modificação do arquivo JSON e deixa de ser utilizado quando o arquivo muda. Retorna a quantidade de processos indexados.
+    info = os.stat(arquivo)
+    indice = {'versao': VERSAO_INDICE, 'tamanho': info.st_size, 'mtime': info.st_mtime_ns, 'posicoes': [],
+              'assuntos': {}, 'classes': {}, 'tribunais': {}, 'graus': {}}
+    for j, inicio, fim in le_processos(arquivo, posicoes=True):
+        if not processo_valido(j):
+            continue
+        n = len(indice['posicoes'])
+        indice['posicoes'].append((inicio, fim))
+        chaves = [('assuntos', codigo_indice(assunto)) for assunto in set(assuntos_processo(j['dadosBasicos'])[0])]
+        chaves.append(('classes', codigo_indice(j['dadosBasicos'].get('classeProcessual'))))
+        chaves.append(('tribunais', codigo_indice(j.get('siglaTribunal'))))
+        chaves.append(('graus', codigo_indice(j.get('grau'))))
+        for nome, chave in set(chaves):
+            indice[nome].setdefault(chave, []).append(n)
+    with open(arquivo + EXTENSAO_INDICE + '.tmp', 'w', encoding='utf8') as f:
+        json.dump(indice, f, separators=(',', ':'))
+    os.replace(arquivo + EXTENSAO_INDICE + '.tmp', arquivo + EXTENSAO_INDICE)
+    return len(indice['posicoes'])
+
+
+def carrega_indice(arquivo):
+    # Retorna o índice do arquivo JSON ou None caso ele não exista ou esteja desatualizado
+    try:
+        with open(arquivo + EXTENSAO_INDICE, 'r', encoding='utf8') as f:
+            indice = json.load(f)
+    except (OSError, ValueError):
+        return None
+    info = os.stat(arquivo)
+    if indice.get('versao') != VERSAO_INDICE or indice.get('tamanho') != info.st_size or indice.get('mtime') != info.st_mtime_ns:
+        print('Índice {} desatualizado: o arquivo será lido por completo'.format(arquivo + EXTENSAO_INDICE))
+        return None
+    return indice
+
+
+def seleciona_posicoes(arquivo, tabelas, destinos, filtro=None):
+    # Consulta o índice do arquivo JSON e retorna as posições dos processos que podem pertencer a algum dos assuntos de 'destinos'
+    # e atender aos critérios indexados do 'filtro' (tribunais, graus e classes). A seleção pode conter processos a mais
+    # (que são descartados normalmente por eventos_processos), mas nunca deixa de fora um processo que geraria eventos.
+    # Retorna None quando não há critério indexado (por exemplo, com o arquivo de todos os assuntos) ou índice válido.
+    criterios = []
+    if None not in destinos:
+        # Um processo pertence ao assunto quando o contém ou contém algum assunto cuja raiz (cod_pri) é o próprio assunto
+        assuntos = set(destinos)
+        assuntos.update(codigo for codigo, registro in tabelas['assuntos'].registros.items() if registro[0] in assuntos)
+        criterios.append(('assuntos', assuntos))
+    if filtro is not None:
+        for nome, valores in (('tribunais', filtro.tribunais), ('graus', filtro.graus), ('classes', filtro.classes)):
+            if valores is not None:
+                criterios.append((nome, valores))
+    if not criterios:
+        return None
+    indice = carrega_indice(arquivo)
+    if indice is None:
+        return None
+    selecionados = None
+    for nome, valores in criterios:
+        processos = set()
+        for valor in valores:
+            processos.update(indice[nome].get(codigo_indice(valor), ()))
+        selecionados = processos if selecionados is None else selecionados & processos
+    return [indice['posicoes'][n] for n in sorted(selecionados)]
+
+
+def le_processos_posicoes(arquivo, posicoes):
+    # Lê somente os processos das posições (início, fim) informadas, posicionando a leitura diretamente em cada um deles.
+    # Retorna tuplas (processo, início, fim), como le_processos com 'posicoes' verdadeiro.
+    f = abre_json(arquivo)
+    try:
+        for inicio, fim in posicoes:
+            if arquivo_compactado(arquivo) and inicio < f.tell():
+                # Alguns descompactadores (zstd) só avançam: a leitura recomeça do início do arquivo
+                f.close()
+                f = abre_json(arquivo)
+            f.seek(inicio)
+            yield decodifica_json(f.read(fim - inicio)), inicio, fim
+    finally:
+        f.close()
+
+
+# ****************************************************************************
+# *** Deduplicação dos processos repetidos (mesmo número, grau e tribunal) ***
+# ****************************************************************************
+
+# Políticas de deduplicação (ordem em que as ocorrências de um mesmo processo são classificadas; a primeira é convertida).
+# A ordem dos arquivos é a dos seus caminhos (e não a da listagem da pasta, que varia entre sistemas de arquivos), de modo
+# que a ocorrência escolhida é a mesma em qualquer máquina:
+#  - primeiro: a primeira ocorrência, na ordem dos caminhos dos arquivos e, dentro de cada arquivo, na ordem do JSON
+#  - ultimo: a última ocorrência
+#  - mais_completo: a ocorrência com mais movimentos válidos (no empate, a primeira); uma ocorrência com algum movimento
+#    sem data/hora válida não tem movimentos válidos, pois seria descartada por inteiro na conversão (ver formata_datas_movimentos)
+#  - mesclar: a primeira ocorrência, acrescida dos movimentos das demais ocorrências (ver mescla_movimentos)
+POLITICAS_DEDUPLICACAO = {'primeiro': 'ordem, inicio',
+                          'ultimo': 'ordem DESC, inicio DESC',
+                          'mais_completo': 'movimentos_validos DESC, ordem, inicio',
+                          'mesclar': 'ordem, inicio'}
+
+
+def processo_valido(j):
+    # Somente os processos com número e movimentos geram eventos (ver eventos_processos)
+    return 'dadosBasicos' in j and j['dadosBasicos'] is not None and 'numero' in j['dadosBasicos'] and j['dadosBasicos']['numero'] is not None and 'movimento' in j and j['movimento'] is not None
+
+
+def chave_processo(j):
+    return '{}|{}|{}'.format(j['dadosBasicos']['numero'], j.get('grau'), j.get('siglaTribunal'))
+
+
+def movimentos_validos(j):
+    # Quantidade de movimentos que gerariam eventos: nenhum quando algum movimento não tem data/hora válida
+    return len(j['movimento']) if formata_datas_movimentos(j['movimento']) is not None else 0
+
+
+def ocorrencias_arquivo(arquivo):
+    # (chave, início, fim, quantidade de movimentos válidos) de cada processo do arquivo JSON
+    return [(chave_processo(j), inicio, fim, movimentos_validos(j)) for j, inicio, fim in le_processos(arquivo, posicoes=True) if processo_valido(j)]
+
+
+def identidade_movimento(movimento):
+    # Movimentos iguais em ocorrências diferentes de um processo: mesmo identificadorMovimento ou, na sua ausência,
+    # mesma data/hora e mesmo código de movimento (nacional ou local)
+    if movimento.get('identificadorMovimento') is not None:
+        return 'id', str(movimento['identificadorMovimento'])
+    return ('dataHora', str(movimento.get('dataHora')), json.dumps(movimento.get('movimentoNacional'), sort_keys=True),
+            json.dumps(movimento.get('movimentoLocal'), sort_keys=True))
+
+
+def mescla_movimentos(j, ocorrencias):
+    # Acrescenta ao processo os movimentos das demais ocorrências [(arquivo, início, fim)] que ainda não constam dele.
+    # Quando algum movimento é acrescentado, os movimentos são reordenados pela data/hora.
+    movimentos = list(j['movimento'])
+    identidades = {identidade_movimento(movimento) for movimento in movimentos}
+    for arquivo, inicio, fim in ocorrencias:
+        for outro, _, _ in le_processos_posicoes(arquivo, [(inicio, fim)]):
+            for movimento in outro['movimento'] or []:
+                identidade = identidade_movimento(movimento)
+                if identidade not in identidades:
+                    identidades.add(identidade)
+                    movimentos.append(movimento)
+    if len(movimentos) == len(j['movimento']):
+        return j
+    movimentos.sort(key=lambda movimento: str(movimento.get('dataHora')))
+    return dict(j, movimento=movimentos)
+
+
+class Deduplicacao:
+    # Deduplicação dos processos repetidos nos arquivos JSON, identificados pelo número, grau e tribunal.
+    # Antes da conversão, 'registra' percorre os arquivos e grava as ocorrências de cada processo em um banco SQLite
+    # temporário, no qual a ocorrência a converter é escolhida de acordo com a política (ver POLITICAS_DEDUPLICACAO).
+    # O SQLite mantém em memória no máximo 'limite_memoria' MB e utiliza o disco para o restante, de modo que a quantidade
+    # de processos não é limitada pela memória. Durante a conversão, cada arquivo consulta somente as suas próprias
+    # ocorrências (ver processos_arquivo); os processos da conversão paralela abrem as suas próprias conexões com o banco.
+
+    def __init__(self, politica, pasta, limite_memoria=256):
+        if politica not in POLITICAS_DEDUPLICACAO:
+            raise ValueError('Política de deduplicação inválida: {}'.format(politica))
+        self.politica = politica
+        self.limite_memoria = limite_memoria
+        self.arquivo_banco = os.path.join(pasta, 'deduplicacao.sqlite')
+        self.arquivos = []
+        self.numeros_arquivos = {}
+        self.conexao = None
+        self.pid = None
+
+    def __getstate__(self):
+        estado = dict(self.__dict__)
+        estado['conexao'] = None
+        return estado
+
+    def conecta(self):
+        # Conexões não podem ser compartilhadas entre processos: cada processo abre a sua
+        if self.conexao is None or self.pid != os.getpid():
+            self.conexao = sqlite3.connect(self.arquivo_banco)
+            self.conexao.execute('PRAGMA cache_size = {}'.format(-self.limite_memoria * 1024))
+            self.conexao.execute('PRAGMA temp_store = FILE')
+            self.pid = os.getpid()
+        return self.conexao
+
+    def registra(self, arquivos, workers=1):
+        self.arquivos = list(arquivos)
+        self.numeros_arquivos = {arquivo: n for n, arquivo in enumerate(self.arquivos)}
+        # Posição de cada arquivo na ordem dos caminhos, utilizada pelas políticas (ver POLITICAS_DEDUPLICACAO)
+        ordens = {arquivo: ordem for ordem, arquivo in enumerate(sorted(self.arquivos))}
+        conexao = self.conecta()
+        conexao.execute('PRAGMA journal_mode = OFF')
+        conexao.execute('PRAGMA synchronous = OFF')
+        conexao.execute('CREATE TABLE ocorrencias (chave TEXT, arquivo INTEGER, ordem INTEGER, inicio INTEGER, fim INTEGER, movimentos_validos INTEGER)')
+        with contextlib.ExitStack() as pilha:
+            if workers > 1 and len(self.arquivos) > 1:
+                pool = pilha.enter_context(multiprocessing.Pool(min(workers, len(self.arquivos))))
+                resultados = pool.imap(ocorrencias_arquivo, self.arquivos)
+            else:
+                resultados = map(ocorrencias_arquivo, self.arquivos)
+            for n, ocorrencias in enumerate(resultados):
+                ordem = ordens[self.arquivos[n]]
+                conexao.executemany('INSERT INTO ocorrencias VALUES (?, ?, ?, ?, ?, ?)',
+                                    ((chave, n, ordem, inicio, fim, validos) for chave, inicio, fim, validos in ocorrencias))
+        conexao.execute('CREATE INDEX ocorrencias_chave ON ocorrencias (chave)')
+        conexao.execute('CREATE TABLE mantidos AS SELECT chave, arquivo, inicio FROM '
+                        '(SELECT chave, arquivo, inicio, ROW_NUMBER() OVER (PARTITION BY chave ORDER BY {}) AS ordem FROM ocorrencias) '
+                        'WHERE ordem = 1'.format(POLITICAS_DEDUPLICACAO[self.politica]))
+        conexao.execute('CREATE INDEX mantidos_arquivo ON mantidos (arquivo)')
+        conexao.commit()
+        ocorrencias, = conexao.execute('SELECT COUNT(*) FROM ocorrencias').fetchone()
+        processos, = conexao.execute('SELECT COUNT(*) FROM mantidos').fetchone()
+        print('Deduplicação ({}): {} ocorrência(s) de {} processo(s) distinto(s), {} ocorrência(s) repetida(s) descartada(s)'.format(
+            self.politica, ocorrencias, processos, ocorrencias - processos))
+
+    def processos_arquivo(self, arquivo):
+        # Retorna o conjunto das posições iniciais dos processos do arquivo que devem ser convertidos e, na política mesclar,
+        # o dicionário {início: [(arquivo, início, fim) das demais ocorrências]} dos processos repetidos
+        conexao = self.conecta()
+        n = self.numeros_arquivos[arquivo]
+        mantidos = {inicio for inicio, in conexao.execute('SELECT inicio FROM mantidos WHERE arquivo = ?', (n,))}
+        mesclas = {}
+        if self.politica == 'mesclar':
+            for inicio, outro, outro_inicio, outro_fim in conexao.execute(
+                    'SELECT m.inicio, o.arquivo, o.inicio, o.fim FROM mantidos m JOIN ocorrencias o ON o.chave = m.chave '
+                    'WHERE m.arquivo = ? AND NOT (o.arquivo = m.arquivo AND o.inicio = m.inicio) ORDER BY o.ordem, o.inicio', (n,)):
+                mesclas.setdefault(inicio, []).append((self.arquivos[outro], outro_inicio, outro_fim))
+        return mantidos, mesclas
+
+    def assinatura(self, arquivo):
+        # Identifica o resultado da deduplicação de um arquivo (ver converte_incremental): muda quando os processos mantidos
+        # do arquivo ou, na política mesclar, as ocorrências mescladas a eles mudam
+        mantidos, mesclas = self.processos_arquivo(arquivo)
+        versoes = [(outro, os.stat(outro).st_size, os.stat(outro).st_mtime_ns)
+                   for outro in sorted({outro for ocorrencias in mesclas.values() for outro, inicio, fim in ocorrencias})]
+        conteudo = [self.politica, sorted(mantidos), sorted(mesclas.items()), versoes]
+        return hashlib.sha1(json.dumps(conteudo).encode('utf8')).hexdigest()
+
+    def fecha(self):
+        if self.conexao is not None and self.pid == os.getpid():
+            self.conexao.close()
+        self.conexao = None
+
+
+def assuntos_processo(dados):
+    # Códigos nacionais, códigos locais e descrições dos assuntos de um processo (dadosBasicos), na ordem do JSON
+    ListaAssuntos = []
+    ListaAssuntosLocais = []
+    ListaAssuntosDescricao = []
+    if 'assunto' in dados and dados['assunto'] is not None:
+        for l in dados['assunto']:
+            if 'codigoNacional' in l and l['codigoNacional'] is not None:
+                ListaAssuntos.append(l['codigoNacional'])
+            elif 'codigoPaiNacional' in l and l['codigoPaiNacional'] is not None:
+                ListaAssuntos.append(l['codigoPaiNacional'])
+            if 'descricao' in l and l['descricao'] is not None:
+                ListaAssuntosDescricao.append(l['descricao'])
+            elif 'assuntoLocal' in l and l['assuntoLocal'] is not None:
+                if 'codigoNacional' in l['assuntoLocal'] and l['assuntoLocal']['codigoNacional'] is not None:
+                    ListaAssuntos.append(l['assuntoLocal']['codigoNacional'])
+                elif 'codigoPaiNacional' in l['assuntoLocal'] and l['assuntoLocal']['codigoPaiNacional'] is not None:
+                    ListaAssuntos.append(l['assuntoLocal']['codigoPaiNacional'])
+                if 'descricao' in l['assuntoLocal'] and l['assuntoLocal']['descricao'] is not None:
+                    ListaAssuntosDescricao.append(l['assuntoLocal']['descricao'])
+                if 'codigoAssunto' in l['assuntoLocal'] and l['assuntoLocal']['codigoAssunto'] is not None:
+                    ListaAssuntosLocais.append(l['assuntoLocal']['codigoAssunto'])
+    return ListaAssuntos, ListaAssuntosLocais, ListaAssuntosDescricao
+
+
+# Códigos SGT de uma ocorrência de processo utilizados nas estatísticas (ver Estatisticas): o código da classe, o código do
+# assunto primário e a lista dos códigos dos movimentos primários (um por evento, na ordem dos eventos). Os códigos não
+# encontrados nas tabelas são None (exceto o da classe, que mantém o código informado no arquivo JSON).
+CodigosProcesso = collections.namedtuple('CodigosProcesso', ['classe', 'assunto', 'movimentos'])
+
+
+class EventosProcesso(list):
+    # Lista dos eventos (Evento) de uma ocorrência de processo, acompanhada dos códigos SGT da ocorrência (CodigosProcesso),
+    # que não são gravados no event log (as colunas trazem as descrições)
+    codigos = None
+
+
+def codigo_estatisticas(codigo):
+    # Código inteiro (como nas consultas de TabelaLookup) ou, quando inválido, o próprio valor informado
+    try:
+        return int(codigo)
+    except (TypeError, ValueError, OverflowError):
+        return codigo
+
+
+def eventos_processos(arquivo, tabelas, destinos, filtro=None, deduplicacao=None, metricas=None):
+    # Gera, para cada processo de um arquivo JSON, o par (chaves, eventos): as chaves de 'destinos' às quais o processo
+    # pertence (o assunto None representa o event log com todos os assuntos) e a lista de eventos (EventosProcesso) do processo.
+    # Os processos que não atendem ao 'filtro' (FiltroProcessos) são descartados antes de qualquer outro processamento.
+    # Com 'deduplicacao' (Deduplicacao), somente as ocorrências mantidas dos processos repetidos são convertidas.
+    # Os processos lidos, convertidos e descartados (por motivo, ver MOTIVOS_DESCARTE) são contabilizados em 'metricas'.
+    metricas = metricas if metricas is not None else Metricas()
+    contadores = metricas.contadores
+    descartes = metricas.descartes
+    filtra_processos = filtro is not None and filtro.filtra_processos
+    filtra_movimentos = filtro is not None and filtro.filtra_movimentos
+    sgt_assuntos = tabelas['assuntos']
+    sgt_classes = tabelas['classes']
+    sgt_movimentos = tabelas['movimentos']
+    sgt_movimentos_local = tabelas['movimentos_local']
+    mpm_serventias = tabelas['serventias']
+    ibge = tabelas['ibge']
+    posicoes = seleciona_posicoes(arquivo, tabelas, destinos, filtro)
+    if posicoes is None:
+        print('Processando arquivo {}'.format(arquivo))
+        if deduplicacao is not None:
+            processos = le_processos(arquivo, posicoes=True)
+        else:
+            # Sem deduplicação as posições não são utilizadas, o que permite a leitura mapeada em memória (le_processos_mapeado)
+            processos = ((j, None, None) for j in le_processos(arquivo))
+    else:
+        print('Processando arquivo {} ({} processo(s) selecionado(s) pelo índice)'.format(arquivo, len(posicoes)))
+        processos = le_processos_posicoes(arquivo, posicoes)
+    mantidos = mesclas = None
+    if deduplicacao is not None:
+        mantidos, mesclas = deduplicacao.processos_arquivo(arquivo)
+    for j, inicio, fim in metricas.cronometra(processos, 'leitura_json'):
+        contadores['processos_lidos'] += 1
+        if mantidos is not None:
+            if inicio not in mantidos:
+                descartes['duplicado'] += 1
+                continue
+            if inicio in mesclas:
+                j = mescla_movimentos(j, mesclas[inicio])
+        ProcessoNumero = None
+        ProcessoGrau = None
+        ProcessoSiglaTribunal = None
+        ProcessoAssuntoPrimario = None
+        ProcessoAssuntoSecundario = None
+        ProcessoAssuntoTerciario = None
+        ProcessoAssuntoLocal = None
+        ProcessoAssuntoDescricao = None
+        ProcessoVinculado = None
+        ProcessoRelacaoIncidental = None
+        ProcessoPrioridade = None
+        ProcessoValorCausa = None
+        ProcessoOrgaoJulgador = None
+        ProcessoOrgaoJulgadorTipo = None
+        ProcessoOrgaoJulgadorInstancia = None
+        ProcessoOrgaoJulgadorMunicipio = None
+        ProcessoOrgaoJulgadorUF = None
+        ProcessoCompetencia = None
+        ProcessoOutrosNumeros = None
+        ProcessoClassePrimaria = None
+        ProcessoClasseSecundaria = None
+        ProcessoMunicipio = None
+        ProcessoUF = None
+        ProcessoNivelSigilo = None
+        ProcessoIntervencaoMP = None
+        ProcessoTamanho = None
+        ProcessoDataAjuizamento = None
+        ProcessoEl = None
+        ProcessoSistema = None
+        ListaAssuntosPrimarios = []
+        CodigoClasse = None
+        CodigoAssuntoPrimario = None
+        CodigosMovimentosPrimarios = []
+        Eventos = EventosProcesso()
+        if 'dadosBasicos' in j and j['dadosBasicos'] is not None and 'numero' in j['dadosBasicos'] and j['dadosBasicos']['numero'] is not None and 'movimento' in j and j['movimento'] is not None:
+            if filtra_processos and not filtro.aceita_processo(j):
+                descartes['filtro_processo'] += 1
+                continue
+            ListaDatasMovimentos = formata_datas_movimentos(j['movimento'])
+            if filtra_movimentos and ListaDatasMovimentos is not None:
+                # Somente os movimentos do intervalo de datas do filtro geram eventos (os demais ficam com data None)
+                ListaDatasMovimentos = [data_hora if filtro.aceita_movimento(data_hora) else None for data_hora in ListaDatasMovimentos]
+                if not any(ListaDatasMovimentos):
+                    descartes['filtro_movimentos'] += 1
+                    continue
+            if ListaDatasMovimentos is not None:
+                ListaAssuntos, ListaAssuntosLocais, ListaAssuntosDescricao = assuntos_processo(j['dadosBasicos'])
+                for a in ListaAssuntos:
+                    assunto_sgt = sgt_assuntos.busca(a)
+                    if assunto_sgt is not None:
+                        ListaAssuntosPrimarios.append(assunto_sgt[0])
+                Chaves = [chave for chave in destinos if chave is None or chave in ListaAssuntos or chave in ListaAssuntosPrimarios]
+                if Chaves:
+                    ProcessoNumero = str(j['dadosBasicos']['numero'])[0:7]+'-'+str(j['dadosBasicos']['numero'])[7:9]+'.'+str(j['dadosBasicos']['numero'])[9:13]+'.'+str(j['dadosBasicos']['numero'])[13:16]+'.'+str(j['dadosBasicos']['numero'])[16:20]
+                    if 'grau' in j and j['grau'] is not None:
+                        ProcessoGrau = j['grau']
+                    if 'siglaTribunal' in j and j['siglaTribunal'] is not None:
+                        ProcessoSiglaTribunal = j['siglaTribunal']
+                    if ListaAssuntos:
+                        ProcessoAssuntoTerciario = ListaAssuntos[-1]
+                    if ProcessoAssuntoTerciario:
+                        assunto_sgt = sgt_assuntos.busca(ProcessoAssuntoTerciario)
+                        if assunto_sgt is not None:
+                            CodigoAssuntoPrimario, ProcessoAssuntoPrimario, ProcessoAssuntoSecundario, ProcessoAssuntoTerciario = assunto_sgt
+                        else:
+                            ProcessoAssuntoTerciario = None
+                    if ListaAssuntosLocais:
+                        ProcessoAssuntoLocal = ListaAssuntosLocais[-1]
+                    if ListaAssuntosDescricao:
+                        ProcessoAssuntoDescricao = ListaAssuntosDescricao[-1]
+                    if 'processoVinculado' in j['dadosBasicos'] and j['dadosBasicos']['processoVinculado'] is not None:
+                        ProcessoVinculado = j['dadosBasicos']['processoVinculado']
+                    if 'relacaoIncidental' in j['dadosBasicos'] and j['dadosBasicos']['relacaoIncidental'] is not None:
+                        ProcessoRelacaoIncidental = j['dadosBasicos']['relacaoIncidental']
+                    if 'prioridade' in j['dadosBasicos'] and j['dadosBasicos']['prioridade'] is not None:
+                        ProcessoPrioridade = j['dadosBasicos']['prioridade']
+                    if 'valorCausa' in j['dadosBasicos'] and j['dadosBasicos']['valorCausa'] is not None:
+                        ProcessoValorCausa = j['dadosBasicos']['valorCausa']
+                    if 'orgaoJulgador' in j['dadosBasicos'] and j['dadosBasicos']['orgaoJulgador'] is not None:
+                        if 'nomeOrgao' in j['dadosBasicos']['orgaoJulgador'] and j['dadosBasicos']['orgaoJulgador']['nomeOrgao'] is not None:
+                            ProcessoOrgaoJulgador = j['dadosBasicos']['orgaoJulgador']['nomeOrgao']
+                        if 'codigoOrgao' in j['dadosBasicos']['orgaoJulgador'] and j['dadosBasicos']['orgaoJulgador']['codigoOrgao'] is not None:
+                            ProcessoOrgaoJulgadorTipo = j['dadosBasicos']['orgaoJulgador']['codigoOrgao']
+                            serventia = mpm_serventias.busca(ProcessoOrgaoJulgadorTipo)
+                            if serventia is not None:
+                                ProcessoOrgaoJulgadorTipo = serventia[0]
+                        if 'instancia' in j['dadosBasicos']['orgaoJulgador'] and j['dadosBasicos']['orgaoJulgador']['instancia'] is not None:
+                            ProcessoOrgaoJulgadorInstancia = j['dadosBasicos']['orgaoJulgador']['instancia']
+                        if 'codigoMunicipioIBGE' in j['dadosBasicos']['orgaoJulgador'] and j['dadosBasicos']['orgaoJulgador']['codigoMunicipioIBGE'] is not None:
+                            ProcessoOrgaoJulgadorMunicipio = j['dadosBasicos']['orgaoJulgador']['codigoMunicipioIBGE']
+                            municipio = ibge.busca(ProcessoOrgaoJulgadorMunicipio)
+                            if municipio is not None:
+                                ProcessoOrgaoJulgadorMunicipio, ProcessoOrgaoJulgadorUF = municipio
+                            else:
+                                ProcessoOrgaoJulgadorUF = ProcessoOrgaoJulgadorMunicipio
+                    if 'competencia' in j['dadosBasicos'] and j['dadosBasicos']['competencia'] is not None:
+                        ProcessoCompetencia = j['dadosBasicos']['competencia']
+                    if 'outrosnumeros' in j['dadosBasicos'] and j['dadosBasicos']['outrosnumeros'] is not None:
+                        ProcessoOutrosNumeros = j['dadosBasicos']['outrosnumeros']
+                    if 'classeProcessual' in j['dadosBasicos'] and j['dadosBasicos']['classeProcessual'] is not None:
+                        ProcessoClasseSecundaria = j['dadosBasicos']['classeProcessual']
+                        CodigoClasse = codigo_estatisticas(ProcessoClasseSecundaria)
+                        classe = sgt_classes.busca(ProcessoClasseSecundaria)
+                        if classe is not None:
+                            ProcessoClassePrimaria, ProcessoClasseSecundaria = classe
+                    if 'codigoLocalidade' in j['dadosBasicos'] and j['dadosBasicos']['codigoLocalidade'] is not None:
+                        ProcessoMunicipio = j['dadosBasicos']['codigoLocalidade']
+                    if ProcessoMunicipio:
+                        municipio = ibge.busca(ProcessoMunicipio)
+                        if municipio is not None:
+                            ProcessoMunicipio, ProcessoUF = municipio
+                        else:
+                            ProcessoUF = ProcessoMunicipio
+                    if 'nivelSigilo' in j['dadosBasicos'] and j['dadosBasicos']['nivelSigilo'] is not None:
+                        ProcessoNivelSigilo = j['dadosBasicos']['nivelSigilo']
+                    if 'intervencaoMP' in j['dadosBasicos'] and j['dadosBasicos']['intervencaoMP'] is not None:
+                        ProcessoIntervencaoMP = j['dadosBasicos']['intervencaoMP']
+                    if 'tamanhoProcesso' in j['dadosBasicos'] and j['dadosBasicos']['tamanhoProcesso'] is not None:
+                        ProcessoTamanho = j['dadosBasicos']['tamanhoProcesso']
+                    if 'dataAjuizamento' in j['dadosBasicos'] and j['dadosBasicos']['dataAjuizamento'] is not None:
+                        ProcessoDataAjuizamento = j['dadosBasicos']['dataAjuizamento']
+                        ProcessoDataAjuizamento = str(ProcessoDataAjuizamento)[0:4] + '-' + str(ProcessoDataAjuizamento)[4:6] + \
+                                              '-' + str(ProcessoDataAjuizamento)[6:8] + 'T' + str(ProcessoDataAjuizamento)[8:10] \
+                                              + ':' + str(ProcessoDataAjuizamento)[10:12] + ':' + str(ProcessoDataAjuizamento)[12:14]
+                    if 'procEl' in j['dadosBasicos'] and j['dadosBasicos']['procEl'] is not None:
+                        ProcessoEl = j['dadosBasicos']['procEl']
                         try:
-                            datahora = time.strptime(str(k['dataHora'])[0:4]+'-'+str(k['dataHora'])[4:6]+'-'+str(k['dataHora'])[6:8]+'T'+str(k['dataHora'])[8:10]+':'+str(k['dataHora'])[10:12]+':'+str(k['dataHora'])[12:14],'%Y-%m-%dT%H:%M:%S')
-                            segundo = int(str(k['dataHora'][12:14]))
+                            ProcessoEl = int(ProcessoEl)
                         except TypeError:
-                            datahora = None
-                            segundo = 0
+                            ProcessoEl = ProcessoEl
                         except ValueError:
-                            datahora = None
-                            segundo = 0
-                        if datahora is None or segundo>59:
-                            datahoraok = False
-                    if datahoraok:
-                        if 'assunto' in j['dadosBasicos'] and j['dadosBasicos']['assunto'] is not None:
-                            for l in j['dadosBasicos']['assunto']:
-                                if 'codigoNacional' in l and l['codigoNacional'] is not None:
-                                    ListaAssuntos.append(l['codigoNacional'])
-                                elif 'codigoPaiNacional' in l and l['codigoPaiNacional'] is not None:
-                                    ListaAssuntos.append(l['codigoPaiNacional'])
-                                if 'descricao' in l and l['descricao'] is not None:
-                                    ListaAssuntosDescricao.append(l['descricao'])
-                                elif 'assuntoLocal' in l and l['assuntoLocal'] is not None:
-                                    if 'codigoNacional' in l['assuntoLocal'] and l['assuntoLocal']['codigoNacional'] is not None:
-                                        ListaAssuntos.append(l['assuntoLocal']['codigoNacional'])
-                                    elif 'codigoPaiNacional' in l['assuntoLocal'] and l['assuntoLocal']['codigoPaiNacional'] is not None:
-                                        ListaAssuntos.append(l['assuntoLocal']['codigoPaiNacional'])
-                                    if 'descricao' in l['assuntoLocal'] and l['assuntoLocal']['descricao'] is not None:
-                                        ListaAssuntosDescricao.append(l['assuntoLocal']['descricao'])
-                                    if 'codigoAssunto' in l['assuntoLocal'] and l['assuntoLocal']['codigoAssunto'] is not None:
-                                        ListaAssuntosLocais.append(l['assuntoLocal']['codigoAssunto'])
-                        for a in ListaAssuntos:
-                            try:
-                                ListaAssuntosPrimarios.append(sgt_assuntos.loc[int(a)].cod_pri)
-                            except KeyError:
-                                ListaAssuntosPrimarios = ListaAssuntosPrimarios
-                            except ValueError:
-                                ListaAssuntosPrimarios = ListaAssuntosPrimarios
-                        if assunto is None or assunto in ListaAssuntos or assunto in ListaAssuntosPrimarios:
-                            ProcessoNumero = str(j['dadosBasicos']['numero'])[0:7]+'-'+str(j['dadosBasicos']['numero'])[7:9]+'.'+str(j['dadosBasicos']['numero'])[9:13]+'.'+str(j['dadosBasicos']['numero'])[13:16]+'.'+str(j['dadosBasicos']['numero'])[16:20]
-                            if 'grau' in j and j['grau'] is not None:
-                                ProcessoGrau = j['grau']
-                            if 'siglaTribunal' in j and j['siglaTribunal'] is not None:
-                                ProcessoSiglaTribunal = j['siglaTribunal']
-                            if ListaAssuntos:
-                                ProcessoAssuntoTerciario = ListaAssuntos[-1]
-                            if ProcessoAssuntoTerciario:
-                                try:
-                                    ProcessoAssuntoPrimario = sgt_assuntos.loc[int(ProcessoAssuntoTerciario)].primario
-                                    ProcessoAssuntoSecundario = sgt_assuntos.loc[int(ProcessoAssuntoTerciario)].secundario
-                                    ProcessoAssuntoTerciario = sgt_assuntos.loc[int(ProcessoAssuntoTerciario)].descricao
-                                except KeyError:
-                                    ProcessoAssuntoPrimario = None
-                                    ProcessoAssuntoSecundario = None
-                                    ProcessoAssuntoTerciario = None
-                                except ValueError:
-                                    ProcessoAssuntoPrimario = None
-                                    ProcessoAssuntoSecundario = None
-                                    ProcessoAssuntoTerciario = None
-                            if ListaAssuntosLocais:
-                                ProcessoAssuntoLocal = ListaAssuntosLocais[-1]
-                            if ListaAssuntosDescricao:
-                                ProcessoAssuntoDescricao = ListaAssuntosDescricao[-1]
-                            if 'processoVinculado' in j['dadosBasicos'] and j['dadosBasicos']['processoVinculado'] is not None:
-                                ProcessoVinculado = j['dadosBasicos']['processoVinculado']
-                            if 'relacaoIncidental' in j['dadosBasicos'] and j['dadosBasicos']['relacaoIncidental'] is not None:
-                                ProcessoRelacaoIncidental = j['dadosBasicos']['relacaoIncidental']
-                            if 'prioridade' in j['dadosBasicos'] and j['dadosBasicos']['prioridade'] is not None:
-                                ProcessoPrioridade = j['dadosBasicos']['prioridade']
-                            if 'valorCausa' in j['dadosBasicos'] and j['dadosBasicos']['valorCausa'] is not None:
-                                ProcessoValorCausa = j['dadosBasicos']['valorCausa']
-                            if 'orgaoJulgador' in j['dadosBasicos'] and j['dadosBasicos']['orgaoJulgador'] is not None:
-                                if 'nomeOrgao' in j['dadosBasicos']['orgaoJulgador'] and j['dadosBasicos']['orgaoJulgador']['nomeOrgao'] is not None:
-                                    ProcessoOrgaoJulgador = j['dadosBasicos']['orgaoJulgador']['nomeOrgao']
-                                if 'codigoOrgao' in j['dadosBasicos']['orgaoJulgador'] and j['dadosBasicos']['orgaoJulgador']['codigoOrgao'] is not None:
-                                    ProcessoOrgaoJulgadorTipo = j['dadosBasicos']['orgaoJulgador']['codigoOrgao']
-                                    try:
-                                        ProcessoOrgaoJulgadorTipo = mpm_serventias.loc[int(ProcessoOrgaoJulgadorTipo)].DSC_TIP_ORGAO
-                                    except KeyError:
-                                        ProcessoOrgaoJulgadorTipo = ProcessoOrgaoJulgadorTipo
-                                    except ValueError:
-                                        ProcessoOrgaoJulgadorTipo = ProcessoOrgaoJulgadorTipo
-                                if 'instancia' in j['dadosBasicos']['orgaoJulgador'] and j['dadosBasicos']['orgaoJulgador']['instancia'] is not None:
-                                    ProcessoOrgaoJulgadorInstancia = j['dadosBasicos']['orgaoJulgador']['instancia']
-                                if 'codigoMunicipioIBGE' in j['dadosBasicos']['orgaoJulgador'] and j['dadosBasicos']['orgaoJulgador']['codigoMunicipioIBGE'] is not None:
-                                    ProcessoOrgaoJulgadorMunicipio = j['dadosBasicos']['orgaoJulgador']['codigoMunicipioIBGE']
-                                    try:
-                                        ProcessoOrgaoJulgadorUF = ibge.loc[int(ProcessoOrgaoJulgadorMunicipio)].sig_uf
-                                        ProcessoOrgaoJulgadorMunicipio = ibge.loc[int(ProcessoOrgaoJulgadorMunicipio)].municipio
-                                    except KeyError:
-                                        ProcessoOrgaoJulgadorMunicipio = ProcessoOrgaoJulgadorMunicipio
-                                        ProcessoOrgaoJulgadorUF = ProcessoOrgaoJulgadorMunicipio
-                                    except ValueError:
-                                        ProcessoOrgaoJulgadorMunicipio = ProcessoOrgaoJulgadorMunicipio
-                                        ProcessoOrgaoJulgadorUF = ProcessoOrgaoJulgadorMunicipio
-                            if 'competencia' in j['dadosBasicos'] and j['dadosBasicos']['competencia'] is not None:
-                                ProcessoCompetencia = j['dadosBasicos']['competencia']
-                            if 'outrosnumeros' in j['dadosBasicos'] and j['dadosBasicos']['outrosnumeros'] is not None:
-                                ProcessoOutrosNumeros = j['dadosBasicos']['outrosnumeros']
-                            if 'classeProcessual' in j['dadosBasicos'] and j['dadosBasicos']['classeProcessual'] is not None:
-                                ProcessoClasseSecundaria = j['dadosBasicos']['classeProcessual']
-                                try:
-                                    ProcessoClassePrimaria = sgt_classes.loc[int(ProcessoClasseSecundaria)].primario
-                                    ProcessoClasseSecundaria = sgt_classes.loc[int(ProcessoClasseSecundaria)].descricao
-                                except KeyError:
-                                    ProcessoClassePrimaria = ProcessoClassePrimaria
-                                    ProcessoClasseSecundaria = ProcessoClasseSecundaria
-                                except ValueError:
-                                    ProcessoClassePrimaria = ProcessoClassePrimaria
-                                    ProcessoClasseSecundaria = ProcessoClasseSecundaria
-                            if 'codigoLocalidade' in j['dadosBasicos'] and j['dadosBasicos']['codigoLocalidade'] is not None:
-                                ProcessoMunicipio = j['dadosBasicos']['codigoLocalidade']
-                            if ProcessoMunicipio:
-                                try:
-                                    ProcessoUF = ibge.loc[int(ProcessoMunicipio)].sig_uf
-                                    ProcessoMunicipio = ibge.loc[int(ProcessoMunicipio)].municipio
-                                except KeyError:
-                                    ProcessoMunicipio = ProcessoMunicipio
-                                    ProcessoUF = ProcessoMunicipio
-                                except ValueError:
-                                    ProcessoMunicipio = ProcessoMunicipio
-                                    ProcessoUF = ProcessoMunicipio
-                            if 'nivelSigilo' in j['dadosBasicos'] and j['dadosBasicos']['nivelSigilo'] is not None:
-                                ProcessoNivelSigilo = j['dadosBasicos']['nivelSigilo']
-                            if 'intervencaoMP' in j['dadosBasicos'] and j['dadosBasicos']['intervencaoMP'] is not None:
-                                ProcessoIntervencaoMP = j['dadosBasicos']['intervencaoMP']
-                            if 'tamanhoProcesso' in j['dadosBasicos'] and j['dadosBasicos']['tamanhoProcesso'] is not None:
-                                ProcessoTamanho = j['dadosBasicos']['tamanhoProcesso']
-                            if 'dataAjuizamento' in j['dadosBasicos'] and j['dadosBasicos']['dataAjuizamento'] is not None:
-                                ProcessoDataAjuizamento = j['dadosBasicos']['dataAjuizamento']
-                                ProcessoDataAjuizamento = str(ProcessoDataAjuizamento)[0:4] + '-' + str(ProcessoDataAjuizamento)[4:6] + \
-                                                      '-' + str(ProcessoDataAjuizamento)[6:8] + 'T' + str(ProcessoDataAjuizamento)[8:10] \
-                                                      + ':' + str(ProcessoDataAjuizamento)[10:12] + ':' + str(ProcessoDataAjuizamento)[12:14]
-                            if 'procEl' in j['dadosBasicos'] and j['dadosBasicos']['procEl'] is not None:
-                                ProcessoEl = j['dadosBasicos']['procEl']
+                            ProcessoEl = ProcessoEl
+                        if ProcessoEl == 0:
+                            ProcessoEl = 'Eletronico'
+                        elif ProcessoEl == 1:
+                            ProcessoEl = 'Fisico'
+                    if 'dscSistema' in j['dadosBasicos'] and j['dadosBasicos']['dscSistema'] is not None:
+                        ProcessoSistema = j['dadosBasicos']['dscSistema']
+                        try:
+                            ProcessoSistema = int(ProcessoSistema)
+                        except TypeError:
+                            ProcessoSistema = ProcessoSistema
+                        except ValueError:
+                            ProcessoSistema = ProcessoSistema
+                        if ProcessoSistema == 1:
+                            ProcessoSistema = 'PJE'
+                        elif ProcessoSistema == 2:
+                            ProcessoSistema = 'PROJUDI'
+                        elif ProcessoSistema == 3:
+                            ProcessoSistema = 'SAJ'
+                        elif ProcessoSistema == 4:
+                            ProcessoSistema = 'EPROC'
+                        elif ProcessoSistema == 5:
+                            ProcessoSistema = 'APOLO'
+                        elif ProcessoSistema == 6:
+                            ProcessoSistema = 'THEMIS'
+                        elif ProcessoSistema == 7:
+                            ProcessoSistema = 'LIBRA'
+                        elif ProcessoSistema == 8:
+                            ProcessoSistema = 'Outros'
+                    for k, MovimentoDataHora in zip(j['movimento'], ListaDatasMovimentos):
+                        MovimentoPrimario = None
+                        MovimentoSecundario = None
+                        CodigoMovimentoPrimario = None
+                        MovimentoId = None
+                        MovimentoNivelSigilo = None
+                        MovimentoTipoResponsavel = None
+                        MovimentoLocal = None
+                        MovimentoComplemento = None
+                        MovimentoCodComplemento = None
+                        MovimentoIdDocumentoVinculado = None
+                        MovimentoOrgaoJulgador = None
+                        MovimentoOrgaoJulgadorTipo = None
+                        MovimentoOrgaoJulgadorInstancia = None
+                        MovimentoOrgaoJulgadorMunicipio = None
+                        MovimentoOrgaoJulgadorUF = None
+                        MovimentoTipoDecisao = None
+                        if 'movimentoNacional' in k and k['movimentoNacional'] is not None and 'codigoNacional' in k['movimentoNacional'] and k['movimentoNacional']['codigoNacional'] is not None:
+                            MovimentoSecundario = k['movimentoNacional']['codigoNacional']
+                        elif 'movimentoLocal' in k and k['movimentoLocal'] is not None:
+                            if 'codigoPaiNacional' in k['movimentoLocal'] and k['movimentoLocal']['codigoPaiNacional'] is not None:
+                                MovimentoSecundario = k['movimentoLocal']['codigoPaiNacional']
+                            elif 'codigoMovimento' in k['movimentoLocal'] and k['movimentoLocal']['codigoMovimento'] is not None:
+                                MovimentoSecundario = k['movimentoLocal']['codigoMovimento']
+                                MovimentoLocal = MovimentoSecundario
+                        if MovimentoSecundario is not None and MovimentoDataHora is not None:
+                            if MovimentoLocal:
+                                movimento = sgt_movimentos_local.busca(MovimentoSecundario)
+                                if movimento is not None:
+                                    # O movimento local é gravado com a sua própria descrição e contado pelo seu próprio código
+                                    CodigoMovimentoPrimario = codigo_estatisticas(MovimentoSecundario)
+                                    MovimentoPrimario = MovimentoSecundario = movimento[2]
+                            if not MovimentoPrimario:
+                                movimento = sgt_movimentos.busca(MovimentoSecundario)
+                                if movimento is not None:
+                                    CodigoMovimentoPrimario, MovimentoPrimario, MovimentoSecundario = movimento
+                            if 'identificadorMovimento' in k and k['identificadorMovimento'] is not None:
+                                MovimentoId = k['identificadorMovimento']
+                            if 'nivelSigilo' in k and k['nivelSigilo'] is not None:
+                                MovimentoNivelSigilo = k['nivelSigilo']
+                            if 'tipoResponsavelMovimento' in k and k['tipoResponsavelMovimento'] is not None:
+                                MovimentoTipoResponsavel = k['tipoResponsavelMovimento']
                                 try:
-                                    ProcessoEl = int(ProcessoEl)
+                                    MovimentoTipoResponsavel = int(MovimentoTipoResponsavel)
                                 except TypeError:
-                                    ProcessoEl = ProcessoEl
+                                    MovimentoTipoResponsavel = MovimentoTipoResponsavel
                                 except ValueError:
-                                    ProcessoEl = ProcessoEl
-                                if ProcessoEl == 0:
-                                    ProcessoEl = 'Eletronico'
-                                elif ProcessoEl == 1:
-                                    ProcessoEl = 'Fisico'
-                            if 'dscSistema' in j['dadosBasicos'] and j['dadosBasicos']['dscSistema'] is not None:
-                                ProcessoSistema = j['dadosBasicos']['dscSistema']
+                                    MovimentoTipoResponsavel = MovimentoTipoResponsavel
+                                if MovimentoTipoResponsavel == 0:
+                                    MovimentoTipoResponsavel = 'Servidor'
+                                elif MovimentoTipoResponsavel == 1:
+                                    MovimentoTipoResponsavel = 'Magistrado'
+                            if 'complementoNacional' in k and k['complementoNacional'] is not None and 'descricaoComplemento' in k['complementoNacional'] and k['complementoNacional']['descricaoComplemento'] is not None:
+                                MovimentoComplemento = k['complementoNacional']['descricaoComplemento']
+                            if 'complementoNacional' in k and k['complementoNacional'] is not None and 'codComplementoTabelado' in k['complementoNacional'] and k['complementoNacional']['codComplementoTabelado'] is not None:
+                                MovimentoCodComplemento = k['complementoNacional']['codComplementoTabelado']
+                            if 'idDocumentoVinculado' in k and k['idDocumentoVinculado'] is not None:
+                                MovimentoIdDocumentoVinculado = k['idDocumentoVinculado']
+                            if 'orgaoJulgador' in k and k['orgaoJulgador'] is not None:
+                                if 'nomeOrgao' in k['orgaoJulgador'] and k['orgaoJulgador']['nomeOrgao'] is not None:
+                                    MovimentoOrgaoJulgador = k['orgaoJulgador']['nomeOrgao']
+                                if 'codigoOrgao' in k['orgaoJulgador'] and k['orgaoJulgador']['codigoOrgao'] is not None:
+                                    MovimentoOrgaoJulgadorTipo = k['orgaoJulgador']['codigoOrgao']
+                                    serventia = mpm_serventias.busca(MovimentoOrgaoJulgadorTipo)
+                                    if serventia is not None:
+                                        MovimentoOrgaoJulgadorTipo = serventia[0]
+                                if 'instancia' in k['orgaoJulgador'] and k['orgaoJulgador']['instancia'] is not None:
+                                    MovimentoOrgaoJulgadorInstancia = k['orgaoJulgador']['instancia']
+                                if 'codigoMunicipioIBGE' in k['orgaoJulgador'] and k['orgaoJulgador']['codigoMunicipioIBGE'] is not None:
+                                    MovimentoOrgaoJulgadorMunicipio = k['orgaoJulgador']['codigoMunicipioIBGE']
+                                    municipio = ibge.busca(MovimentoOrgaoJulgadorMunicipio)
+                                    if municipio is not None:
+                                        MovimentoOrgaoJulgadorMunicipio, MovimentoOrgaoJulgadorUF = municipio
+                                    else:
+                                        MovimentoOrgaoJulgadorUF = MovimentoOrgaoJulgadorMunicipio
+                            if 'tipoDecisao' in k and k['tipoDecisao'] is not None:
+                                MovimentoTipoDecisao = k['tipoDecisao']
                                 try:
-                                    ProcessoSistema = int(ProcessoSistema)
+                                    MovimentoTipoDecisao = int(MovimentoTipoDecisao)
                                 except TypeError:
-                                    ProcessoSistema = ProcessoSistema
+                                    MovimentoTipoDecisao = MovimentoTipoDecisao
                                 except ValueError:
-                                    ProcessoSistema = ProcessoSistema
-                                if ProcessoSistema == 1:
-                                    ProcessoSistema = 'PJE'
-                                elif ProcessoSistema == 2:
-                                    ProcessoSistema = 'PROJUDI'
-                                elif ProcessoSistema == 3:
-                                    ProcessoSistema = 'SAJ'
-                                elif ProcessoSistema == 4:
-                                    ProcessoSistema = 'EPROC'
-                                elif ProcessoSistema == 5:
-                                    ProcessoSistema = 'APOLO'
-                                elif ProcessoSistema == 6:
-                                    ProcessoSistema = 'THEMIS'
-                                elif ProcessoSistema == 7:
-                                    ProcessoSistema = 'LIBRA'
-                                elif ProcessoSistema == 8:
-                                    ProcessoSistema = 'Outros'
-                            for k in j['movimento']:
-                                MovimentoPrimario = None
-                                MovimentoSecundario = None
-                                MovimentoDataHora = None
-                                MovimentoId = None
-                                MovimentoNivelSigilo = None
-                                MovimentoTipoResponsavel = None
-                                MovimentoLocal = None
-                                MovimentoComplemento = None
-                                MovimentoCodComplemento = None
-                                MovimentoIdDocumentoVinculado = None
-                                MovimentoOrgaoJulgador = None
-                                MovimentoOrgaoJulgadorTipo = None
-                                MovimentoOrgaoJulgadorInstancia = None
-                                MovimentoOrgaoJulgadorMunicipio = None
-                                MovimentoOrgaoJulgadorUF = None
-                                MovimentoTipoDecisao = None
-                                if 'movimentoNacional' in k and k['movimentoNacional'] is not None and 'codigoNacional' in k['movimentoNacional'] and k['movimentoNacional']['codigoNacional'] is not None:
-                                    MovimentoSecundario = k['movimentoNacional']['codigoNacional']
-                                elif 'movimentoLocal' in k and k['movimentoLocal'] is not None:
-                                    if 'codigoPaiNacional' in k['movimentoLocal'] and k['movimentoLocal']['codigoPaiNacional'] is not None:
-                                        MovimentoSecundario = k['movimentoLocal']['codigoPaiNacional']
-                                    elif 'codigoMovimento' in k['movimentoLocal'] and k['movimentoLocal']['codigoMovimento'] is not None:
-                                        MovimentoSecundario = k['movimentoLocal']['codigoMovimento']
-                                        MovimentoLocal = MovimentoSecundario
-                                if 'dataHora' in k and k['dataHora'] is not None:
-                                    MovimentoDataHora = str(k['dataHora'])[0:4]+'-'+str(k['dataHora'])[4:6]+'-'+str(k['dataHora'])[6:8]+'T'+str(k['dataHora'])[8:10]+':'+str(k['dataHora'])[10:12]+':'+str(k['dataHora'])[12:14]
-                                if MovimentoSecundario is not None and MovimentoDataHora is not None:
-                                    if MovimentoLocal:
-                                        try:
-                                            MovimentoPrimario = sgt_movimentos_local.loc[int(MovimentoSecundario)].descricao
-                                            MovimentoSecundario = sgt_movimentos_local.loc[int(MovimentoSecundario)].descricao
-                                        except KeyError:
-                                            MovimentoPrimario = MovimentoPrimario
-                                            MovimentoSecundario = MovimentoSecundario
-                                        except ValueError:
-                                            MovimentoPrimario = MovimentoPrimario
-                                            MovimentoSecundario = MovimentoSecundario
-                                    if not MovimentoPrimario:
-                                        try:
-                                            MovimentoPrimario = sgt_movimentos.loc[int(MovimentoSecundario)].primario
-                                            MovimentoSecundario = sgt_movimentos.loc[int(MovimentoSecundario)].descricao
-                                        except KeyError:
-                                            MovimentoPrimario = MovimentoPrimario
-                                            MovimentoSecundario=MovimentoSecundario
-                                        except ValueError:
-                                            MovimentoPrimario = MovimentoPrimario
-                                            MovimentoSecundario = MovimentoSecundario
-                                    if 'identificadorMovimento' in k and k['identificadorMovimento'] is not None:
-                                        MovimentoId = k['identificadorMovimento']
-                                    if 'nivelSigilo' in k and k['nivelSigilo'] is not None:
-                                        MovimentoNivelSigilo = k['nivelSigilo']
-                                    if 'tipoResponsavelMovimento' in k and k['tipoResponsavelMovimento'] is not None:
-                                        MovimentoTipoResponsavel = k['tipoResponsavelMovimento']
-                                        try:
-                                            MovimentoTipoResponsavel = int(MovimentoTipoResponsavel)
-                                        except TypeError:
-                                            MovimentoTipoResponsavel = MovimentoTipoResponsavel
-                                        except ValueError:
-                                            MovimentoTipoResponsavel = MovimentoTipoResponsavel
-                                        if MovimentoTipoResponsavel == 0:
-                                            MovimentoTipoResponsavel = 'Servidor'
-                                        elif MovimentoTipoResponsavel == 1:
-                                            MovimentoTipoResponsavel = 'Magistrado'
-                                    if 'complementoNacional' in k and k['complementoNacional'] is not None and 'descricaoComplemento' in k['complementoNacional'] and k['complementoNacional']['descricaoComplemento'] is not None:
-                                        MovimentoComplemento = k['complementoNacional']['descricaoComplemento']
-                                    if 'complementoNacional' in k and k['complementoNacional'] is not None and 'codComplementoTabelado' in k['complementoNacional'] and k['complementoNacional']['codComplementoTabelado'] is not None:
-                                        MovimentoCodComplemento = k['complementoNacional']['codComplementoTabelado']
-                                    if 'idDocumentoVinculado' in k and k['idDocumentoVinculado'] is not None:
-                                        MovimentoIdDocumentoVinculado = k['idDocumentoVinculado']
-                                    if 'orgaoJulgador' in k and k['orgaoJulgador'] is not None:
-                                        if 'nomeOrgao' in k['orgaoJulgador'] and k['orgaoJulgador']['nomeOrgao'] is not None:
-                                            MovimentoOrgaoJulgador = k['orgaoJulgador']['nomeOrgao']
-                                        if 'codigoOrgao' in k['orgaoJulgador'] and k['orgaoJulgador']['codigoOrgao'] is not None:
-                                            MovimentoOrgaoJulgadorTipo = k['orgaoJulgador']['codigoOrgao']
-                                            try:
-                                                MovimentoOrgaoJulgadorTipo = mpm_serventias.loc[int(MovimentoOrgaoJulgadorTipo)].DSC_TIP_ORGAO
-                                            except KeyError:
-                                                MovimentoOrgaoJulgadorTipo = MovimentoOrgaoJulgadorTipo
-                                            except ValueError:
-                                                MovimentoOrgaoJulgadorTipo = MovimentoOrgaoJulgadorTipo
-                                        if 'instancia' in k['orgaoJulgador'] and k['orgaoJulgador']['instancia'] is not None:
-                                            MovimentoOrgaoJulgadorInstancia = k['orgaoJulgador']['instancia']
-                                        if 'codigoMunicipioIBGE' in k['orgaoJulgador'] and k['orgaoJulgador']['codigoMunicipioIBGE'] is not None:
-                                            MovimentoOrgaoJulgadorMunicipio = k['orgaoJulgador']['codigoMunicipioIBGE']
-                                            try:
-                                                MovimentoOrgaoJulgadorUF = ibge.loc[int(MovimentoOrgaoJulgadorMunicipio)].sig_uf
-                                                MovimentoOrgaoJulgadorMunicipio = ibge.loc[int(MovimentoOrgaoJulgadorMunicipio)].municipio
-                                            except KeyError:
-                                                MovimentoOrgaoJulgadorMunicipio = MovimentoOrgaoJulgadorMunicipio
-                                                MovimentoOrgaoJulgadorUF = MovimentoOrgaoJulgadorMunicipio
-                                            except ValueError:
-                                                MovimentoOrgaoJulgadorMunicipio = MovimentoOrgaoJulgadorMunicipio
-                                                MovimentoOrgaoJulgadorUF = MovimentoOrgaoJulgadorMunicipio
-                                    if 'tipoDecisao' in k and k['tipoDecisao'] is not None:
-                                        MovimentoTipoDecisao = k['tipoDecisao']
-                                        try:
-                                            MovimentoTipoDecisao = int(MovimentoTipoDecisao)
-                                        except TypeError:
-                                            MovimentoTipoDecisao = MovimentoTipoDecisao
-                                        except ValueError:
-                                            MovimentoTipoDecisao = MovimentoTipoDecisao
-                                        if MovimentoTipoDecisao == 0:
-                                            MovimentoTipoDecisao = 'Monocratica'
-                                        elif MovimentoTipoDecisao == 1:
-                                            MovimentoTipoDecisao = 'Colegiada'
-                                    writer.writerows([
-                                {
-                                 'ProcessoNumero': ProcessoNumero,
-                                 'MovimentoSecundario': MovimentoSecundario,
-                                 'MovimentoDataHora': MovimentoDataHora,
-                                 '5-Movi ID': MovimentoId,
-                                 '1-Grau': ProcessoGrau,
-                                 '4-Sigla Tribunal': ProcessoSiglaTribunal,
-                                 '2-Assunto Primário': ProcessoAssuntoPrimario,
-                                 '2-Assunto Secundário': ProcessoAssuntoSecundario,
-                                 '2-Assunto Terciário': ProcessoAssuntoTerciario,
-                                 '4-Assunto Local': ProcessoAssuntoLocal,
-                                 '2-Assunto Descrição': ProcessoAssuntoDescricao,
-                                 '4-Vinculado': ProcessoVinculado,
-                                 '4-Relação Incidental': ProcessoRelacaoIncidental,
-                                 '4-Prioridade': ProcessoPrioridade,
-                                 '4-Valor Causa': ProcessoValorCausa,
-                                 'ProcessoOrgaoJulgador': ProcessoOrgaoJulgador,
-                                 'ProcessoOrgaoJulgadorTipo': ProcessoOrgaoJulgadorTipo,
-                                 '4-Instância': ProcessoOrgaoJulgadorInstancia,
-                                 '3-Orgão Julgador Município': ProcessoOrgaoJulgadorMunicipio,
-                                 '3-Orgão Julgador UF': ProcessoOrgaoJulgadorUF,
-                                 '4-Competência': ProcessoCompetencia,
-                                 '4-Outros Números': ProcessoOutrosNumeros,
-                                 '1-Classe Primária': ProcessoClassePrimaria,
-                                 '1-Classe Secundária': ProcessoClasseSecundaria,
-                                 '3-Processo Município': ProcessoMunicipio,
-                                 '3-Processo UF': ProcessoUF,
-                                 '4-Nível Sigilo': ProcessoNivelSigilo,
-                                 '4-Intervenção MP': ProcessoIntervencaoMP,
-                                 '4-Tamanho': ProcessoTamanho,
-                                 '4-Data Ajuizamento': ProcessoDataAjuizamento,
-                                 '4-Processo EL': ProcessoEl,
-                                 '4-Sistema': ProcessoSistema,
-                                 '4-Movi Primário': MovimentoPrimario,
-                                 '5-Movi Nível Sigilo': MovimentoNivelSigilo,
-                                 '4-Movi Tipo Respo': MovimentoTipoResponsavel,
-                                 '5-Movi Local': MovimentoLocal,
-                                 '5-Movi Complemento': MovimentoComplemento,
-                                 '5-Movi Cód Comple': MovimentoCodComplemento,
-                                 '5-Movi Doc Vinculado': MovimentoIdDocumentoVinculado,
-                                 '5-Movi Órgão Julgador': MovimentoOrgaoJulgador,
-                                 '5-Movi Órgão Julg Tipo': MovimentoOrgaoJulgadorTipo,
-                                 '5-Movi Órgão Julg Inst': MovimentoOrgaoJulgadorInstancia,
-                                 '5-Movi Órgão Julg Município': MovimentoOrgaoJulgadorMunicipio,
-                                 '5-Movi Órgão Julg UF': MovimentoOrgaoJulgadorUF,
-                                 '5-Movi Tipo Decisão': MovimentoTipoDecisao
-                                 }])
-    print('Arquivo {} gerado com sucesso!'.format(ofile))
+                                    MovimentoTipoDecisao = MovimentoTipoDecisao
+                                if MovimentoTipoDecisao == 0:
+                                    MovimentoTipoDecisao = 'Monocratica'
+                                elif MovimentoTipoDecisao == 1:
+                                    MovimentoTipoDecisao = 'Colegiada'
+                            Eventos.append(Evento(ProcessoNumero=ProcessoNumero,
+                                                  MovimentoSecundario=MovimentoSecundario,
+                                                  MovimentoDataHora=MovimentoDataHora,
+                                                  MovimentoId=MovimentoId,
+                                                  ProcessoGrau=ProcessoGrau,
+                                                  ProcessoSiglaTribunal=ProcessoSiglaTribunal,
+                                                  ProcessoAssuntoPrimario=ProcessoAssuntoPrimario,
+                                                  ProcessoAssuntoSecundario=ProcessoAssuntoSecundario,
+                                                  ProcessoAssuntoTerciario=ProcessoAssuntoTerciario,
+                                                  ProcessoAssuntoLocal=ProcessoAssuntoLocal,
+                                                  ProcessoAssuntoDescricao=ProcessoAssuntoDescricao,
+                                                  ProcessoVinculado=ProcessoVinculado,
+                                                  ProcessoRelacaoIncidental=ProcessoRelacaoIncidental,
+                                                  ProcessoPrioridade=ProcessoPrioridade,
+                                                  ProcessoValorCausa=ProcessoValorCausa,
+                                                  ProcessoOrgaoJulgador=ProcessoOrgaoJulgador,
+                                                  ProcessoOrgaoJulgadorTipo=ProcessoOrgaoJulgadorTipo,
+                                                  ProcessoOrgaoJulgadorInstancia=ProcessoOrgaoJulgadorInstancia,
+                                                  ProcessoOrgaoJulgadorMunicipio=ProcessoOrgaoJulgadorMunicipio,
+                                                  ProcessoOrgaoJulgadorUF=ProcessoOrgaoJulgadorUF,
+                                                  ProcessoCompetencia=ProcessoCompetencia,
+                                                  ProcessoOutrosNumeros=ProcessoOutrosNumeros,
+                                                  ProcessoClassePrimaria=ProcessoClassePrimaria,
+                                                  ProcessoClasseSecundaria=ProcessoClasseSecundaria,
+                                                  ProcessoMunicipio=ProcessoMunicipio,
+                                                  ProcessoUF=ProcessoUF,
+                                                  ProcessoNivelSigilo=ProcessoNivelSigilo,
+                                                  ProcessoIntervencaoMP=ProcessoIntervencaoMP,
+                                                  ProcessoTamanho=ProcessoTamanho,
+                                                  ProcessoDataAjuizamento=ProcessoDataAjuizamento,
+                                                  ProcessoEl=ProcessoEl,
+                                                  ProcessoSistema=ProcessoSistema,
+                                                  MovimentoPrimario=MovimentoPrimario,
+                                                  MovimentoNivelSigilo=MovimentoNivelSigilo,
+                                                  MovimentoTipoResponsavel=MovimentoTipoResponsavel,
+                                                  MovimentoLocal=MovimentoLocal,
+                                                  MovimentoComplemento=MovimentoComplemento,
+                                                  MovimentoCodComplemento=MovimentoCodComplemento,
+                                                  MovimentoIdDocumentoVinculado=MovimentoIdDocumentoVinculado,
+                                                  MovimentoOrgaoJulgador=MovimentoOrgaoJulgador,
+                                                  MovimentoOrgaoJulgadorTipo=MovimentoOrgaoJulgadorTipo,
+                                                  MovimentoOrgaoJulgadorInstancia=MovimentoOrgaoJulgadorInstancia,
+                                                  MovimentoOrgaoJulgadorMunicipio=MovimentoOrgaoJulgadorMunicipio,
+                                                  MovimentoOrgaoJulgadorUF=MovimentoOrgaoJulgadorUF,
+                                                  MovimentoTipoDecisao=MovimentoTipoDecisao))
+                            CodigosMovimentosPrimarios.append(CodigoMovimentoPrimario)
+                    Eventos.codigos = CodigosProcesso(CodigoClasse, CodigoAssuntoPrimario, CodigosMovimentosPrimarios)
+                    contadores['processos_convertidos'] += 1
+                    contadores['eventos'] += len(Eventos)
+                    yield Chaves, Eventos
+                else:
+                    descartes['fora_dos_assuntos'] += 1
+            else:
+                descartes['data_hora_invalida'] += 1
+        else:
+            descartes['sem_numero_ou_movimentos'] += 1
 
 
-if __name__ == '__main__':
+def converte_arquivo(arquivo, writers, tabelas, filtro=None, deduplicacao=None, metricas=None):
+    # Converte os processos de um arquivo JSON, gravando os eventos de cada processo em todos os writers aos quais ele pertence.
+    # 'writers' é um dicionário {assunto: writer}, em que o assunto None representa o arquivo com todos os assuntos.
+    # O tempo e as contagens do arquivo são registrados em 'metricas'; o tempo que não é de leitura nem de gravação é
+    # atribuído às consultas (ver ETAPAS_METRICAS).
+    metricas = metricas if metricas is not None else Metricas()
+    inicio = time.perf_counter()
+    tempos_iniciais = metricas.tempos['leitura_json'], metricas.tempos['gravacao']
+    contadores_iniciais = metricas.contadores['processos_lidos'], metricas.contadores['processos_convertidos'], metricas.contadores['eventos']
+    with metricas.perfila():
+        for chaves, eventos in eventos_processos(arquivo, tabelas, list(writers), filtro, deduplicacao, metricas):
+            with metricas.etapa('gravacao'):
+                for chave in chaves:
+                    writers[chave].grava_eventos(eventos)
+    segundos = time.perf_counter() - inicio
+    metricas.tempos['consultas'] += segundos - (metricas.tempos['leitura_json'] - tempos_iniciais[0]) - (metricas.tempos['gravacao'] - tempos_iniciais[1])
+    metricas.contadores['arquivos_convertidos'] += 1
+    metricas.arquivos.append({'arquivo': arquivo, 'bytes': os.path.getsize(arquivo), 'segundos': round(segundos, 6),
+                              'processos_lidos': metricas.contadores['processos_lidos'] - contadores_iniciais[0],
+                              'processos_convertidos': metricas.contadores['processos_convertidos'] - contadores_iniciais[1],
+                              'eventos': metricas.contadores['eventos'] - contadores_iniciais[2]})
+
+
+# *****************************************************************
+# *** Arquivos de saída do event log (CSV, Parquet e Arrow IPC) ***
+# *****************************************************************
+
+# Extensão dos arquivos gerados em cada formato de saída
+FORMATOS_SAIDA = {'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrows', 'xes': '.xes', 'ocel': '.jsonocel'}
+# Formatos de event log para ferramentas de mineração de processos (ver SaidaXES e SaidaOCEL), que não admitem a saída normalizada
+FORMATOS_EVENT_LOG = ('xes', 'ocel')
+# Configuração dos arquivos de saída: formato (chave de FORMATOS_SAIDA), saída normalizada (ver SaidaNormalizada),
+# se, na saída normalizada, o arquivo plano (uma linha por movimento com todas as colunas) também deve ser gerado
+# se as linhas devem ser ordenadas (ver SaidaOrdenada), com o limite de memória (MB) e a pasta temporária da ordenação,
+# e a compactação dos arquivos finais (chave de COMPRESSOES_SAIDA ou None)
+OpcoesSaida = collections.namedtuple('OpcoesSaida', ['formato', 'normalizado', 'incluir_plano', 'ordenar', 'memoria_ordenacao', 'pasta_ordenacao',
+                                                     'compressao', 'estatisticas'],
+                                     defaults=['csv', False, False, False, 512, None, None, False])
+# Opções que não alteram o conteúdo dos segmentos (e, portanto, não invalidam os segmentos da conversão incremental)
+OPCOES_SAIDA_EXECUCAO = ('memoria_ordenacao', 'pasta_ordenacao', 'compressao')
+# Compactação dos arquivos finais (extensão acrescentada ao nome do arquivo); os segmentos não são compactados.
+# Somente os formatos de texto (FORMATOS_TEXTO) admitem a compactação, pois Parquet e Arrow têm compactação própria.
+COMPRESSOES_SAIDA = {'gz': '.gz', 'bz2': '.bz2', 'zst': '.zst'}
+FORMATOS_TEXTO = ('csv', 'xes', 'ocel')
+# Tamanho dos blocos entregues à thread de compactação e quantidade máxima de blocos aguardando a compactação
+TAMANHO_BLOCO_COMPACTACAO = 1 << 20
+BLOCOS_FILA_COMPACTACAO = 8
+# Extensão dos segmentos das conversões paralela e incremental quando a saída é ordenada ou é um event log (ver SaidaPickle)
+EXTENSAO_SEGMENTO_PICKLE = '.pickle'
+# Colunas gravadas como data/hora (timestamp) nos formatos Parquet e Arrow; as demais são texto codificado em dicionário
+CAMPOS_DATA_HORA = ('MovimentoDataHora', '4-Data Ajuizamento')
+# Quantidade de linhas de cada row group (Parquet) ou lote (Arrow) gravado durante a conversão
+TAMANHO_LOTE_ARROW = 100000
+# Nas saídas Arrow e Parquet, cada coluna de CAMPOS_DATA_HORA é seguida de uma coluna de texto com o valor que não pôde ser
+# lido como data/hora (nula quando a leitura é bem-sucedida), para que nenhum valor gravado no CSV seja perdido
+SUFIXO_TEXTO_DATA_HORA = ' (texto)'
+
+
+def abre_saida(arquivo, opcoes, segmento=False):
+    # Abre o arquivo de saída com as opções (OpcoesSaida) informadas. Os segmentos das conversões paralela e incremental
+    # são abertos com 'segmento' verdadeiro: sem cabeçalho, para que possam ser concatenados no CSV final, ou, na saída
+    # ordenada e nos formatos XES e OCEL, com as linhas serializadas (ver SaidaPickle), para que sejam ordenadas ou
+    # agrupadas em traces junto com as demais no arquivo final.
+    # Com 'estatisticas', as estatísticas dos eventos gravados também são acumuladas (ver SaidaEstatisticas).
+    if opcoes.normalizado:
+        saida = SaidaNormalizada(arquivo, opcoes, segmento)
+    else:
+        saida = abre_tabela_saida(arquivo, opcoes, segmento)
+    if opcoes.estatisticas:
+        return SaidaEstatisticas(saida, arquivo, opcoes, segmento)
+    return saida
+
+
+def abre_tabela_saida(arquivo, opcoes, segmento=False, colunas=CAMPOS_CSV):
+    if segmento and (opcoes.ordenar or opcoes.formato in FORMATOS_EVENT_LOG):
+        return SaidaPickle(arquivo)
+    compressao = None if segmento else opcoes.compressao
+    if compressao is not None:
+        arquivo = arquivo_compactado_saida(arquivo, opcoes)
+    campos_ordenacao = CAMPOS_ORDENACAO
+    if opcoes.formato in FORMATOS_EVENT_LOG:
+        saida = SaidaXES(arquivo, compressao) if opcoes.formato == 'xes' else SaidaOCEL(arquivo, compressao)
+        campos_ordenacao = CAMPOS_ORDENACAO_TRACES
+    elif opcoes.formato == 'parquet':
+        saida = SaidaParquet(arquivo, colunas)
+    elif opcoes.formato == 'arrow':
+        saida = SaidaArrow(arquivo, colunas)
+    else:
+        saida = SaidaCSV(arquivo, not segmento, colunas, compressao)
+    if opcoes.ordenar:
+        return SaidaOrdenada(saida, colunas, opcoes.memoria_ordenacao, opcoes.pasta_ordenacao, campos_ordenacao)
+    return saida
+
+
+def extensao_segmento(opcoes):
+    if opcoes.ordenar or opcoes.formato in FORMATOS_EVENT_LOG:
+        return EXTENSAO_SEGMENTO_PICKLE
+    return FORMATOS_SAIDA[opcoes.formato]
+
+
+def arquivos_normalizados(arquivo):
+    # Arquivos de processos e de movimentos da saída normalizada: {nome}_processos{extensão} e {nome}_movimentos{extensão}
+    nome, extensao = os.path.splitext(arquivo)
+    return nome + '_processos' + extensao, nome + '_movimentos' + extensao
+
+
+def arquivos_saida(arquivo, opcoes, segmento=False):
+    # Arquivos efetivamente gravados por abre_saida(arquivo, opcoes, segmento), sem a extensão da compactação (ver arquivo_compactado_saida)
+    if not opcoes.normalizado:
+        arquivos = [arquivo]
+    else:
+        arquivos = ([arquivo] if opcoes.incluir_plano else []) + list(arquivos_normalizados(arquivo))
+    if opcoes.estatisticas:
+        arquivos += arquivos_estatisticas(arquivo, segmento)
+    return arquivos
+
+
+def arquivo_compactado_saida(arquivo, opcoes):
+    # Nome do arquivo final gravado, acrescido da extensão da compactação, se houver
+    return arquivo + COMPRESSOES_SAIDA[opcoes.compressao] if opcoes.compressao is not None else arquivo
+
+
+def compactador(compressao):
+    if compressao == 'gz':
+        return zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    if compressao == 'bz2':
+        return bz2.BZ2Compressor()
+    return importa_zstandard().ZstdCompressor().compressobj()
+
+
+class ArquivoCompactado(io.RawIOBase):
+    # Arquivo binário compactado por uma thread separada: os blocos gravados são enfileirados e compactados em paralelo com
+    # a conversão (zlib, bz2 e zstandard liberam o GIL durante a compactação). A fila é limitada a BLOCOS_FILA_COMPACTACAO blocos,
+    # para que a memória não cresça quando a compactação for mais lenta que a conversão. Um erro da compactação é relançado
+    # na gravação seguinte ou no fechamento do arquivo.
+
+    def __init__(self, arquivo, compressao):
+        super().__init__()
+        self.compactador = compactador(compressao)
+        self.arquivo = open(arquivo, 'wb')
+        self.fila = queue.Queue(BLOCOS_FILA_COMPACTACAO)
+        self.erro = None
+        self.thread = threading.Thread(target=self.compacta, daemon=True)
+        self.thread.start()
+
+    def compacta(self):
+        try:
+            while True:
+                bloco = self.fila.get()
+                if bloco is None:
+                    break
+                self.arquivo.write(self.compactador.compress(bloco))
+            self.arquivo.write(self.compactador.flush())
+        except BaseException as erro:
+            self.erro = erro
+            # Esvazia a fila até o fechamento, para que as gravações pendentes não fiquem bloqueadas
+            while bloco is not None:
+                bloco = self.fila.get()
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        if self.erro is not None:
+            raise self.erro
+        self.fila.put(bytes(dados))
+        return len(dados)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self.fila.put(None)
+            self.thread.join()
+            self.arquivo.close()
+        finally:
+            super().close()
+        if self.erro is not None:
+            raise self.erro
+
+
+def abre_arquivo_saida(arquivo, compressao=None, newline=None):
+    # Abre um arquivo de texto (UTF-8) para gravação, compactado por uma thread separada quando 'compressao' for informada
+    if compressao is None:
+        return open(arquivo, 'w', newline=newline, encoding='utf8')
+    return io.TextIOWrapper(io.BufferedWriter(ArquivoCompactado(arquivo, compressao), TAMANHO_BLOCO_COMPACTACAO),
+                            encoding='utf8', newline=newline)
+
+
+class SaidaCSV:
+    def __init__(self, arquivo, cabecalho=True, colunas=CAMPOS_CSV, compressao=None):
+        self.csvfile = abre_arquivo_saida(arquivo, compressao, newline='')
+        writer = csv.writer(self.csvfile)
+        if cabecalho:
+            writer.writerow(colunas)
+        self.writerow = writer.writerow
+        self.grava_eventos = writer.writerows
+
+    def anexa_segmento(self, segmento):
+        with open(segmento, 'r', newline='', encoding='utf8') as parcial:
+            shutil.copyfileobj(parcial, self.csvfile)
+
+    def close(self):
+        self.csvfile.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.close()
+
+
+def importa_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('Os formatos de saída parquet e arrow requerem o pacote pyarrow (pip install pyarrow)')
+    return pyarrow
+
+
+class SaidaArrow:
+    # Grava as linhas em formato Arrow IPC (stream) em lotes de TAMANHO_LOTE_ARROW linhas, à medida que a conversão avança.
+    # As colunas de texto são codificadas em dicionário, pois repetem os mesmos valores em todos os movimentos de um processo,
+    # e as colunas de CAMPOS_DATA_HORA são gravadas como timestamp. Os valores fora do padrão AAAA-MM-DDThh:mm:ss ficam nulos
+    # no timestamp e são mantidos como texto na coluna seguinte (SUFIXO_TEXTO_DATA_HORA).
+    # Os valores das demais colunas são gravados como o texto que seria gravado no CSV.
+    # O formato stream é utilizado porque cada lote tem o seu próprio dicionário, o que o formato file do Arrow não admite.
+
+    def __init__(self, arquivo, colunas=CAMPOS_CSV):
+        self.pa = importa_pyarrow()
+        self.colunas = colunas
+        texto = self.pa.dictionary(self.pa.int32(), self.pa.string())
+        campos = []
+        for campo in colunas:
+            if campo in CAMPOS_DATA_HORA:
+                campos.extend([(campo, self.pa.timestamp('s')), (campo + SUFIXO_TEXTO_DATA_HORA, texto)])
+            else:
+                campos.append((campo, texto))
+        self.schema = self.pa.schema(campos)
+        self.linhas = []
+        self.writer = self.abre_writer(arquivo)
+
+    def abre_writer(self, arquivo):
+        return self.pa.ipc.new_stream(arquivo, self.schema)
+
+    def le_lotes(self, segmento):
+        with self.pa.ipc.open_stream(segmento) as reader:
+            for lote in reader:
+                yield lote
+
+    def writerow(self, linha):
+        self.linhas.append(linha)
+        if len(self.linhas) >= TAMANHO_LOTE_ARROW:
+            self.grava_lote()
+
+    def grava_eventos(self, linhas):
+        self.linhas.extend(linhas)
+        if len(self.linhas) >= TAMANHO_LOTE_ARROW:
+            self.grava_lote()
+
+    def grava_lote(self):
+        if not self.linhas:
+            return
+        pa = self.pa
+        colunas = []
+        for campo, valores in zip(self.colunas, zip(*self.linhas)):
+            textos = pa.array([None if valor is None else str(valor) for valor in valores], pa.string())
+            if campo in CAMPOS_DATA_HORA:
+                # strptime aceita campos com menos dígitos (como os segundos de '2019-05-10T00:00:0'), que seriam gravados
+                # com um valor diferente do texto do CSV: somente os valores no padrão completo são lidos como data/hora
+                completos = pa.compute.match_substring_regex(textos, '^' + PADRAO_DATA_HORA_LOG.pattern)
+                datas = pa.compute.strptime(pa.compute.if_else(completos, textos, pa.scalar(None, pa.string())),
+                                            format='%Y-%m-%dT%H:%M:%S', unit='s', error_is_null=True)
+                colunas.append(datas)
+                colunas.append(pa.compute.if_else(datas.is_null(), textos, pa.scalar(None, pa.string())).dictionary_encode())
+            else:
+                colunas.append(textos.dictionary_encode())
+        self.writer.write_table(pa.Table.from_arrays(colunas, schema=self.schema))
+        self.linhas = []
+
+    def anexa_segmento(self, segmento):
+        self.grava_lote()
+        for lote in self.le_lotes(segmento):
+            self.writer.write_table(self.pa.Table.from_batches([lote]).cast(self.schema))
+
+    def close(self):
+        self.grava_lote()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.close()
+
+
+class SaidaParquet(SaidaArrow):
+    # Grava as linhas em formato Parquet: cada lote de TAMANHO_LOTE_ARROW linhas é gravado como um row group.
+
+    def abre_writer(self, arquivo):
+        return self.pa.parquet.ParquetWriter(arquivo, self.schema)
+
+    def le_lotes(self, segmento):
+        return self.pa.parquet.ParquetFile(segmento).iter_batches(batch_size=TAMANHO_LOTE_ARROW)
+
+
+class SaidaProcessos:
+    # Tabela de processos da saída normalizada: grava somente a primeira linha de cada processo (CAMPOS_CHAVE_PROCESSO), para
+    # que a tabela tenha uma linha por chave mesmo quando o processo se repete nos arquivos JSON (as junções com a tabela de
+    # movimentos não multiplicam as linhas). As chaves já gravadas são mantidas em memória. Os segmentos da tabela são sempre
+    # serializados (SaidaPickle) e filtrados quando anexados, de modo que as conversões serial, paralela e incremental mantêm
+    # a mesma linha de cada processo.
+
+    def __init__(self, saida):
+        self.saida = saida
+        self.chaves = set()
+
+    def writerow(self, linha):
+        chave = chave_linha_processo(linha)
+        if chave not in self.chaves:
+            self.chaves.add(chave)
+            self.saida.writerow(linha)
+
+    def grava_eventos(self, linhas):
+        for linha in linhas:
+            self.writerow(linha)
+
+    def anexa_segmento(self, segmento):
+        for linhas in le_lotes_pickle(segmento):
+            self.grava_eventos(linhas)
+
+    def close(self):
+        self.saida.close()
+
+
+class SaidaNormalizada:
+    # Saída normalizada: em vez de repetir as colunas do processo em todos os seus movimentos, grava uma tabela de processos,
+    # com uma linha por processo (COLUNAS_PROCESSO, ver SaidaProcessos), e uma tabela de movimentos, com uma linha por movimento
+    # contendo somente a chave do processo (CAMPOS_CHAVE_PROCESSO) e as colunas do movimento (COLUNAS_MOVIMENTO); ver
+    # arquivos_normalizados. Com 'incluir_plano' verdadeiro, o arquivo plano (com todas as colunas) também é gravado.
+
+    def __init__(self, arquivo, opcoes, segmento=False):
+        arquivo_processos, arquivo_movimentos = arquivos_normalizados(arquivo)
+        self.opcoes = opcoes
+        self.saidas = []
+        try:
+            self.plano = abre_tabela_saida(arquivo, opcoes, segmento) if opcoes.incluir_plano else None
+            if self.plano is not None:
+                self.saidas.append((self.plano, arquivo))
+            if segmento:
+                self.processos = SaidaPickle(arquivo_processos)
+            else:
+                self.processos = SaidaProcessos(abre_tabela_saida(arquivo_processos, opcoes, colunas=COLUNAS_PROCESSO))
+            self.saidas.append((self.processos, arquivo_processos))
+            self.movimentos = abre_tabela_saida(arquivo_movimentos, opcoes, segmento, COLUNAS_MOVIMENTO)
+            self.saidas.append((self.movimentos, arquivo_movimentos))
+        except BaseException:
+            self.close()
+            raise
+
+    def grava_eventos(self, eventos):
+        # Recebe todos os eventos de um mesmo processo (ver eventos_processos)
+        if not eventos:
+            return
+        self.processos.writerow(linha_processo(eventos[0]))
+        self.movimentos.grava_eventos(map(linha_movimento, eventos))
+        if self.plano is not None:
+            self.plano.grava_eventos(eventos)
+
+    def anexa_segmento(self, segmento):
+        for (saida, arquivo), parcial in zip(self.saidas, arquivos_saida(segmento, self.opcoes._replace(estatisticas=False))):
+            saida.anexa_segmento(parcial)
+
+    def close(self):
+        for saida, arquivo in self.saidas:
+            saida.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.close()
+
+
+# ****************************************************************************************
+# *** Event logs para ferramentas de mineração de processos (IEEE XES e OCEL 2.0 JSON) ***
+# ****************************************************************************************
+
+# Cada processo (CAMPOS_CHAVE_PROCESSO) é um trace (XES) ou um objeto do tipo TIPO_OBJETO_OCEL (OCEL), identificado por
+# numero|grau|tribunal (ver identificador_trace), e cada movimento é um evento com a atividade MovimentoSecundario e a
+# data/hora MovimentoDataHora. As colunas do processo são atributos do trace (ou do objeto) e as demais colunas do movimento
+# são atributos do evento, com os nomes das colunas do CSV.
+INDICES_CHAVE_TRACE = [Evento._fields.index(campo) for campo in CAMPOS_CHAVE_PROCESSO]
+ATRIBUTOS_TRACE = [(Evento._fields.index(campo), CAMPOS_CSV[Evento._fields.index(campo)]) for campo in CAMPOS_PROCESSO]
+ATRIBUTOS_EVENTO_LOG = [(Evento._fields.index(campo), CAMPOS_CSV[Evento._fields.index(campo)]) for campo in Evento._fields
+                        if campo.startswith('Movimento') and campo not in ('MovimentoSecundario', 'MovimentoDataHora')]
+INDICE_ATIVIDADE = Evento._fields.index('MovimentoSecundario')
+INDICE_DATA_HORA = Evento._fields.index('MovimentoDataHora')
+TIPO_OBJETO_OCEL = 'processo'
+# Datas/horas no padrão gravado por formata_datas_movimentos (AAAA-MM-DDThh:mm:ss), gravadas com o tipo data nos event logs
+PADRAO_DATA_HORA_LOG = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}$')
+# Caracteres de controle não admitidos em documentos XML 1.0
+CARACTERES_INVALIDOS_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def chave_trace(linha):
+    return tuple([linha[i] for i in INDICES_CHAVE_TRACE])
+
+
+def identificador_trace(linha):
+    # O número não basta para identificar o caso: o mesmo processo tem um trace no primeiro e outro no segundo grau
+    return '|'.join(str(valor) for valor in chave_trace(linha))
+
+
+def atividade_log(evento):
+    # A atividade é sempre um texto: quando o movimento não é encontrado na tabela, MovimentoSecundario mantém o código
+    # numérico do movimento, que seria gravado como inteiro no XES (contrariando o global e o classificador concept:name)
+    # e no OCEL (cujos tipos de evento devem ser textos)
+    valor = evento[INDICE_ATIVIDADE]
+    return valor if valor is None else str(valor)
+
+
+def data_hora_log(valor):
+    return isinstance(valor, str) and PADRAO_DATA_HORA_LOG.match(valor) is not None
+
+
+def atributo_xes(chave, valor, data=False):
+    # Atributo XES tipado conforme o valor; valores ausentes não são gravados
+    if valor is None or valor == '':
+        return ''
+    if isinstance(valor, bool):
+        tipo, valor = 'boolean', 'true' if valor else 'false'
+    elif isinstance(valor, int):
+        tipo = 'int'
+    elif isinstance(valor, float):
+        tipo = 'float'
+    elif data and data_hora_log(valor):
+        tipo = 'date'
+    else:
+        tipo = 'string'
+    valor = CARACTERES_INVALIDOS_XML.sub('', str(valor))
+    return '<{} key={} value={}/>'.format(tipo, xml.sax.saxutils.quoteattr(chave), xml.sax.saxutils.quoteattr(valor))
+
+
+class SaidaTraces:
+    # Base das saídas XES e OCEL: as linhas recebidas são agrupadas em traces (linhas consecutivas do mesmo processo), que são
+    # gravados à medida que são completados, sem acumular o event log em memória. Os eventos de um processo chegam juntos
+    # (ver eventos_processos) ou, na saída ordenada, em linhas consecutivas (ver CAMPOS_ORDENACAO_TRACES).
+
+    def __init__(self):
+        self.chave = None
+        self.eventos = []
+
+    def writerow(self, linha):
+        chave = chave_trace(linha)
+        if chave != self.chave:
+            self.fecha_trace()
+            self.chave = chave
+        self.eventos.append(linha)
+
+    def grava_eventos(self, linhas):
+        for linha in linhas:
+            self.writerow(linha)
+
+    def anexa_segmento(self, segmento):
+        for linhas in le_lotes_pickle(segmento):
+            self.grava_eventos(linhas)
+
+    def fecha_trace(self):
+        if self.eventos:
+            self.grava_trace(self.eventos)
+        self.chave = None
+        self.eventos = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.close()
+
+
+class SaidaXES(SaidaTraces):
+    # Event log no padrão IEEE XES (1849-2016): um trace por processo (concept:name = numero|grau|tribunal) e um evento por
+    # movimento (concept:name = MovimentoSecundario, time:timestamp = MovimentoDataHora)
+
+    def __init__(self, arquivo, compressao=None):
+        super().__init__()
+        self.arquivo = abre_arquivo_saida(arquivo, compressao)
+        self.arquivo.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                           '<log xes.version="1849-2016" xes.features="" xmlns="http://www.xes-standard.org/">\n'
+                           '<extension name="Concept" prefix="concept" uri="http://www.xes-standard.org/concept.xesext"/>\n'
+                           '<extension name="Time" prefix="time" uri="http://www.xes-standard.org/time.xesext"/>\n'
+                           '<global scope="trace"><string key="concept:name" value="__INVALID__"/></global>\n'
+                           '<global scope="event"><string key="concept:name" value="__INVALID__"/></global>\n'
+                           '<classifier name="Movimento" keys="concept:name"/>\n')
+
+    def grava_trace(self, eventos):
+        processo = eventos[0]
+        partes = ['<trace>', atributo_xes('concept:name', identificador_trace(processo))]
+        partes.extend(atributo_xes(coluna, processo[i], coluna in CAMPOS_DATA_HORA) for i, coluna in ATRIBUTOS_TRACE)
+        for evento in eventos:
+            partes.append('\n<event>')
+            partes.append(atributo_xes('concept:name', atividade_log(evento)))
+            partes.append(atributo_xes('time:timestamp', evento[INDICE_DATA_HORA], True))
+            partes.extend(atributo_xes(coluna, evento[i]) for i, coluna in ATRIBUTOS_EVENTO_LOG)
+            partes.append('</event>')
+        partes.append('\n</trace>\n')
+        self.arquivo.write(''.join(partes))
+
+    def close(self):
+        try:
+            self.fecha_trace()
+            self.arquivo.write('</log>\n')
+        finally:
+            self.arquivo.close()
+
+
+class SaidaOCEL(SaidaTraces):
+    # Event log no padrão OCEL 2.0 (JSON): um objeto do tipo TIPO_OBJETO_OCEL por processo (identificado por numero|grau|tribunal,
+    # como em chave_processo) e um evento por movimento relacionado ao objeto do seu processo. Os eventos e os objetos são
+    # gravados à medida que os traces são completados em dois arquivos temporários ao lado do arquivo final, concatenados no
+    # fechamento, quando os tipos de evento (atividades) já são conhecidos. Os movimentos sem data/hora válida não são gravados,
+    # pois o padrão exige a data/hora de cada evento. Somente os identificadores dos objetos gravados são mantidos em memória.
+
+    def __init__(self, arquivo, compressao=None):
+        super().__init__()
+        self.nome = arquivo
+        self.compressao = compressao
+        self.objetos = open(arquivo + '.objetos.tmp', 'w', encoding='utf8')
+        self.eventos_ocel = open(arquivo + '.eventos.tmp', 'w', encoding='utf8')
+        self.identificadores = set()
+        self.atividades = set()
+        self.quantidade_eventos = 0
+
+    @staticmethod
+    def atributos(atributos, linha, objeto=False):
+        # Os valores são gravados como o texto que seria gravado no CSV; os atributos dos objetos não variam no tempo
+        registros = []
+        for i, coluna in atributos:
+            if linha[i] is None or linha[i] == '':
+                continue
+            registro = {'name': coluna, 'value': str(linha[i])}
+            if objeto:
+                registro['time'] = '1970-01-01T00:00:00'
+            registros.append(registro)
+        return registros
+
+    def grava_trace(self, eventos):
+        processo = eventos[0]
+        identificador = identificador_trace(processo)
+        if identificador not in self.identificadores:
+            self.identificadores.add(identificador)
+            objeto = {'id': identificador, 'type': TIPO_OBJETO_OCEL,
+                      'attributes': self.atributos(ATRIBUTOS_TRACE, processo, True), 'relationships': []}
+            self.objetos.write((',\n' if len(self.identificadores) > 1 else '') + json.dumps(objeto, ensure_ascii=False))
+        for evento in eventos:
+            if not data_hora_log(evento[INDICE_DATA_HORA]):
+                continue
+            self.quantidade_eventos += 1
+            atividade = atividade_log(evento)
+            self.atividades.add(atividade)
+            registro = {'id': 'e{}'.format(self.quantidade_eventos), 'type': atividade, 'time': evento[INDICE_DATA_HORA],
+                        'attributes': self.atributos(ATRIBUTOS_EVENTO_LOG, evento),
+                        'relationships': [{'objectId': identificador, 'qualifier': TIPO_OBJETO_OCEL}]}
+            self.eventos_ocel.write((',\n' if self.quantidade_eventos > 1 else '') + json.dumps(registro, ensure_ascii=False))
+
+    def close(self):
+        try:
+            self.fecha_trace()
+        finally:
+            self.objetos.close()
+            self.eventos_ocel.close()
+        try:
+            tipos_objeto = [{'name': TIPO_OBJETO_OCEL, 'attributes': [{'name': coluna, 'type': 'string'} for i, coluna in ATRIBUTOS_TRACE]}]
+            tipos_evento = [{'name': atividade, 'attributes': [{'name': coluna, 'type': 'string'} for i, coluna in ATRIBUTOS_EVENTO_LOG]}
+                            for atividade in sorted(self.atividades, key=str)]
+            with abre_arquivo_saida(self.nome, self.compressao) as f:
+                f.write('{{"objectTypes": {},\n"eventTypes": {},\n"objects": [\n'.format(json.dumps(tipos_objeto, ensure_ascii=False),
+                                                                                          json.dumps(tipos_evento, ensure_ascii=False)))
+                with open(self.objetos.name, 'r', encoding='utf8') as parcial:
+                    shutil.copyfileobj(parcial, f)
+                f.write('\n],\n"events": [\n')
+                with open(self.eventos_ocel.name, 'r', encoding='utf8') as parcial:
+                    shutil.copyfileobj(parcial, f)
+                f.write('\n]}\n')
+        finally:
+            os.remove(self.objetos.name)
+            os.remove(self.eventos_ocel.name)
+
+
+# *****************************************************************************************************
+# *** Estatísticas agregadas dos event logs, acumuladas durante a conversão (sem reler os arquivos) ***
+# *****************************************************************************************************
+
+# Dimensões das estatísticas: (nome, campo do Evento, coluna). Para cada valor de cada dimensão são contadas as ocorrências
+# de processos com ao menos um movimento com o valor e os movimentos com o valor. Um processo repetido nos arquivos JSON é
+# contado uma vez por ocorrência (com deduplicação, uma única vez). Nas dimensões de processo (DIMENSOES_PROCESSO), todos os
+# movimentos da ocorrência têm o mesmo valor e também são acumuladas as durações das ocorrências (do primeiro ao último
+# movimento). Na dimensão 'mes', o valor é o mês do movimento (AAAA-MM).
+DIMENSOES_ESTATISTICAS = [('tribunal', 'ProcessoSiglaTribunal', '4-Sigla Tribunal'),
+                          ('classe', 'ProcessoClasseSecundaria', '1-Classe Secundária'),
+                          ('assunto', 'ProcessoAssuntoPrimario', '2-Assunto Primário'),
+                          ('movimento', 'MovimentoPrimario', '4-Movi Primário'),
+                          ('mes', 'MovimentoDataHora', 'Mes')]
+DIMENSOES_PROCESSO = ('tribunal', 'classe', 'assunto')
+# Dimensões contadas pelos códigos SGT (ver CodigosProcesso), cujas tabelas trazem o código e a descrição gravada no event log
+DIMENSOES_CODIGOS = ('classe', 'assunto', 'movimento')
+CAMPOS_DIMENSOES = {dimensao: campo for dimensao, campo, coluna in DIMENSOES_ESTATISTICAS}
+COLUNA_CODIGO_ESTATISTICAS = 'Codigo'
+COLUNAS_ESTATISTICAS = ['OcorrenciasProcessos', 'Movimentos']
+COLUNAS_DURACAO = ['DuracaoMediaDias', 'DuracaoMinimaDias', 'DuracaoMaximaDias']
+# Extensão das estatísticas gravadas junto com cada segmento das conversões paralela e incremental
+EXTENSAO_ESTATISTICAS = '.estatisticas'
+SEGUNDOS_DIA = 86400
+
+
+class Estatisticas:
+    # Contadores compactos das estatísticas de um event log, indexados por códigos inteiros: os códigos SGT da classe, do
+    # assunto primário e do movimento primário (ver CodigosProcesso), o mês como o inteiro AAAAMM e, por não haver tabela
+    # de códigos de tribunais, a sigla do tribunal. Os contadores de cada dimensão são dicionários
+    # {código: [ocorrências de processos, movimentos]}, acrescidos de [soma, mínimo, máximo] das durações (em dias) nas
+    # dimensões de processo. A descrição de cada código (o valor gravado no event log) é guardada uma única vez e somente
+    # associada aos contadores na gravação das tabelas. As estatísticas de cada worker ou de cada segmento são combinadas
+    # por soma, pois os códigos são os mesmos em todas as instâncias.
+
+    def __init__(self):
+        self.descricoes = {dimensao: {} for dimensao in DIMENSOES_CODIGOS}
+        self.contadores = {dimensao: {} for dimensao, campo, coluna in DIMENSOES_ESTATISTICAS}
+
+    def acumula(self, eventos):
+        # Acumula os eventos de uma ocorrência de processo (todos os movimentos gerados para ela, ver eventos_processos)
+        if not eventos:
+            return
+        processo = eventos[0]
+        codigos = getattr(eventos, 'codigos', None)
+        if codigos is None:
+            # Eventos gerados fora de eventos_processos, sem os códigos SGT: as descrições são utilizadas como códigos
+            codigos = CodigosProcesso(processo.ProcessoClasseSecundaria, processo.ProcessoAssuntoPrimario,
+                                      [evento.MovimentoPrimario for evento in eventos])
+        datas = [evento.MovimentoDataHora for evento in eventos]
+        inicio, fim = min(datas), max(datas)
+        duracao = (datetime.datetime.fromisoformat(fim) - datetime.datetime.fromisoformat(inicio)).total_seconds() / SEGUNDOS_DIA
+        quantidade = len(eventos)
+        self.descreve('classe', codigos.classe, processo.ProcessoClasseSecundaria)
+        self.descreve('assunto', codigos.assunto, processo.ProcessoAssuntoPrimario)
+        for dimensao, codigo in (('tribunal', processo.ProcessoSiglaTribunal), ('classe', codigos.classe), ('assunto', codigos.assunto)):
+            contadores = self.contadores[dimensao]
+            contador = contadores.get(codigo)
+            if contador is None:
+                contadores[codigo] = [1, quantidade, duracao, duracao, duracao]
+            else:
+                contador[0] += 1
+                contador[1] += quantidade
+                contador[2] += duracao
+                if duracao < contador[3]:
+                    contador[3] = duracao
+                if duracao > contador[4]:
+                    contador[4] = duracao
+        movimentos = collections.Counter(codigos.movimentos)
+        if not movimentos.keys() <= self.descricoes['movimento'].keys():
+            for codigo, evento in zip(codigos.movimentos, eventos):
+                self.descreve('movimento', codigo, evento.MovimentoPrimario)
+        self.soma_movimentos('movimento', movimentos)
+        self.soma_movimentos('mes', collections.Counter(int(data[0:4]) * 100 + int(data[5:7]) for data in datas))
+
+    def descreve(self, dimensao, codigo, descricao):
+        # Guarda a descrição do código na primeira vez em que ele é encontrado
+        descricoes = self.descricoes[dimensao]
+        if codigo not in descricoes:
+            descricoes[codigo] = descricao
+
+    def soma_movimentos(self, dimensao, quantidades):
+        # Acrescenta uma ocorrência de processo a cada código de 'quantidades' ({código: movimentos da ocorrência com o código})
+        contadores = self.contadores[dimensao]
+        for codigo, quantidade in quantidades.items():
+            contador = contadores.get(codigo)
+            if contador is None:
+                contadores[codigo] = [1, quantidade]
+            else:
+                contador[0] += 1
+                contador[1] += quantidade
+
+    def soma(self, outras):
+        for dimensao, descricoes in outras.descricoes.items():
+            for codigo, descricao in descricoes.items():
+                self.descreve(dimensao, codigo, descricao)
+        for dimensao, contadores in self.contadores.items():
+            for codigo, outro in outras.contadores[dimensao].items():
+                contador = contadores.get(codigo)
+                if contador is None:
+                    contadores[codigo] = list(outro)
+                    continue
+                contador[0] += outro[0]
+                contador[1] += outro[1]
+                if len(contador) > 2:
+                    contador[2] += outro[2]
+                    contador[3] = min(contador[3], outro[3])
+                    contador[4] = max(contador[4], outro[4])
+
+    def dados(self):
+        # Descrições e contadores como tipos simples (dicionários e listas), serializados nos segmentos em vez da própria
+        # instância, para que os segmentos gerados pela linha de comando (módulo __main__) também possam ser lidos quando
+        # o script é importado como biblioteca, e vice-versa
+        return {'descricoes': self.descricoes, 'contadores': self.contadores}
+
+    @classmethod
+    def de_dados(cls, dados):
+        estatisticas = cls()
+        estatisticas.descricoes = {dimensao: dict(dados['descricoes'].get(dimensao, {})) for dimensao in estatisticas.descricoes}
+        estatisticas.contadores = {dimensao: dict(dados['contadores'].get(dimensao, {})) for dimensao in estatisticas.contadores}
+        return estatisticas
+
+    def linhas(self, dimensao):
+        # Linhas da tabela da dimensão, ordenadas pelo código: o código e a descrição (nas dimensões de DIMENSOES_CODIGOS) ou
+        # o valor, ocorrências de processos, movimentos e, nas dimensões de processo, as durações média, mínima e máxima das
+        # ocorrências (em dias)
+        linhas = []
+        for codigo in sorted(self.contadores[dimensao], key=valor_ordenacao):
+            contador = self.contadores[dimensao][codigo]
+            if dimensao == 'mes':
+                linha = ['{:04d}-{:02d}'.format(*divmod(codigo, 100))]
+            elif dimensao in DIMENSOES_CODIGOS:
+                linha = [codigo, self.descricoes[dimensao].get(codigo)]
+            else:
+                linha = [codigo]
+            linha += [contador[0], contador[1]]
+            if len(contador) > 2:
+                linha += [round(contador[2] / contador[0], 2), round(contador[3], 2), round(contador[4], 2)]
+            linhas.append(linha)
+        return linhas
+
+    def grava(self, arquivo, compressao=None):
+        # Grava uma tabela CSV por dimensão (ver arquivos_estatisticas)
+        for (dimensao, campo, coluna), tabela in zip(DIMENSOES_ESTATISTICAS, arquivos_estatisticas(arquivo)):
+            with abre_arquivo_saida(tabela if compressao is None else tabela + COMPRESSOES_SAIDA[compressao], compressao, newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(([COLUNA_CODIGO_ESTATISTICAS] if dimensao in DIMENSOES_CODIGOS else []) + [coluna] +
+                                COLUNAS_ESTATISTICAS + (COLUNAS_DURACAO if dimensao in DIMENSOES_PROCESSO else []))
+                writer.writerows(self.linhas(dimensao))
+
+
+def arquivos_estatisticas(arquivo, segmento=False):
+    # Arquivos das estatísticas do event log 'arquivo': as tabelas {nome}_estatisticas_{dimensão}.csv ou, nos segmentos,
+    # as estatísticas serializadas do segmento ({segmento}.estatisticas)
+    if segmento:
+        return [arquivo + EXTENSAO_ESTATISTICAS]
+    nome = os.path.splitext(arquivo)[0]
+    return ['{}_estatisticas_{}.csv'.format(nome, dimensao) for dimensao, campo, coluna in DIMENSOES_ESTATISTICAS]
+
+
+class SaidaEstatisticas:
+    # Acrescenta a uma saída (ver abre_saida) as estatísticas dos eventos gravados nela. Nos segmentos, as estatísticas são
+    # serializadas junto com o segmento e, no arquivo final, somadas às dos eventos gravados diretamente quando o segmento
+    # é anexado, de modo que as conversões serial, paralela e incremental geram as mesmas estatísticas.
+
+    def __init__(self, saida, arquivo, opcoes, segmento=False):
+        self.saida = saida
+        self.arquivo = arquivo
+        self.compressao = None if segmento else opcoes.compressao
+        self.segmento = segmento
+        self.estatisticas = Estatisticas()
+
+    def grava_eventos(self, eventos):
+        self.saida.grava_eventos(eventos)
+        self.estatisticas.acumula(eventos)
+
+    def anexa_segmento(self, segmento):
+        self.saida.anexa_segmento(segmento)
+        with open(arquivos_estatisticas(segmento, segmento=True)[0], 'rb') as f:
+            self.estatisticas.soma(Estatisticas.de_dados(pickle.load(f)))
+
+    def close(self):
+        self.saida.close()
+        if self.segmento:
+            with open(arquivos_estatisticas(self.arquivo, segmento=True)[0], 'wb') as f:
+                pickle.dump(self.estatisticas.dados(), f, protocol=pickle.HIGHEST_PROTOCOL)
+        else:
+            self.estatisticas.grava(self.arquivo, self.compressao)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.close()
+
+
+# ***************************************************************************************************
+# *** Ordenação externa das linhas geradas (por processo, data/hora e identificador do movimento) ***
+# ***************************************************************************************************
+
+# Colunas que definem a ordem das linhas na saída ordenada (as ausentes em uma tabela são ignoradas)
+CAMPOS_ORDENACAO = ('ProcessoNumero', 'MovimentoDataHora', '5-Movi ID')
+# Nos formatos XES e OCEL, o grau e o tribunal também são considerados, para que os movimentos de cada processo
+# (CAMPOS_CHAVE_PROCESSO) fiquem contíguos e formem um único trace
+CAMPOS_ORDENACAO_TRACES = ('ProcessoNumero', '1-Grau', '4-Sigla Tribunal', 'MovimentoDataHora', '5-Movi ID')
+# Estimativa da memória ocupada por linha acumulada, utilizada para respeitar o limite de memória da ordenação
+BYTES_POR_LINHA_ORDENACAO = 1024
+# Quantidade de linhas serializadas de cada vez nos arquivos temporários e segmentos da ordenação
+TAMANHO_LOTE_ORDENACAO = 10000
+
+
+def valor_ordenacao(valor):
+    # Valores ausentes primeiro, depois os numéricos (em ordem numérica) e, por fim, os demais textos
+    if valor is None or valor == '':
+        return 0, 0, ''
+    if isinstance(valor, int) or (isinstance(valor, str) and valor.isdigit()):
+        return 1, int(valor), ''
+    return 2, 0, str(valor)
+
+
+def grava_lotes_pickle(f, linhas):
+    # As linhas são gravadas como tuplas simples (e não como Evento), para que possam ser lidas por qualquer módulo
+    for inicio in range(0, len(linhas), TAMANHO_LOTE_ORDENACAO):
+        pickle.dump([tuple(linha) for linha in linhas[inicio:inicio + TAMANHO_LOTE_ORDENACAO]], f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def le_lotes_pickle(arquivo):
+    with open(arquivo, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+class SaidaPickle:
+    # Segmento das conversões paralela e incremental na saída ordenada e nos formatos XES e OCEL: as linhas são serializadas
+    # na ordem em que foram geradas e lidas novamente pela saída do arquivo final (ver SaidaOrdenada.anexa_segmento)
+
+    def __init__(self, arquivo):
+        self.arquivo = open(arquivo, 'wb')
+        self.linhas = []
+
+    def writerow(self, linha):
+        self.linhas.append(linha)
+        if len(self.linhas) >= TAMANHO_LOTE_ORDENACAO:
+            self.grava_lote()
+
+    def grava_eventos(self, linhas):
+        self.linhas.extend(linhas)
+        if len(self.linhas) >= TAMANHO_LOTE_ORDENACAO:
+            self.grava_lote()
+
+    def grava_lote(self):
+        grava_lotes_pickle(self.arquivo, self.linhas)
+        self.linhas = []
+
+    def close(self):
+        self.grava_lote()
+        self.arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.close()
+
+
+class SaidaOrdenada:
+    # Ordenação externa das linhas gravadas em 'saida' pelas colunas de CAMPOS_ORDENACAO. As linhas são acumuladas em memória
+    # até o limite de 'memoria' MB; a cada limite atingido, são ordenadas e gravadas em um arquivo temporário (uma sequência
+    # ordenada) na 'pasta' informada (ou na pasta temporária do sistema). No fechamento, as sequências são intercaladas
+    # (heapq.merge) e gravadas na saída. Linhas com a mesma chave mantêm a ordem em que foram geradas, de modo que o resultado
+    # não depende da quantidade de workers nem do limite de memória.
+
+    def __init__(self, saida, colunas, memoria=512, pasta=None, campos=CAMPOS_ORDENACAO):
+        self.saida = saida
+        indices = [colunas.index(campo) for campo in campos if campo in colunas]
+        self.chave = lambda linha: tuple([valor_ordenacao(linha[i]) for i in indices])
+        self.limite_linhas = max(TAMANHO_LOTE_ORDENACAO, memoria * (1 << 20) // BYTES_POR_LINHA_ORDENACAO)
+        self.pasta = pasta
+        self.linhas = []
+        self.sequencias = []
+
+    def writerow(self, linha):
+        self.linhas.append(linha)
+        if len(self.linhas) >= self.limite_linhas:
+            self.grava_sequencia()
+
+    def grava_eventos(self, linhas):
+        self.linhas.extend(linhas)
+        if len(self.linhas) >= self.limite_linhas:
+            self.grava_sequencia()
+
+    def anexa_segmento(self, segmento):
+        for linhas in le_lotes_pickle(segmento):
+            self.grava_eventos(linhas)
+
+    def grava_sequencia(self):
+        self.linhas.sort(key=self.chave)
+        with tempfile.NamedTemporaryFile('wb', prefix='ordenacao_', suffix='.pickle', dir=self.pasta, delete=False) as f:
+            self.sequencias.append(f.name)
+            grava_lotes_pickle(f, self.linhas)
+        self.linhas = []
+
+    def le_sequencia(self, sequencia):
+        for linhas in le_lotes_pickle(sequencia):
+            yield from linhas
+
+    def close(self):
+        try:
+            if self.sequencias:
+                if self.linhas:
+                    self.grava_sequencia()
+                lote = []
+                for linha in heapq.merge(*[self.le_sequencia(sequencia) for sequencia in self.sequencias], key=self.chave):
+                    lote.append(linha)
+                    if len(lote) >= TAMANHO_LOTE_ORDENACAO:
+                        self.saida.grava_eventos(lote)
+                        lote = []
+                self.saida.grava_eventos(lote)
+            else:
+                self.linhas.sort(key=self.chave)
+                self.saida.grava_eventos(self.linhas)
+            self.linhas = []
+        finally:
+            self.saida.close()
+            for sequencia in self.sequencias:
+                os.remove(sequencia)
+            self.sequencias = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.close()
+
+
+# Tabelas auxiliares, filtro e deduplicação de cada contexto de conversão e perfilamento dos processos do pool de conversão
+# paralela (definidos por inicializa_worker). Cada contexto corresponde a um tipo de justiça (ver converte_lote).
+contextos_worker = None
+perfilar_worker = False
+
+
+def inicializa_worker(contextos, perfilar=False, decodificador=None):
+    # 'contextos' é um dicionário {contexto: (tabelas, filtro, deduplicacao)}; 'decodificador' é o decodificador de JSON
+    # do processo principal (ver define_decodificador_json), repassado explicitamente para os pools iniciados com spawn
+    global contextos_worker, perfilar_worker
+    contextos_worker = contextos
+    perfilar_worker = perfilar
+    if decodificador is not None:
+        define_decodificador_json(decodificador)
+
+
+def converte_segmentos(tarefa):
+    # Executada nos processos do pool: converte um arquivo JSON em arquivos parciais (segmentos) sem cabeçalho,
+    # um para cada arquivo de saída, e retorna as contagens de códigos encontrados/não encontrados de cada tabela
+    # e as métricas (Metricas) da conversão do arquivo.
+    contexto, (arquivo, segmentos, opcoes) = tarefa
+    tabelas, filtro, deduplicacao = contextos_worker[contexto]
+    contagem_inicial = {nome: (tabela.encontrados, tabela.nao_encontrados) for nome, tabela in tabelas.items()}
+    metricas = Metricas(perfilar_worker)
+    with contextlib.ExitStack() as pilha:
+        writers = {}
+        for assunto, segmento in segmentos.items():
+            writers[assunto] = pilha.enter_context(abre_saida(segmento, opcoes, segmento=True))
+        converte_arquivo(arquivo, writers, tabelas, filtro, deduplicacao, metricas)
+    return {nome: (tabela.encontrados - contagem_inicial[nome][0], tabela.nao_encontrados - contagem_inicial[nome][1])
+            for nome, tabela in tabelas.items()}, metricas
+
+
+def converte_tarefas(tarefas, tabelas, workers, filtro=None, deduplicacao=None, metricas=None, pool=None, contexto=None):
+    # Converte as tarefas (arquivo JSON, {assunto: segmento}, OpcoesSaida) e as retorna, uma a uma, na ordem em que foram informadas
+    # assim que seus segmentos estiverem completos. Com 'workers' maior que 1, as tarefas são distribuídas entre processos
+    # que compartilham as tabelas auxiliares já carregadas, e as contagens de cada processo são somadas às de 'tabelas'.
+    # Com 'pool', as tarefas são enviadas a um pool já existente, cujos processos foram inicializados com as tabelas, o filtro
+    # e a deduplicação de 'contexto' (ver converte_lote). As métricas de cada tarefa são somadas às de 'metricas'.
+    metricas = metricas if metricas is not None else Metricas()
+    contextos = {contexto: (tabelas, filtro, deduplicacao)}
+    with contextlib.ExitStack() as pilha:
+        if pool is None and workers > 1 and len(tarefas) > 1:
+            pool = pilha.enter_context(multiprocessing.Pool(min(workers, len(tarefas)), initializer=inicializa_worker,
+                                                            initargs=(contextos, metricas.perfilar, decodificador_ativo())))
+        if pool is not None:
+            for tarefa, (contagem, metricas_tarefa) in zip(tarefas, pool.imap(converte_segmentos, [(contexto, tarefa) for tarefa in tarefas])):
+                for nome, (encontrados, nao_encontrados) in contagem.items():
+                    tabelas[nome].encontrados += encontrados
+                    tabelas[nome].nao_encontrados += nao_encontrados
+                metricas.soma(metricas_tarefa)
+                yield tarefa
+        else:
+            # No próprio processo, as contagens já são registradas diretamente em 'tabelas'
+            inicializa_worker(contextos, metricas.perfilar)
+            for tarefa in tarefas:
+                _, metricas_tarefa = converte_segmentos((contexto, tarefa))
+                metricas.soma(metricas_tarefa)
+                yield tarefa
+
+
+def converte_em_paralelo(pasta_raiz, arquivos, saidas, opcoes, tabelas, workers, filtro=None, deduplicacao=None, metricas=None,
+                         pool=None, contexto=None):
+    # Distribui os arquivos JSON entre 'workers' processos ou entre os processos de 'pool' (ver converte_tarefas).
+    # Os segmentos de cada arquivo são concatenados nos arquivos finais na mesma ordem da execução serial,
+    # de modo que os arquivos gerados são idênticos aos de uma execução com um único processo.
+    pasta_segmentos = tempfile.mkdtemp(prefix='segmentos_', dir='{}/tmp'.format(pasta_raiz))
+    tarefas = [(arquivo, {assunto: os.path.join(pasta_segmentos, '{}_{}{}'.format(n, assunto, extensao_segmento(opcoes))) for assunto in saidas}, opcoes)
+               for n, arquivo in enumerate(arquivos)]
+    metricas = metricas if metricas is not None else Metricas()
+    try:
+        for arquivo, segmentos, opcoes in converte_tarefas(tarefas, tabelas, workers, filtro, deduplicacao, metricas, pool, contexto):
+            with metricas.etapa('anexacao_segmentos'):
+                for assunto, segmento in segmentos.items():
+                    saidas[assunto].anexa_segmento(segmento)
+                    for parcial in arquivos_saida(segmento, opcoes, segmento=True):
+                        os.remove(parcial)
+    finally:
+        shutil.rmtree(pasta_segmentos, ignore_errors=True)
+
+
+# Versão do formato dos segmentos da conversão incremental: deve ser incrementada sempre que as linhas geradas (ou as
+# estatísticas serializadas junto com os segmentos) mudarem
+VERSAO_SEGMENTOS = 4
+
+
+def hash_arquivo(arquivo):
+    h = hashlib.sha256()
+    with open(arquivo, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def converte_incremental(pasta_raiz, tipo_justica, arquivos, saidas, opcoes, tabelas, workers, filtro=None, deduplicacao=None, metricas=None,
+                         pool=None, contexto=None):
+    # Conversão incremental: cada arquivo JSON gera um segmento por arquivo de saída, mantido em {pastaRaiz}/tmp/segmentos/{tipoJustica}.
+    # O manifesto (manifesto.json, na mesma pasta) registra, para cada arquivo JSON, o tamanho, a data de modificação,
+    # o hash do conteúdo e os segmentos gerados. Somente arquivos novos ou alterados são convertidos; os segmentos
+    # de arquivos removidos são descartados e os arquivos finais são montados com os segmentos na ordem dos arquivos.
+    # O manifesto é descartado quando as tabelas auxiliares, as opções de saída, o filtro ou a versão dos segmentos mudam;
+    # nesse caso (ou quando o manifesto não pode ser lido), os segmentos existentes são removidos junto com ele, pois nenhum
+    # deles pode mais ser reaproveitado.
+    # Com deduplicação, um arquivo também é convertido novamente quando o resultado da sua deduplicação muda (ver Deduplicacao.assinatura).
+    metricas = metricas if metricas is not None else Metricas()
+    pasta_segmentos = '{}/tmp/segmentos/{}'.format(pasta_raiz, tipo_justica)
+    arquivo_manifesto = os.path.join(pasta_segmentos, 'manifesto.json')
+    configuracao = {'versao': VERSAO_SEGMENTOS, 'saida': {campo: valor for campo, valor in opcoes._asdict().items() if campo not in OPCOES_SAIDA_EXECUCAO}, 'filtro': filtro.configuracao() if filtro is not None else None,
+                    'tabelas': hash_arquivos(arquivos_fonte_tabelas(pasta_raiz, tipo_justica))}
+    anteriores = None
+    try:
+        with open(arquivo_manifesto, 'r', encoding='utf8') as f:
+            manifesto = json.load(f)
+        if manifesto['configuracao'] == configuracao:
+            anteriores = manifesto['arquivos']
+    except (OSError, ValueError, KeyError):
+        pass
+    if anteriores is None:
+        if os.path.isdir(pasta_segmentos):
+            print('Conversão incremental: configuração alterada ou manifesto inválido, segmentos anteriores removidos')
+            shutil.rmtree(pasta_segmentos)
+        anteriores = {}
+    os.makedirs(pasta_segmentos, exist_ok=True)
+
+    atuais = {}
+    tarefas = []
+    for arquivo in arquivos:
+        chave = os.path.relpath(arquivo, pasta_raiz)
+        prefixo = hashlib.sha1(chave.encode('utf8')).hexdigest()[:16]
+        segmentos = {('todos' if assunto is None else str(assunto)): '{}_{}{}'.format(prefixo, 'todos' if assunto is None else assunto, extensao_segmento(opcoes))
+                     for assunto in saidas}
+        info = os.stat(arquivo)
+        entrada = anteriores.get(chave)
+        assinatura = deduplicacao.assinatura(arquivo) if deduplicacao is not None else None
+        if entrada is not None and entrada.get('deduplicacao') == assinatura and all(nome in entrada['segmentos'] and
+                                       all(os.path.exists(parcial) for parcial in arquivos_saida(os.path.join(pasta_segmentos, entrada['segmentos'][nome]), opcoes, segmento=True))
+                                       for nome in segmentos):
+            if entrada['tamanho'] == info.st_size and entrada['mtime'] == info.st_mtime_ns:
+                atuais[chave] = entrada
+                continue
+            if entrada['tamanho'] == info.st_size and entrada['hash'] == hash_arquivo(arquivo):
+                atuais[chave] = dict(entrada, mtime=info.st_mtime_ns)
+                continue
+        atuais[chave] = {'tamanho': info.st_size, 'mtime': info.st_mtime_ns, 'hash': hash_arquivo(arquivo), 'segmentos': segmentos,
+                         'deduplicacao': assinatura}
+        # Os segmentos são gravados com extensão .tmp e só substituem os anteriores depois de completos
+        tarefas.append((arquivo, {assunto: os.path.join(pasta_segmentos, segmentos['todos' if assunto is None else str(assunto)] + '.tmp')
+                                  for assunto in saidas}, opcoes))
+
+    print('Conversão incremental: {} arquivo(s) a converter, {} reaproveitado(s), {} removido(s)'.format(
+        len(tarefas), len(atuais) - len(tarefas), len(set(anteriores) - set(atuais))))
+    metricas.contadores['arquivos_reaproveitados'] += len(atuais) - len(tarefas)
+    for arquivo, segmentos, opcoes in converte_tarefas(tarefas, tabelas, workers, filtro, deduplicacao, metricas, pool, contexto):
+        for segmento in segmentos.values():
+            for parcial, final in zip(arquivos_saida(segmento, opcoes, segmento=True), arquivos_saida(segmento[:-len('.tmp')], opcoes, segmento=True)):
+                os.replace(parcial, final)
+
+    # Descarta os segmentos que não são mais referenciados (arquivos removidos ou segmentos substituídos)
+    referenciados = {segmento for entrada in atuais.values() for segmento in entrada['segmentos'].values()}
+    for entrada in anteriores.values():
+        for segmento in entrada['segmentos'].values():
+            if segmento not in referenciados:
+                for parcial in arquivos_saida(os.path.join(pasta_segmentos, segmento), opcoes, segmento=True):
+                    if os.path.exists(parcial):
+                        os.remove(parcial)
+
+    with metricas.etapa('anexacao_segmentos'):
+        for arquivo in arquivos:
+            entrada = atuais[os.path.relpath(arquivo, pasta_raiz)]
+            for assunto, saida in saidas.items():
+                saida.anexa_segmento(os.path.join(pasta_segmentos, entrada['segmentos']['todos' if assunto is None else str(assunto)]))
+
+    with open(arquivo_manifesto + '.tmp', 'w', encoding='utf8') as f:
+        json.dump({'configuracao': configuracao, 'arquivos': atuais}, f, indent=1)
+    os.replace(arquivo_manifesto + '.tmp', arquivo_manifesto)
+
+
+# Eventos tipados de Converter.iter_rows: os campos de data/hora são datetime.datetime (None quando o valor não está no padrão
+# AAAA-MM-DDThh:mm:ss, como as datas de ajuizamento com menos de 14 dígitos no JSON) e os campos que mantêm o código
+# informado no JSON quando ele não é encontrado na respectiva tabela (ou que são sempre códigos) trazem esse código como inteiro.
+# Os arquivos gerados continuam recebendo os valores como texto, pois o CSV grava exatamente o texto montado na conversão.
+CAMPOS_DATA_HORA_EVENTO = [Evento._fields.index(campo) for campo in ('MovimentoDataHora', 'ProcessoDataAjuizamento')]
+CAMPOS_CODIGOS_EVENTO = [Evento._fields.index(campo) for campo in
+                         ('ProcessoAssuntoLocal', 'ProcessoOrgaoJulgadorTipo', 'ProcessoOrgaoJulgadorMunicipio', 'ProcessoOrgaoJulgadorUF',
+                          'ProcessoClasseSecundaria', 'ProcessoMunicipio', 'ProcessoUF', 'MovimentoSecundario', 'MovimentoLocal',
+                          'MovimentoCodComplemento', 'MovimentoOrgaoJulgadorTipo', 'MovimentoOrgaoJulgadorMunicipio',
+                          'MovimentoOrgaoJulgadorUF')]
+
+
+def evento_tipado(evento):
+    valores = list(evento)
+    for i in CAMPOS_DATA_HORA_EVENTO:
+        valores[i] = datetime.datetime.fromisoformat(valores[i]) if data_hora_log(valores[i]) else None
+    for i in CAMPOS_CODIGOS_EVENTO:
+        valor = valores[i]
+        if isinstance(valor, str) and valor.isdigit() and valor.isascii():
+            valores[i] = int(valor)
+    return Evento._make(valores)
+
+
+class Converter:
+    # Conversão dos arquivos JSON de um tipo de justiça, configurada explicitamente (sem depender dos argumentos da linha de comando):
+    #  - pasta_raiz: pasta contendo a pasta do tipo de justiça ({pasta_raiz}/{tipo_justica}/**/*.json) e os arquivos auxiliares
+    #  - tipo_justica: um dos tipos de TIPOS_JUSTICA
+    #  - assuntos: lista de assuntos; somente os processos pertencentes a algum deles são convertidos (None para todos os processos)
+    #  - filtro: FiltroProcessos com os demais critérios de seleção dos processos e dos movimentos (None para não filtrar)
+    #  - incluir_todos, formato, normalizado, incluir_plano, workers e incremental: ver gera_csv
+    #  - reconstruir_tabelas: ignora o cache das tabelas auxiliares (ver prepara_tabelas)
+    #  - deduplicacao: política de deduplicação dos processos repetidos (ver POLITICAS_DEDUPLICACAO) ou None para não deduplicar
+    #  - limite_memoria_deduplicacao: memória (em MB) utilizada pela deduplicação antes de recorrer ao disco (ver Deduplicacao)
+    #  - ordenar: ordena as linhas dos arquivos gerados por processo, data/hora e identificador do movimento (ver SaidaOrdenada);
+    #    no formato xes sem deduplicação, as linhas são sempre ordenadas
+    #  - limite_memoria_ordenacao e pasta_ordenacao: memória (em MB) e pasta dos arquivos temporários da ordenação
+    #    (por padrão, {pasta_raiz}/tmp)
+    #  - compressao: compactação dos arquivos gerados nos formatos de texto (ver COMPRESSOES_SAIDA) ou None para não compactar
+    #  - estatisticas: grava, junto com cada arquivo gerado, as tabelas de estatísticas agregadas dos seus eventos (ver Estatisticas)
+    #  - arquivo_metricas: arquivo do relatório de métricas da execução, em JSON ou, com a extensão .prom, no formato
+    #    do Prometheus (ver Metricas); None para não gravar o relatório
+    #  - arquivo_perfil: arquivo das estatísticas do cProfile da conversão dos processos (ver Metricas.grava_perfil) ou None
+    # Exemplo de uso como biblioteca:
+    #     conversor = Converter('/dados', 'justica_militar', assuntos=[11068])
+    #     for evento in conversor.iter_rows():
+    #         print(evento.ProcessoNumero, evento.MovimentoDataHora.year)
+
+    def __init__(self, pasta_raiz, tipo_justica, assuntos=None, incluir_todos=False, formato='csv', normalizado=False, incluir_plano=False,
+                 workers=1, incremental=False, reconstruir_tabelas=False, filtro=None, deduplicacao=None, limite_memoria_deduplicacao=256,
+                 ordenar=False, limite_memoria_ordenacao=512, pasta_ordenacao=None, compressao=None, arquivo_metricas=None,
+                 arquivo_perfil=None, estatisticas=False):
+        if tipo_justica not in TIPOS_JUSTICA:
+            raise ValueError('Tipo de justiça inválido: {}'.format(tipo_justica))
+        if formato not in FORMATOS_SAIDA:
+            raise ValueError('Formato de saída inválido: {}'.format(formato))
+        if normalizado and formato in FORMATOS_EVENT_LOG:
+            raise ValueError('O formato {} não admite a saída normalizada'.format(formato))
+        if deduplicacao is not None and deduplicacao not in POLITICAS_DEDUPLICACAO:
+            raise ValueError('Política de deduplicação inválida: {}'.format(deduplicacao))
+        if compressao is not None and compressao not in COMPRESSOES_SAIDA:
+            raise ValueError('Compactação inválida: {}'.format(compressao))
+        if compressao is not None and formato not in FORMATOS_TEXTO:
+            raise ValueError('O formato {} não admite a compactação'.format(formato))
+        self.pasta_raiz = pasta_raiz
+        self.tipo_justica = tipo_justica
+        self.assuntos = list(assuntos) if assuntos else None
+        self.incluir_todos = incluir_todos
+        self.formato = formato
+        self.normalizado = normalizado
+        self.incluir_plano = incluir_plano
+        self.workers = workers
+        self.incremental = incremental
+        self.reconstruir_tabelas = reconstruir_tabelas
+        self.filtro = filtro
+        self.deduplicacao = deduplicacao
+        self.limite_memoria_deduplicacao = limite_memoria_deduplicacao
+        # No XES, cada processo deve formar um único trace: sem deduplicação, as ocorrências de um processo repetido em vários
+        # pontos dos arquivos JSON gerariam traces com o mesmo concept:name, e a ordenação torna os seus movimentos contíguos
+        self.ordenar = ordenar or (formato == 'xes' and deduplicacao is None)
+        self.limite_memoria_ordenacao = limite_memoria_ordenacao
+        self.pasta_ordenacao = pasta_ordenacao
+        self.compressao = compressao
+        self.arquivo_metricas = arquivo_metricas
+        self.arquivo_perfil = arquivo_perfil
+        self.estatisticas = estatisticas
+        self.tabelas = None
+        self.metricas = None
+
+    def prepara_tabelas(self, metricas=None):
+        # As tabelas auxiliares são preparadas (ou obtidas do cache) uma única vez por objeto, na primeira conversão
+        if self.tabelas is None:
+            self.tabelas = prepara_tabelas(self.pasta_raiz, self.tipo_justica, self.reconstruir_tabelas, metricas)
+        return self.tabelas
+
+    def arquivos_json(self):
+        # Arquivos JSON, inclusive os compactados (ver EXTENSOES_JSON), que são descompactados durante a leitura
+        return [arquivo for extensao in EXTENSOES_JSON
+                for arquivo in glob.glob('{}/{}/**/*{}'.format(self.pasta_raiz, self.tipo_justica, extensao), recursive=True)]
+
+    @contextlib.contextmanager
+    def prepara_deduplicacao(self, arquivos, metricas=None):
+        # Registra as ocorrências dos processos dos arquivos (ver Deduplicacao) em uma pasta temporária, removida ao final
+        metricas = metricas if metricas is not None else Metricas()
+        if self.deduplicacao is None:
+            yield None
+            return
+        os.makedirs('{}/tmp'.format(self.pasta_raiz), exist_ok=True)
+        pasta = tempfile.mkdtemp(prefix='deduplicacao_', dir='{}/tmp'.format(self.pasta_raiz))
+        deduplicacao = Deduplicacao(self.deduplicacao, pasta, self.limite_memoria_deduplicacao)
+        try:
+            with metricas.etapa('deduplicacao'):
+                deduplicacao.registra(arquivos, self.workers)
+            yield deduplicacao
+        finally:
+            deduplicacao.fecha()
+            shutil.rmtree(pasta, ignore_errors=True)
+
+    def iter_rows(self):
+        # Gera os eventos (Evento) dos processos à medida que os arquivos JSON são lidos, sem gravar arquivos de saída, com as
+        # datas/horas como datetime.datetime e os códigos como inteiros (ver evento_tipado).
+        # Com 'assuntos' informado, cada evento de um processo pertencente a um ou mais assuntos é gerado uma única vez.
+        tabelas = self.prepara_tabelas()
+        destinos = self.assuntos or [None]
+        arquivos = self.arquivos_json()
+        with self.prepara_deduplicacao(arquivos) as deduplicacao:
+            for arquivo in arquivos:
+                for chaves, eventos in eventos_processos(arquivo, tabelas, destinos, self.filtro, deduplicacao):
+                    yield from map(evento_tipado, eventos)
+
+    def gera_indices(self):
+        # Gera (ou atualiza) o índice de cada arquivo JSON (ver gera_indice). Os índices válidos são utilizados automaticamente
+        # pelas conversões seguintes, que passam a ler somente os processos dos assuntos, classes, tribunais e graus selecionados.
+        arquivos = self.arquivos_json()
+        if self.workers > 1 and len(arquivos) > 1:
+            with multiprocessing.Pool(min(self.workers, len(arquivos))) as pool:
+                quantidades = pool.map(gera_indice, arquivos)
+        else:
+            quantidades = [gera_indice(arquivo) for arquivo in arquivos]
+        for arquivo, quantidade in zip(arquivos, quantidades):
+            print('Índice {} gerado com sucesso! ({} processo(s))'.format(arquivo + EXTENSAO_INDICE, quantidade))
+
+    def gera_csv(self):
+        # O requisito para que essa função funcione é a existência dos arquivos (ver arquivos_fonte_tabelas e carrega_tabelas):
+        #  - tabelas processuais unificadas do SGT: {pastaRaiz}/sgt_assuntos.csv, {pastaRaiz}/sgt_classes.csv e
+        #    {pastaRaiz}/sgt_movimentos.csv e, opcionalmente, a tabela de movimentos locais {pastaRaiz}/sgt_movimentos_{tipoJustica}.csv
+        #  - serventias do MPM: {pastaRaiz}/mpm_serventias.csv
+        #  - tabela de municípios do IBGE: {pastaRaiz}/ibge.csv
+        #  - arquivos JSON dos processos: {pastaRaiz}/{tipoJustica}/**/*.json (ou compactados, ver EXTENSOES_JSON)
+        # A partir das tabelas do SGT, prepara_tabelas gera os arquivos hierarquizados lidos na carga das tabelas:
+        # {pastaRaiz}/assuntos.csv, {pastaRaiz}/classes.csv, {pastaRaiz}/movimentos.csv e {pastaRaiz}/movimentos_{tipoJustica}.csv.
+        # Os arquivos JSON são lidos uma única vez: cada processo é direcionado para o CSV de cada assunto de 'assuntos'
+        # ao qual pertence e, caso 'incluir_todos' seja verdadeiro (ou nenhum assunto seja informado), também para o CSV com todos os assuntos.
+        # Com 'workers' maior que 1, os arquivos JSON são convertidos em paralelo (ver converte_em_paralelo).
+        # Com 'incremental' verdadeiro, somente os arquivos JSON novos ou alterados desde a última execução são convertidos (ver converte_incremental).
+        # 'formato' define o formato dos arquivos gerados: 'csv' (padrão), 'parquet', 'arrow' (ver SaidaArrow), 'xes' ou 'ocel'
+        # (ver SaidaXES e SaidaOCEL).
+        # Com 'normalizado' verdadeiro, cada arquivo é gravado como uma tabela de processos e uma de movimentos (ver SaidaNormalizada)
+        # e, com 'incluir_plano' também verdadeiro, o arquivo com uma linha por movimento e todas as colunas também é gerado.
+        # Com 'deduplicacao', os processos repetidos (mesmo número, grau e tribunal) são convertidos uma única vez (ver Deduplicacao).
+        # Com 'ordenar' verdadeiro, as linhas de cada arquivo são ordenadas por processo, data/hora e identificador do movimento,
+        # com ordenação externa limitada a 'limite_memoria_ordenacao' MB (ver SaidaOrdenada).
+        # Com 'compressao', os arquivos gerados são compactados por uma thread separada (ver ArquivoCompactado).
+        # Com 'estatisticas', as tabelas de estatísticas agregadas são acumuladas durante a conversão e gravadas com cada arquivo.
+        # As métricas da execução ficam disponíveis em 'metricas' e, com 'arquivo_metricas' e 'arquivo_perfil', são gravadas ao final.
+        # Retorna o dicionário {assunto: arquivo gerado}, em que o assunto None representa o arquivo com todos os assuntos.
+        self.metricas = Metricas(perfilar=self.arquivo_perfil is not None)
+        self.prepara_tabelas(self.metricas)
+        arquivos = self.arquivos_json()
+        with self.prepara_deduplicacao(arquivos, self.metricas) as deduplicacao:
+            return self.converte(arquivos, deduplicacao)
+
+    def opcoes_saida(self):
+        return OpcoesSaida(self.formato, self.normalizado, self.incluir_plano, self.ordenar, self.limite_memoria_ordenacao,
+                           self.pasta_ordenacao or '{}/tmp'.format(self.pasta_raiz), self.compressao, self.estatisticas)
+
+    def converte(self, arquivos, deduplicacao=None, pool=None, nome_saida=None, mensagens=True):
+        # Conversão dos arquivos JSON 'arquivos' de gera_csv, depois de preparadas as tabelas, as métricas e a deduplicação.
+        # Com 'pool', os arquivos são convertidos pelos processos de um pool já existente, inicializado com as tabelas,
+        # o filtro e a deduplicação deste tipo de justiça (ver converte_lote).
+        # 'nome_saida' é o caminho dos arquivos gerados, sem a extensão (por padrão, {pastaRaiz}/tmp/{tipoJustica}).
+        # Com 'mensagens' falso, as contagens das tabelas e os arquivos gerados não são exibidos (ver converte_monitorado).
+        pasta_raiz, tipo_justica, formato = self.pasta_raiz, self.tipo_justica, self.formato
+        opcoes = self.opcoes_saida()
+        metricas = self.metricas
+        tabelas = self.tabelas
+        nome_saida = nome_saida or '{}/tmp/{}'.format(pasta_raiz, tipo_justica)
+        ofiles = {}
+        if not self.assuntos or self.incluir_todos:
+            ofiles[None] = '{}{}'.format(nome_saida, FORMATOS_SAIDA[formato])
+        for assunto in self.assuntos or []:
+            ofiles[assunto] = '{}_{}{}'.format(nome_saida, assunto, FORMATOS_SAIDA[formato])
+        os.makedirs('{}/tmp'.format(pasta_raiz), exist_ok=True)
+        if opcoes.ordenar:
+            os.makedirs(opcoes.pasta_ordenacao, exist_ok=True)
+        with contextlib.ExitStack() as pilha:
+            saidas = {}
+            for assunto, ofile in ofiles.items():
+                saidas[assunto] = pilha.enter_context(abre_saida(ofile, opcoes))
+            if self.incremental:
+                converte_incremental(pasta_raiz, tipo_justica, arquivos, saidas, opcoes, tabelas, self.workers, self.filtro, deduplicacao, metricas,
+                                     pool, tipo_justica)
+            elif pool is not None or (self.workers > 1 and len(arquivos) > 1):
+                converte_em_paralelo(pasta_raiz, arquivos, saidas, opcoes, tabelas, self.workers, self.filtro, deduplicacao, metricas,
+                                     pool, tipo_justica)
+            else:
+                for i in arquivos:
+                    converte_arquivo(i, saidas, tabelas, self.filtro, deduplicacao, metricas)
+        if mensagens:
+            imprime_contagem_tabelas(tabelas)
+        if self.arquivo_metricas is not None:
+            metricas.grava_relatorio(self.arquivo_metricas, tabelas, tipo_justica=tipo_justica, assuntos=self.assuntos,
+                                     workers=self.workers, incremental=self.incremental, formato=formato,
+                                     deduplicacao=self.deduplicacao, ordenar=self.ordenar, compressao=self.compressao,
+                                     decodificador_json=decodificador_ativo())
+            print('Relatório de métricas {} gerado com sucesso!'.format(self.arquivo_metricas))
+        if self.arquivo_perfil is not None:
+            metricas.grava_perfil(self.arquivo_perfil)
+            print('Perfil de execução {} gerado com sucesso!'.format(self.arquivo_perfil))
+        for ofile in ofiles.values():
+            for arquivo in arquivos_saida(ofile, opcoes):
+                if mensagens:
+                    print('Arquivo {} gerado com sucesso!'.format(arquivo_compactado_saida(arquivo, opcoes)))
+        return {assunto: arquivo_compactado_saida(ofile, opcoes) for assunto, ofile in ofiles.items()}
+
+
+def converte_lote(conversores, workers=1, arquivo_metricas=None, arquivo_perfil=None):
+    # Conversão em lote de vários tipos de justiça na mesma execução: 'conversores' contém um Converter para cada tipo de justiça,
+    # todos com a mesma pasta raiz. As tabelas comuns são preparadas uma única vez (ver prepara_tabelas_lote) e, com 'workers'
+    # maior que 1, os arquivos JSON de todos os tipos são convertidos pelos processos de um único pool: cada tipo de justiça
+    # é conduzido por uma thread, que envia as suas tarefas ao pool e monta os seus arquivos à medida que elas são concluídas,
+    # de modo que os tipos com poucos arquivos não deixam processos ociosos enquanto os demais ainda são convertidos.
+    # As métricas de todos os tipos são gravadas em um único relatório, com as tabelas identificadas por {tipo}.{tabela}.
+    # Retorna o dicionário {tipo_justica: {assunto: arquivo gerado}}.
+    pasta_raiz = conversores[0].pasta_raiz
+    if any(conversor.pasta_raiz != pasta_raiz for conversor in conversores):
+        raise ValueError('Os tipos de justiça de um lote devem ter a mesma pasta raiz')
+    if len({conversor.tipo_justica for conversor in conversores}) != len(conversores):
+        raise ValueError('Tipo de justiça repetido no lote')
+    perfilar = arquivo_perfil is not None
+    metricas = Metricas(perfilar)
+    tabelas = prepara_tabelas_lote(pasta_raiz, [conversor.tipo_justica for conversor in conversores],
+                                   any(conversor.reconstruir_tabelas for conversor in conversores), metricas)
+    resultados = {}
+    with contextlib.ExitStack() as pilha:
+        contextos = {}
+        arquivos = {}
+        for conversor in conversores:
+            conversor.tabelas = tabelas[conversor.tipo_justica]
+            conversor.metricas = Metricas(perfilar)
+            arquivos[conversor.tipo_justica] = conversor.arquivos_json()
+            deduplicacao = pilha.enter_context(conversor.prepara_deduplicacao(arquivos[conversor.tipo_justica], conversor.metricas))
+            contextos[conversor.tipo_justica] = (conversor.tabelas, conversor.filtro, deduplicacao)
+        if workers > 1:
+            pool = pilha.enter_context(multiprocessing.Pool(workers, initializer=inicializa_worker, initargs=(contextos, perfilar, decodificador_ativo())))
+            with concurrent.futures.ThreadPoolExecutor(len(conversores)) as threads:
+                futuros = {conversor.tipo_justica: threads.submit(conversor.converte, arquivos[conversor.tipo_justica],
+                                                                  contextos[conversor.tipo_justica][2], pool)
+                           for conversor in conversores}
+            for tipo_justica, futuro in futuros.items():
+                resultados[tipo_justica] = futuro.result()
+        else:
+            for conversor in conversores:
+                resultados[conversor.tipo_justica] = conversor.converte(arquivos[conversor.tipo_justica], contextos[conversor.tipo_justica][2])
+    for conversor in conversores:
+        metricas.soma(conversor.metricas)
+    if arquivo_metricas is not None:
+        metricas.grava_relatorio(arquivo_metricas, {'{}.{}'.format(conversor.tipo_justica, nome): tabela
+                                                    for conversor in conversores for nome, tabela in conversor.tabelas.items()},
+                                 tipos_justica=[conversor.tipo_justica for conversor in conversores], workers=workers,
+                                 decodificador_json=decodificador_ativo())
+        print('Relatório de métricas {} gerado com sucesso!'.format(arquivo_metricas))
+    if arquivo_perfil is not None:
+        metricas.grava_perfil(arquivo_perfil)
+        print('Perfil de execução {} gerado com sucesso!'.format(arquivo_perfil))
+    return resultados
+
+
+# ****************************************************************************************************
+# *** Monitoramento contínuo das pastas dos tipos de justiça (serviço com as tabelas já carregadas) ***
+# ****************************************************************************************************
+
+# Intervalo padrão, em segundos, entre as verificações das pastas
+INTERVALO_MONITORAMENTO = 10
+# Quantidade de conversões concluídas (e de falhas) mantidas no arquivo de status
+ULTIMOS_MONITORAMENTO = 20
+
+
+def nome_base_json(arquivo):
+    # Caminho do arquivo JSON sem a extensão, inclusive a da compactação (ver EXTENSOES_JSON)
+    for extensao in sorted(EXTENSOES_JSON, key=len, reverse=True):
+        if arquivo.endswith(extensao):
+            return arquivo[:-len(extensao)]
+    return arquivo
+
+
+def assinatura_arquivo(arquivo):
+    # Tamanho e data de modificação do arquivo, ou None caso ele não exista
+    try:
+        info = os.stat(arquivo)
+    except FileNotFoundError:
+        return None
+    return [info.st_size, info.st_mtime_ns]
+
+
+def converte_monitorado(tarefa):
+    # Executada pelo Monitor (no próprio processo ou nos processos do pool, inicializados por inicializa_worker com as tabelas
+    # de cada tipo de justiça): converte um arquivo JSON em arquivos de saída próprios. Os arquivos são gravados em uma
+    # pasta temporária e movidos para 'destino' somente depois de completos; as mensagens exibem os caminhos finais.
+    # Retorna os arquivos gerados e as métricas.
+    conversor, arquivo, destino = tarefa
+    conversor.tabelas = contextos_worker[conversor.tipo_justica][0]
+    conversor.metricas = Metricas(perfilar_worker)
+    pasta = os.path.dirname(destino)
+    os.makedirs(pasta, exist_ok=True)
+    pasta_parcial = tempfile.mkdtemp(prefix='parcial_', dir=pasta)
+    try:
+        conversor.converte([arquivo], nome_saida=os.path.join(pasta_parcial, os.path.basename(destino)), mensagens=False)
+        saidas = []
+        for nome in sorted(os.listdir(pasta_parcial)):
+            os.replace(os.path.join(pasta_parcial, nome), os.path.join(pasta, nome))
+            saidas.append(os.path.join(pasta, nome))
+            print('Arquivo {} gerado com sucesso!'.format(saidas[-1]))
+    finally:
+        shutil.rmtree(pasta_parcial, ignore_errors=True)
+    return saidas, conversor.metricas
+
+
+def interrompe_monitor(sinal, quadro):
+    # SIGTERM (por exemplo, systemctl stop) encerra o Monitor da mesma forma que Ctrl+C
+    raise KeyboardInterrupt
+
+
+class Monitor:
+    # Serviço de conversão contínua: mantém as tabelas auxiliares dos tipos de justiça de 'conversores' preparadas em memória
+    # (e, com 'workers' maior que 1, um pool de processos já inicializado com elas) e verifica as pastas {pastaRaiz}/{tipoJustica}
+    # a cada 'intervalo' segundos. Cada arquivo JSON novo ou alterado é convertido assim que estiver completo (mesmo tamanho
+    # e data de modificação em duas verificações seguidas) em arquivos de saída próprios, gravados em
+    # {pastaRaiz}/tmp/watch/{tipoJustica} com o mesmo caminho relativo do arquivo JSON (por exemplo,
+    # processos-tjmsp/processos-tjmsp_1.csv e processos-tjmsp/processos-tjmsp_1_11068.csv).
+    # Os arquivos convertidos (ou que falharam) são registrados em estado.json, na mesma pasta, e não são convertidos
+    # novamente enquanto não mudarem, inclusive depois de o serviço ser reiniciado; o estado é descartado quando as opções
+    # de saída, o filtro ou os assuntos mudam. As tabelas são preparadas novamente quando os seus arquivos de origem mudam,
+    # valendo para os arquivos convertidos a partir de então.
+    # A fila, as conversões em andamento, as últimas concluídas, as falhas e a vazão são gravadas em 'arquivo_status'
+    # (por padrão, {pastaRaiz}/tmp/watch/status.json) a cada verificação e a cada conversão concluída.
+
+    def __init__(self, conversores, workers=1, intervalo=INTERVALO_MONITORAMENTO, arquivo_status=None):
+        pasta_raiz = conversores[0].pasta_raiz
+        if any(conversor.pasta_raiz != pasta_raiz for conversor in conversores):
+            raise ValueError('Os tipos de justiça monitorados devem ter a mesma pasta raiz')
+        if any(conversor.deduplicacao is not None or conversor.incremental for conversor in conversores):
+            raise ValueError('O monitoramento converte cada arquivo separadamente e não admite deduplicação nem conversão incremental')
+        self.pasta_raiz = pasta_raiz
+        self.conversores = {}
+        for conversor in conversores:
+            # Os arquivos são distribuídos entre os processos pelo próprio monitor: cada conversão usa um único processo
+            modelo = copy.copy(conversor)
+            modelo.workers = 1
+            modelo.tabelas = modelo.metricas = None
+            self.conversores[conversor.tipo_justica] = modelo
+        self.workers = workers
+        self.intervalo = intervalo
+        self.arquivo_status = arquivo_status or '{}/tmp/watch/status.json'.format(pasta_raiz)
+        self.pool = None
+        self.contextos = None
+        self.fontes = None
+        self.estados = {}
+        self.vistos = {}
+        self.fila = []
+        self.andamento = {}
+        self.concluidos = queue.Queue()
+        self.ultimos = collections.deque(maxlen=ULTIMOS_MONITORAMENTO)
+        self.falhas = collections.deque(maxlen=ULTIMOS_MONITORAMENTO)
+        self.totais = collections.Counter()
+        self.inicio = time.time()
+
+    def pasta_saida(self, tipo_justica):
+        return '{}/tmp/watch/{}'.format(self.pasta_raiz, tipo_justica)
+
+    def configuracao(self, conversor):
+        return {'versao': VERSAO_SEGMENTOS, 'saida': {campo: valor for campo, valor in conversor.opcoes_saida()._asdict().items() if campo not in OPCOES_SAIDA_EXECUCAO},
+                'filtro': conversor.filtro.configuracao() if conversor.filtro is not None else None,
+                'assuntos': conversor.assuntos, 'incluir_todos': conversor.incluir_todos}
+
+    def carrega_estados(self):
+        for tipo_justica, conversor in self.conversores.items():
+            self.estados[tipo_justica] = {}
+            try:
+                with open(os.path.join(self.pasta_saida(tipo_justica), 'estado.json'), 'r', encoding='utf8') as f:
+                    estado = json.load(f)
+                if estado['configuracao'] == self.configuracao(conversor):
+                    self.estados[tipo_justica] = estado['arquivos']
+            except (OSError, ValueError, KeyError):
+                pass
+
+    def grava_estado(self, tipo_justica):
+        arquivo = os.path.join(self.pasta_saida(tipo_justica), 'estado.json')
+        os.makedirs(self.pasta_saida(tipo_justica), exist_ok=True)
+        with open(arquivo + '.tmp', 'w', encoding='utf8') as f:
+            json.dump({'configuracao': self.configuracao(self.conversores[tipo_justica]), 'arquivos': self.estados[tipo_justica]}, f, indent=1)
+        os.replace(arquivo + '.tmp', arquivo)
+
+    def prepara_tabelas(self):
+        # Prepara as tabelas na primeira verificação e sempre que os seus arquivos de origem mudarem (somente sem conversões
+        # em andamento); com 'workers' maior que 1, o pool é recriado com as novas tabelas
+        fontes = {arquivo: assinatura_arquivo(arquivo) for tipo_justica in self.conversores
+                  for arquivo in arquivos_fonte_tabelas(self.pasta_raiz, tipo_justica)}
+        if fontes == self.fontes:
+            return
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        reconstruir = self.fontes is None and any(conversor.reconstruir_tabelas for conversor in self.conversores.values())
+        tabelas = prepara_tabelas_lote(self.pasta_raiz, list(self.conversores), reconstruir)
+        # As tabelas ficam carregadas enquanto os arquivos de origem não mudarem: a carga é informada somente aqui, e não a cada
+        # arquivo convertido
+        for tipo_justica, tabelas_tipo in tabelas.items():
+            print('Tabelas de {} carregadas: {}'.format(tipo_justica, ', '.join('{} ({} códigos)'.format(nome, len(tabela.registros))
+                                                                              for nome, tabela in tabelas_tipo.items())))
+        self.contextos = {tipo_justica: (tabelas[tipo_justica], conversor.filtro, None) for tipo_justica, conversor in self.conversores.items()}
+        if self.workers > 1:
+            # Os processos do pool não herdam o tratamento de SIGTERM do monitor (ver executa), para que terminate os encerre
+            tratador = signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                self.pool = multiprocessing.Pool(self.workers, initializer=inicializa_worker, initargs=(self.contextos, False, decodificador_ativo()))
+            finally:
+                signal.signal(signal.SIGTERM, tratador)
+        self.fontes = fontes
+
+    def varre(self):
+        # Enfileira os arquivos JSON completos (inalterados desde a verificação anterior) ainda não convertidos ou alterados
+        vistos = {}
+        pendentes = set(self.fila) | set(self.andamento)
+        for tipo_justica, conversor in self.conversores.items():
+            for arquivo in conversor.arquivos_json():
+                assinatura = assinatura_arquivo(arquivo)
+                if assinatura is None:
+                    continue
+                vistos[arquivo] = assinatura
+                if self.vistos.get(arquivo) != assinatura or (tipo_justica, arquivo) in pendentes:
+                    continue
+                entrada = self.estados[tipo_justica].get(os.path.relpath(arquivo, self.pasta_raiz))
+                if entrada is None or entrada['assinatura'] != assinatura:
+                    self.fila.append((tipo_justica, arquivo))
+        self.vistos = vistos
+
+    def inicia(self):
+        # Inicia a conversão dos próximos arquivos da fila, no máximo um por processo
+        while self.fila and len(self.andamento) < max(self.workers, 1):
+            chave = self.fila.pop(0)
+            tipo_justica, arquivo = chave
+            destino = os.path.join(self.pasta_saida(tipo_justica),
+                                   nome_base_json(os.path.relpath(arquivo, '{}/{}'.format(self.pasta_raiz, tipo_justica))))
+            tarefa = (self.conversores[tipo_justica], arquivo, destino)
+            self.andamento[chave] = (self.vistos[arquivo], time.time())
+            if self.pool is None:
+                inicializa_worker(self.contextos)
+                try:
+                    self.concluidos.put((chave, converte_monitorado(tarefa), None))
+                except Exception as erro:
+                    self.concluidos.put((chave, None, erro))
+                return
+            self.pool.apply_async(converte_monitorado, (tarefa,), callback=lambda resultado, chave=chave: self.concluidos.put((chave, resultado, None)),
+                                  error_callback=lambda erro, chave=chave: self.concluidos.put((chave, None, erro)))
+
+    def conclui(self, chave, resultado, erro):
+        tipo_justica, arquivo = chave
+        assinatura, inicio = self.andamento.pop(chave)
+        segundos = time.time() - inicio
+        entrada = {'assinatura': assinatura, 'data': datetime.datetime.now().isoformat(timespec='seconds')}
+        if erro is not None:
+            entrada['erro'] = '{}: {}'.format(type(erro).__name__, erro)
+            self.falhas.append({'arquivo': arquivo, 'data': entrada['data'], 'erro': entrada['erro']})
+            self.totais['falhas'] += 1
+            print('Falha na conversão do arquivo {}: {}'.format(arquivo, entrada['erro']))
+        else:
+            saidas, metricas = resultado
+            entrada['saidas'] = [os.path.relpath(saida, self.pasta_saida(tipo_justica)) for saida in saidas]
+            self.ultimos.append({'arquivo': arquivo, 'data': entrada['data'], 'segundos': round(segundos, 3), 'bytes': assinatura[0],
+                                 'processos': metricas.contadores['processos_convertidos'], 'eventos': metricas.contadores['eventos'],
+                                 'saidas': saidas})
+            self.totais['arquivos_convertidos'] += 1
+            self.totais['processos_convertidos'] += metricas.contadores['processos_convertidos']
+            self.totais['eventos'] += metricas.contadores['eventos']
+            self.totais['bytes'] += assinatura[0]
+            print('Arquivo {} convertido em {:.1f}s ({} arquivo(s) gerado(s) em {})'.format(arquivo, segundos, len(saidas),
+                                                                                     os.path.dirname(saidas[0]) if saidas else '-'))
+        self.estados[tipo_justica][os.path.relpath(arquivo, self.pasta_raiz)] = entrada
+        self.grava_estado(tipo_justica)
+
+    def grava_status(self, situacao='em execução'):
+        # A vazão é a média das últimas conversões concluídas (eventos e MB de JSON por segundo de conversão)
+        agora = time.time()
+        segundos = sum(ultimo['segundos'] for ultimo in self.ultimos)
+        status = {'pid': os.getpid(),
+                  'situacao': situacao,
+                  'inicio': datetime.datetime.fromtimestamp(self.inicio).isoformat(timespec='seconds'),
+                  'atualizado': datetime.datetime.fromtimestamp(agora).isoformat(timespec='seconds'),
+                  'tipos_justica': list(self.conversores),
+                  'workers': self.workers,
+                  'intervalo': self.intervalo,
+                  'fila': [arquivo for tipo_justica, arquivo in self.fila],
+                  'em_andamento': [{'arquivo': arquivo, 'segundos': round(agora - inicio, 1)}
+                                   for (tipo_justica, arquivo), (assinatura, inicio) in self.andamento.items()],
+                  'totais': dict(self.totais),
+                  'vazao': {'eventos_s': round(sum(ultimo['eventos'] for ultimo in self.ultimos) / segundos, 1) if segundos else None,
+                            'mb_s': round(sum(ultimo['bytes'] for ultimo in self.ultimos) / (1 << 20) / segundos, 3) if segundos else None},
+                  'ultimos': list(self.ultimos)[::-1],
+                  'falhas': list(self.falhas)[::-1]}
+        os.makedirs(os.path.dirname(os.path.abspath(self.arquivo_status)), exist_ok=True)
+        with open(self.arquivo_status + '.tmp', 'w', encoding='utf8') as f:
+            json.dump(status, f, indent=1, ensure_ascii=False)
+        os.replace(self.arquivo_status + '.tmp', self.arquivo_status)
+
+    def executa(self, ciclos=None):
+        # Executa até ser interrompido (Ctrl+C) ou, com 'ciclos', até completar essa quantidade de verificações
+        # e concluir as conversões pendentes. Fora da thread principal, SIGTERM não é tratado.
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, interrompe_monitor)
+        self.carrega_estados()
+        ciclo = 0
+        print('Monitorando {} a cada {}s (status em {})'.format(', '.join('{}/{}'.format(self.pasta_raiz, tipo_justica) for tipo_justica in self.conversores),
+                                                                self.intervalo, self.arquivo_status))
+        try:
+            while True:
+                if not self.andamento:
+                    self.prepara_tabelas()
+                self.varre()
+                ciclo += 1
+                self.inicia()
+                self.grava_status()
+                limite = time.monotonic() + self.intervalo
+                while self.andamento and time.monotonic() < limite:
+                    try:
+                        self.conclui(*self.concluidos.get(timeout=max(limite - time.monotonic(), 0)))
+                    except queue.Empty:
+                        break
+                    self.inicia()
+                    self.grava_status()
+                if ciclos is not None and ciclo >= ciclos and not self.fila and not self.andamento:
+                    break
+                time.sleep(max(limite - time.monotonic(), 0))
+        except KeyboardInterrupt:
+            print('Monitoramento interrompido')
+        finally:
+            if self.pool is not None:
+                self.pool.terminate()
+                self.pool.join()
+                self.pool = None
+            self.grava_status('encerrado')
+
+# *******************************************************************
+# *** Configura argumentos externos do script (command line args) ***
+# *******************************************************************
+
+def cria_parser():
+    parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     description='Gera arquivos CSV a partir dos arquivos JSON do Tipo de Justiça informado. Gera também as tabelas processuais unificadas de forma hierarquizada.',
+                                     epilog=textwrap.dedent('''\
+                                        Caso seja fornecida uma lista de assuntos, serão gerados arquivos CSV para cada assunto,
+                                        caso contrário, será gerado um único arquivo CSV com todos os assuntos.
+                                        É importante que a estrutura de pastas contendo os JSONs a partir da pasta raiz respeitem o formato:
+                                            {pastaRaiz}/{tipoJustica}/**/*.json
+                                            (ou *.json.gz, *.json.bz2 e *.json.zst, descompactados durante a leitura)
+                                            Exemplo:
+                                            ./justica_trabalho/processos-trt23/processos-tre-ac_1.json
+                                        '''))
+    parser.add_argument('pastaRaiz', help='Caminho para a pasta raiz contendo a respectiva pasta do tipo de justiça e os arquivos auxiliares (sgt_assuntos.csv, sgt_classes.csv.')
+    parser.add_argument('tipoJustica', nargs='+', choices=TIPOS_JUSTICA + ['todos'],
+                        help='Tipo(s) de Justiça cujos CSVs serão gerados (todos para os seis tipos). Com mais de um tipo, as tabelas comuns são preparadas uma única vez e os arquivos JSON de todos os tipos compartilham os mesmos processos de --paralelismo.')
+    parser.add_argument('--assuntos', nargs='*', type=int, help='Lista de assuntos (números inteiros) para separar os CSVs (argumento opcional)')
+    parser.add_argument('--todos', action='store_true', help='Gera também o CSV com todos os assuntos quando for fornecida uma lista de assuntos (argumento opcional)')
+    parser.add_argument('--tribunais', nargs='*', help='Siglas dos tribunais (siglaTribunal) dos processos a converter, por exemplo TJMSP (argumento opcional)')
+    parser.add_argument('--graus', nargs='*', help='Graus (grau) dos processos a converter, por exemplo G1 G2 (argumento opcional)')
+    parser.add_argument('--classes', nargs='*', type=int, help='Códigos das classes processuais (classeProcessual) dos processos a converter (argumento opcional)')
+    parser.add_argument('--orgaos', nargs='*', type=int, help='Códigos dos órgãos julgadores (orgaoJulgador.codigoOrgao) dos processos a converter (argumento opcional)')
+    parser.add_argument('--ajuizamento-inicio', type=datetime.date.fromisoformat, metavar='AAAA-MM-DD', help='Converte somente os processos ajuizados a partir da data informada (argumento opcional)')
+    parser.add_argument('--ajuizamento-fim', type=datetime.date.fromisoformat, metavar='AAAA-MM-DD', help='Converte somente os processos ajuizados até a data informada, inclusive (argumento opcional)')
+    parser.add_argument('--movimentos-inicio', type=datetime.date.fromisoformat, metavar='AAAA-MM-DD', help='Converte somente os movimentos a partir da data informada; processos sem movimentos no intervalo são descartados (argumento opcional)')
+    parser.add_argument('--movimentos-fim', type=datetime.date.fromisoformat, metavar='AAAA-MM-DD', help='Converte somente os movimentos até a data informada, inclusive; processos sem movimentos no intervalo são descartados (argumento opcional)')
+    parser.add_argument('--deduplica', choices=list(POLITICAS_DEDUPLICACAO), help='Converte uma única vez os processos repetidos (mesmo número, grau e tribunal), mantendo a primeira ocorrência, a última, a com mais movimentos válidos (mais_completo) ou a primeira acrescida dos movimentos das demais (mesclar) (argumento opcional)')
+    parser.add_argument('--memoria-deduplicacao', type=int, default=256, metavar='MB', help='Memória utilizada pela deduplicação antes de recorrer ao disco, em MB (argumento opcional, padrão 256)')
+    parser.add_argument('--ordena', action='store_true', help='Ordena as linhas dos arquivos gerados por número do processo, data/hora e identificador do movimento, com ordenação externa em disco (argumento opcional)')
+    parser.add_argument('--memoria-ordenacao', type=int, default=512, metavar='MB', help='Com --ordena, memória utilizada pela ordenação antes de recorrer a arquivos temporários, em MB (argumento opcional, padrão 512)')
+    parser.add_argument('--pasta-ordenacao', metavar='PASTA', help='Com --ordena, pasta dos arquivos temporários da ordenação (argumento opcional, padrão {pastaRaiz}/tmp)')
+    parser.add_argument('--formato', choices=list(FORMATOS_SAIDA), default='csv', help='Formato dos arquivos gerados: csv (padrão), parquet, arrow (Arrow IPC), xes (IEEE XES, um trace por processo; sem --deduplica, as linhas são sempre ordenadas) ou ocel (OCEL 2.0 JSON); parquet e arrow requerem o pacote pyarrow (argumento opcional)')
+    parser.add_argument('--compacta', choices=list(COMPRESSOES_SAIDA), help='Compacta os arquivos gerados nos formatos csv, xes e ocel com gzip (gz), bzip2 (bz2) ou zstd (zst, requer o pacote zstandard), em uma thread separada da conversão (argumento opcional)')
+    parser.add_argument('--estatisticas', action='store_true', help='Grava, junto com cada arquivo gerado, tabelas CSV com a quantidade de ocorrências de processos (um processo repetido é contado uma vez por ocorrência) e de movimentos por tribunal, classe, assunto primário, movimento primário (pelos códigos SGT, com as descrições) e mês, e a duração das ocorrências por tribunal, classe e assunto, acumuladas durante a conversão ({arquivo}_estatisticas_{dimensão}.csv) (argumento opcional)')
+    parser.add_argument('--normalizada', action='store_true', help='Gera a saída normalizada: um arquivo de processos ({arquivo}_processos, uma linha por processo) e um arquivo de movimentos ({arquivo}_movimentos, uma linha por movimento com a chave do processo) em vez do arquivo com todas as colunas em cada movimento (argumento opcional)')
+    parser.add_argument('--plano', action='store_true', help='Com --normalizada, gera também o arquivo com todas as colunas em cada movimento (argumento opcional)')
+    parser.add_argument('--gera-indices', action='store_true', help='Gera o índice (arquivo .idx ao lado de cada arquivo JSON) com as posições dos processos por assunto, classe, tribunal e grau e encerra; as conversões seguintes leem somente os processos selecionados (argumento opcional)')
+    parser.add_argument('--incremental', action='store_true', help='Converte somente os arquivos JSON novos ou alterados desde a última execução incremental, reaproveitando os demais (argumento opcional)')
+    parser.add_argument('--reconstroi-tabelas', action='store_true', help='Hierarquiza e carrega novamente as tabelas auxiliares, ignorando o cache (argumento opcional)')
+    parser.add_argument('--paralelismo', type=int, default=1, help='Quantidade de processos para converter os arquivos JSON em paralelo (argumento opcional, padrão 1)')
+    parser.add_argument('--decodificador-json', choices=DECODIFICADORES_JSON, default='auto', help='Decodificador dos arquivos JSON: json (biblioteca padrão), orjson (requer o pacote orjson; os arquivos não compactados são mapeados em memória e decodificados em lotes de processos) ou auto, que utiliza o orjson quando instalado (argumento opcional, padrão auto)')
+    parser.add_argument('--metricas', metavar='ARQUIVO', help='Grava o relatório de métricas da execução (tempo por etapa, processos descartados por motivo, consultas não encontradas por tabela e estatísticas por arquivo) em JSON ou, com a extensão .prom, no formato textfile do Prometheus (argumento opcional)')
+    parser.add_argument('--monitora', action='store_true', help='Executa como serviço: mantém as tabelas auxiliares carregadas, verifica periodicamente as pastas dos tipos de justiça e converte cada arquivo JSON novo ou alterado, assim que estiver completo, em arquivos próprios em {pastaRaiz}/tmp/watch/{tipoJustica} (argumento opcional)')
+    parser.add_argument('--intervalo', type=float, default=INTERVALO_MONITORAMENTO, metavar='SEGUNDOS', help='Com --monitora, intervalo entre as verificações das pastas, em segundos (argumento opcional, padrão {})'.format(INTERVALO_MONITORAMENTO))
+    parser.add_argument('--status', metavar='ARQUIVO', help='Com --monitora, arquivo JSON com a fila, as conversões em andamento, as últimas concluídas, as falhas e a vazão (argumento opcional, padrão {pastaRaiz}/tmp/watch/status.json)')
+    parser.add_argument('--perfil', metavar='ARQUIVO', help='Executa a conversão dos processos sob o cProfile e grava as estatísticas de todos os workers no arquivo informado, para leitura com pstats ou snakeviz (argumento opcional)')
+
+    # Argumentos retornados por parse_args:
+    # args.pastaRaiz conterá a pasta raiz
+    # args.tipoJustica conterá a lista de tipos de justiça (ou 'todos')
+    # args.assuntos conterá a lista de assuntos ou None
+    # args.todos indicará se o CSV com todos os assuntos também deve ser gerado junto com os CSVs por assunto
+    # args.tribunais, args.graus, args.classes, args.orgaos, args.ajuizamento_inicio, args.ajuizamento_fim, args.movimentos_inicio e
+    # args.movimentos_fim conterão os critérios de seleção dos processos ou None (ver FiltroProcessos)
+    # args.deduplica conterá a política de deduplicação dos processos repetidos ou None
+    # args.memoria_deduplicacao conterá o limite de memória da deduplicação, em MB
+    # args.ordena indicará se as linhas dos arquivos gerados devem ser ordenadas (ver SaidaOrdenada)
+    # args.memoria_ordenacao e args.pasta_ordenacao conterão o limite de memória (MB) e a pasta temporária da ordenação
+    # args.formato conterá o formato dos arquivos gerados (csv, parquet, arrow, xes ou ocel)
+    # args.compacta conterá a compactação dos arquivos gerados (gz, bz2 ou zst) ou None
+    # args.estatisticas indicará se as tabelas de estatísticas agregadas devem ser gravadas (ver Estatisticas)
+    # args.normalizada indicará se a saída deve ser normalizada em tabelas de processos e de movimentos (ver SaidaNormalizada)
+    # args.plano indicará se, na saída normalizada, o arquivo com todas as colunas também deve ser gerado
+    # args.gera_indices indicará se devem ser gerados somente os índices dos arquivos JSON (ver gera_indice)
+    # args.incremental indicará se a conversão deve reaproveitar os segmentos já gerados (ver converte_incremental)
+    # args.reconstroi_tabelas indicará se o cache das tabelas auxiliares deve ser ignorado
+    # args.paralelismo conterá a quantidade de processos utilizados na conversão dos arquivos JSON
+    # args.decodificador_json conterá o decodificador dos arquivos JSON (ver define_decodificador_json)
+    # args.metricas conterá o arquivo do relatório de métricas (JSON ou .prom) ou None
+    # args.perfil conterá o arquivo das estatísticas do cProfile ou None
+    # args.monitora indicará se o script deve ser executado como serviço de monitoramento das pastas (ver Monitor)
+    # args.intervalo conterá o intervalo, em segundos, entre as verificações das pastas
+    # args.status conterá o arquivo de status do monitoramento ou None
+    return parser
+
+
+def main(argv=None):
+    parser = cria_parser()
+    args = parser.parse_args(argv)
+    if args.normalizada and args.formato in FORMATOS_EVENT_LOG:
+        parser.error('o formato {} não admite --normalizada'.format(args.formato))
+    if args.compacta is not None and args.formato not in FORMATOS_TEXTO:
+        parser.error('o formato {} não admite --compacta'.format(args.formato))
+    if args.monitora:
+        for argumento, valor in [('--deduplica', args.deduplica), ('--incremental', args.incremental), ('--gera-indices', args.gera_indices),
+                                 ('--metricas', args.metricas), ('--perfil', args.perfil)]:
+            if valor:
+                parser.error('--monitora não admite {}'.format(argumento))
+
+    try:
+        define_decodificador_json(args.decodificador_json)
+    except ImportError as erro:
+        parser.error(str(erro))
+
     # Obtém caminho completo da pasta raiz quando o argumento for '.'
     if args.pastaRaiz == '.':
         args.pastaRaiz = os.path.dirname(os.path.abspath(__file__))
 
-    # Gera tabelas processuais unificadas de forma hierarquizada
-    hierarquiza_assuntos()
-    hierarquiza_classes()
-    hierarquiza_movimentos('nacional')
-    hierarquiza_movimentos('local')
-
-    # Gera a base JSON em CSV
-    if args.assuntos:
-        for assunto in args.assuntos:
-            gera_csv(assunto)
+    # Gera (ou obtém do cache) as tabelas processuais unificadas hierarquizadas e as demais tabelas auxiliares
+    # e gera a base JSON em CSV. Com mais de um tipo de justiça, a conversão é feita em lote (ver converte_lote).
+    tipos_justica = TIPOS_JUSTICA if 'todos' in args.tipoJustica else list(dict.fromkeys(args.tipoJustica))
+    lote = len(tipos_justica) > 1
+    filtro = FiltroProcessos(args.tribunais, args.graus, args.classes, args.orgaos, args.ajuizamento_inicio, args.ajuizamento_fim,
+                             args.movimentos_inicio, args.movimentos_fim)
+    conversores = [Converter(args.pastaRaiz, tipo_justica, assuntos=args.assuntos, incluir_todos=args.todos, formato=args.formato,
+                             normalizado=args.normalizada, incluir_plano=args.plano,
+                             workers=args.paralelismo, incremental=args.incremental, reconstruir_tabelas=args.reconstroi_tabelas,
+                             filtro=filtro if filtro.filtra_processos or filtro.filtra_movimentos else None,
+                             deduplicacao=args.deduplica, limite_memoria_deduplicacao=args.memoria_deduplicacao,
+                             ordenar=args.ordena, limite_memoria_ordenacao=args.memoria_ordenacao, pasta_ordenacao=args.pasta_ordenacao,
+                             compressao=args.compacta, arquivo_metricas=None if lote else args.metricas,
+                             arquivo_perfil=None if lote else args.perfil, estatisticas=args.estatisticas)
+                   for tipo_justica in tipos_justica]
+    if args.gera_indices:
+        for conversor in conversores:
+            conversor.gera_indices()
+    elif args.monitora:
+        Monitor(conversores, args.paralelismo, args.intervalo, args.status).executa()
+    elif lote:
+        converte_lote(conversores, args.paralelismo, args.metricas, args.perfil)
     else:
-        gera_csv(None)
+        conversores[0].gera_csv()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+import bz2
+import datetime
+import glob
+import gzip
+import importlib.util
+import json
+import os
+import sys
+
+import pytest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'eye_jud_converter.py')
+
+
+def carrega_modulo(nome):
+    # Carrega o script com um nome de módulo qualquer, como ocorre com a linha de comando (__main__) e a importação
+    spec = importlib.util.spec_from_file_location(nome, SCRIPT)
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[nome] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def evento(modulo, **campos):
+    return modulo.Evento(**dict({campo: None for campo in modulo.Evento._fields}, **campos))
+
+
+class SaidaVazia:
+    def grava_eventos(self, eventos):
+        pass
+
+    def anexa_segmento(self, segmento):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_estatisticas_segmento_lidas_por_outro_modulo(tmp_path):
+    escrita = carrega_modulo('eye_jud_escrita')
+    segmento = str(tmp_path / 'segmento.csv')
+    eventos = escrita.EventosProcesso(evento(escrita, ProcessoSiglaTribunal='TJMSP', ProcessoClasseSecundaria='Ação Penal',
+                                             ProcessoAssuntoPrimario='DIREITO PENAL', MovimentoPrimario='Decisão',
+                                             MovimentoDataHora=data)
+                                      for data in ('2020-01-10 00:00:00', '2020-03-10 00:00:00'))
+    eventos.codigos = escrita.CodigosProcesso(283, 287, [3, 3])
+    with escrita.SaidaEstatisticas(SaidaVazia(), segmento, escrita.OpcoesSaida(estatisticas=True), segmento=True) as saida:
+        saida.grava_eventos(eventos)
+    # O módulo que gravou o segmento deixa de existir, como entre uma execução da linha de comando e a importação
+    del sys.modules['eye_jud_escrita']
+
+    leitura = carrega_modulo('eye_jud_leitura')
+    arquivo = str(tmp_path / 'final.csv')
+    with leitura.SaidaEstatisticas(SaidaVazia(), arquivo, leitura.OpcoesSaida(estatisticas=True)) as saida:
+        saida.anexa_segmento(segmento)
+    with open(str(tmp_path / 'final_estatisticas_tribunal.csv'), encoding='utf8') as f:
+        assert f.read().splitlines()[1] == 'TJMSP,1,2,60.0,60.0,60.0'
+    with open(str(tmp_path / 'final_estatisticas_mes.csv'), encoding='utf8') as f:
+        assert f.read().splitlines()[1:] == ['2020-01,1,1', '2020-03,1,1']
+    # As dimensões SGT são contadas pelos códigos, com a descrição gravada no event log ao lado
+    with open(str(tmp_path / 'final_estatisticas_classe.csv'), encoding='utf8') as f:
+        assert f.read().splitlines()[1] == '283,Ação Penal,1,2,60.0,60.0,60.0'
+    with open(str(tmp_path / 'final_estatisticas_movimento.csv'), encoding='utf8') as f:
+        assert f.read().splitlines() == ['Codigo,4-Movi Primário,OcorrenciasProcessos,Movimentos', '3,Decisão,1,2']
+    del sys.modules['eye_jud_leitura']
+
+
+def test_atividade_com_movimento_nao_encontrado_gravada_como_texto(tmp_path):
+    modulo = carrega_modulo('eye_jud_atividade')
+    # MovimentoSecundario mantém o código do movimento quando ele não é encontrado na tabela de movimentos
+    eventos = [evento(modulo, ProcessoNumero='00000001020208130001', ProcessoGrau='G1', ProcessoSiglaTribunal='TJMMG',
+                      MovimentoSecundario=codigo, MovimentoDataHora='2020-01-10T00:00:00') for codigo in (10303, 'Decisão')]
+    xes = str(tmp_path / 'log.xes')
+    with modulo.SaidaXES(xes) as saida:
+        saida.grava_eventos(eventos)
+    with open(xes, encoding='utf8') as f:
+        conteudo = f.read()
+    assert '<string key="concept:name" value="10303"/>' in conteudo
+    assert '<int key="concept:name"' not in conteudo
+
+    ocel = str(tmp_path / 'log.jsonocel')
+    with modulo.SaidaOCEL(ocel) as saida:
+        saida.grava_eventos(eventos)
+    with open(ocel, encoding='utf8') as f:
+        log = json.load(f)
+    assert [tipo['name'] for tipo in log['eventTypes']] == ['10303', 'Decisão']
+    assert [evento_ocel['type'] for evento_ocel in log['events']] == ['10303', 'Decisão']
+    del sys.modules['eye_jud_atividade']
+
+
+def test_traces_distintos_por_grau(tmp_path):
+    modulo = carrega_modulo('eye_jud_traces')
+    eventos = [evento(modulo, ProcessoNumero='00000001020208130001', ProcessoGrau=grau, ProcessoSiglaTribunal='TJMMG',
+                      MovimentoSecundario='Decisão', MovimentoDataHora='2020-01-10T00:00:00') for grau in ('G1', 'G2')]
+    xes = str(tmp_path / 'log.xes')
+    with modulo.SaidaXES(xes) as saida:
+        saida.grava_eventos(eventos)
+    with open(xes, encoding='utf8') as f:
+        conteudo = f.read()
+    assert conteudo.count('<trace>') == 2
+    assert '<string key="concept:name" value="00000001020208130001|G1|TJMMG"/>' in conteudo
+    assert '<string key="concept:name" value="00000001020208130001|G2|TJMMG"/>' in conteudo
+    assert conteudo.count('<string key="ProcessoNumero" value="00000001020208130001"/>') == 2
+    del sys.modules['eye_jud_traces']
+
+
+def test_arrow_mantem_datas_fora_do_padrao_como_texto(tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.ipc
+    modulo = carrega_modulo('eye_jud_arrow')
+    eventos = [evento(modulo, ProcessoNumero='1', MovimentoDataHora='2020-01-10T08:30:00', ProcessoDataAjuizamento=data)
+               for data in ('2019-05-10T00:00:00', '2019-05-10T00:00:0', None)]
+    arquivo = str(tmp_path / 'log.arrows')
+    with modulo.SaidaArrow(arquivo) as saida:
+        saida.grava_eventos(eventos)
+    with pa.ipc.open_stream(arquivo) as reader:
+        tabela = reader.read_all()
+    assert [str(valor) if valor else valor for valor in tabela.column('4-Data Ajuizamento').to_pylist()] == \
+        ['2019-05-10 00:00:00', None, None]
+    assert tabela.column('4-Data Ajuizamento (texto)').to_pylist() == [None, '2019-05-10T00:00:0', None]
+    assert tabela.column('MovimentoDataHora (texto)').null_count == 3
+    del sys.modules['eye_jud_arrow']
+
+
+def test_estatisticas_somam_codigos_com_descricoes_diferentes(tmp_path):
+    modulo = carrega_modulo('eye_jud_codigos')
+    estatisticas = modulo.Estatisticas()
+    # O mesmo código com a mesma descrição em duas ocorrências e dois códigos distintos com a mesma descrição
+    for codigo, numero in ((3, '1'), (3, '2'), (11009, '3')):
+        eventos = modulo.EventosProcesso([evento(modulo, ProcessoNumero=numero, ProcessoSiglaTribunal='TJMSP',
+                                                 MovimentoPrimario='Decisão', MovimentoDataHora='2020-01-10T00:00:00')])
+        eventos.codigos = modulo.CodigosProcesso(None, None, [codigo])
+        parcial = modulo.Estatisticas()
+        parcial.acumula(eventos)
+        estatisticas.soma(modulo.Estatisticas.de_dados(parcial.dados()))
+    assert estatisticas.linhas('movimento') == [[3, 'Decisão', 2, 2], [11009, 'Decisão', 1, 1]]
+    assert estatisticas.linhas('tribunal') == [['TJMSP', 3, 3, 0.0, 0.0, 0.0]]
+    del sys.modules['eye_jud_codigos']
+
+
+def grava_json(caminho, processos):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, 'w', encoding='utf8') as f:
+        json.dump(processos, f)
+    return caminho
+
+
+def processo_json(numero, movimentos, grau='G1', codigo_movimento=3):
+    return {'dadosBasicos': {'numero': numero, 'classeProcessual': 283, 'assunto': [{'codigoNacional': 3372}],
+                             'dataAjuizamento': '20200101000000'},
+            'grau': grau, 'siglaTribunal': 'TJMSP',
+            'movimento': [{'identificadorMovimento': identificador, 'dataHora': data, 'movimentoNacional': {'codigoNacional': codigo_movimento}}
+                          for identificador, data in movimentos]}
+
+
+def grava_tabela(caminho, linhas):
+    with open(caminho, 'w', encoding='utf8') as f:
+        f.write(''.join(';'.join(linha) + '\n' for linha in linhas))
+
+
+def cria_pasta_raiz(tmp_path):
+    # Pasta raiz mínima: tabelas do SGT, serventias e municípios e três arquivos JSON de justica_militar, com um processo
+    # repetido em dois arquivos, um processo no primeiro e no segundo grau e movimentos fora da ordem cronológica
+    raiz = tmp_path / 'raiz'
+    raiz.mkdir()
+    grava_tabela(str(raiz / 'sgt_assuntos.csv'), [['codigo', 'descricao', 'cod_pai', 'cod_filhos'], ['287', 'DIREITO PENAL', '', '3372'],
+                                                  ['3372', 'Crimes', '287', '']])
+    grava_tabela(str(raiz / 'sgt_classes.csv'), [['codigo', 'descricao', 'sigla', 'cod_pai', 'cod_filhos'],
+                                                 ['2', 'PROCESSO CRIMINAL', 'ProcCrim', '', '283'], ['283', 'Ação Penal', 'AP', '2', '']])
+    grava_tabela(str(raiz / 'sgt_movimentos.csv'), [['codigo', 'descricao', 'cod_pai', 'cod_filhos'], ['1', 'Magistrado', '', '3,193'],
+                                                    ['3', 'Decisão', '1', ''], ['193', 'Julgamento', '1', '']])
+    grava_tabela(str(raiz / 'mpm_serventias.csv'), [['SEQ_ORGAO', 'NOME', 'DSC_TIP_ORGAO'], ['1', 'x', 'Vara']])
+    grava_tabela(str(raiz / 'ibge.csv'), [['codigo', 'municipio', 'sig_uf'], ['3550308', 'São Paulo', 'SP']])
+    pasta = raiz / 'justica_militar'
+    grava_json(str(pasta / 'tjmsp' / 'processos-tjmsp_1.json'),
+               [processo_json('00000011020208260001', [('a2', '20200305100000'), ('a1', '20200110080000')]),
+                processo_json('00000021020208260001', [('b1', '20200201000000')], codigo_movimento=193)])
+    grava_json(str(pasta / 'tjmsp' / 'processos-tjmsp_2.json'),
+               [processo_json('00000021020208260001', [('c1', '20200202000000'), ('c2', '20200203000000')], grau='G2'),
+                processo_json('00000011020208260001', [('a1', '20200110080000'), ('a3', '20200401000000')])])
+    grava_json(str(pasta / 'tjmsp' / 'processos-tjmsp_3.json'),
+               [processo_json('00000031020208260001', [('d{}'.format(i), '202001{:02d}000000'.format(i + 1)) for i in range(20, 0, -1)])])
+    return str(raiz)
+
+
+def le_csv(arquivo):
+    with open(arquivo, encoding='utf8') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('politica, arquivo_mantido, mesclados', [('primeiro', 'a', False), ('ultimo', 'b', False),
+                                                                   ('mais_completo', 'b', False), ('mesclar', 'a', True)])
+def test_deduplicacao_politicas(tmp_path, politica, arquivo_mantido, mesclados):
+    modulo = carrega_modulo('eye_jud_deduplicacao')
+    # A listagem traz b antes de a: a ordem das ocorrências é a dos caminhos, e não a da listagem. A ocorrência de a tem mais
+    # movimentos, mas um deles não tem data/hora válida, de modo que a conversão a descartaria.
+    arquivos = {'b': grava_json(str(tmp_path / 'b' / 'processos_1.json'),
+                                [processo_json('1', [('m1', '20200110000000'), ('m2', '20200111000000')]),
+                                 processo_json('2', [('m5', '20200112000000')])]),
+                'a': grava_json(str(tmp_path / 'a' / 'processos_2.json'),
+                                [processo_json('1', [('m1', '20200110000000'), ('m3', '20200113000000'), ('m4', '20201399000000')])])}
+    deduplicacao = modulo.Deduplicacao(politica, str(tmp_path))
+    deduplicacao.registra([arquivos['b'], arquivos['a']])
+    mantidos = {}
+    for nome, arquivo in arquivos.items():
+        inicios, mesclas = deduplicacao.processos_arquivo(arquivo)
+        for j, inicio, fim in modulo.le_processos(arquivo, posicoes=True):
+            if inicio in inicios:
+                mantidos[j['dadosBasicos']['numero']] = nome, [arquivo for arquivo, _, _ in mesclas.get(inicio, [])]
+    deduplicacao.fecha()
+    assert mantidos == {'1': (arquivo_mantido, [arquivos['b']] if mesclados else []), '2': ('b', [])}
+    del sys.modules['eye_jud_deduplicacao']
+
+
+def test_incremental_remove_segmentos_quando_configuracao_muda(tmp_path):
+    modulo = carrega_modulo('eye_jud_incremental')
+    raiz = cria_pasta_raiz(tmp_path)
+    pasta_segmentos = os.path.join(raiz, 'tmp', 'segmentos', 'justica_militar')
+    modulo.Converter(raiz, 'justica_militar', incremental=True, estatisticas=True).gera_csv()
+    assert len([nome for nome in os.listdir(pasta_segmentos) if nome.endswith('.estatisticas')]) == 3
+    # Com a opção alterada, todos os arquivos são convertidos novamente e os segmentos anteriores não podem ser reaproveitados
+    modulo.Converter(raiz, 'justica_militar', incremental=True, ordenar=True).gera_csv()
+    assert sorted(os.path.splitext(nome)[1] for nome in os.listdir(pasta_segmentos)) == ['.json'] + ['.pickle'] * 3
+    modulo.Converter(raiz, 'justica_militar', incremental=True).gera_csv()
+    assert sorted(os.path.splitext(nome)[1] for nome in os.listdir(pasta_segmentos)) == ['.csv'] * 3 + ['.json']
+    del sys.modules['eye_jud_incremental']
+
+
+def test_iter_rows_gera_eventos_tipados(tmp_path):
+    modulo = carrega_modulo('eye_jud_biblioteca')
+    raiz = cria_pasta_raiz(tmp_path)
+    # Movimento com código (informado como texto) inexistente na tabela e data de ajuizamento incompleta
+    processo = processo_json('00000041020208260001', [('e1', '20200301000000')], codigo_movimento='999')
+    processo['dadosBasicos']['dataAjuizamento'] = '2020010100000'
+    grava_json(os.path.join(raiz, 'justica_militar', 'tjmsp', 'processos-tjmsp_4.json'), [processo])
+    conversor = modulo.Converter(raiz, 'justica_militar')
+    eventos = list(conversor.iter_rows())
+    arquivo = conversor.gera_csv()[None]
+    assert len(eventos) == le_csv(arquivo).count('\n') - 1 == 28
+    assert all(isinstance(evento, modulo.Evento) for evento in eventos)
+    assert all(isinstance(evento.MovimentoDataHora, datetime.datetime) for evento in eventos)
+    por_id = {evento.MovimentoId: evento for evento in eventos}
+    primeiro = por_id['a2']
+    assert primeiro.MovimentoDataHora == datetime.datetime(2020, 3, 5, 10, 0, 0)
+    assert primeiro.ProcessoDataAjuizamento == datetime.datetime(2020, 1, 1)
+    assert (primeiro.ProcessoClasseSecundaria, primeiro.MovimentoPrimario, primeiro.MovimentoSecundario) == ('Ação Penal', 'Decisão', 'Decisão')
+    nao_encontrado = por_id['e1']
+    assert (nao_encontrado.MovimentoSecundario, nao_encontrado.MovimentoPrimario, nao_encontrado.ProcessoDataAjuizamento) == (999, None, None)
+    # O CSV continua gravando o texto montado na conversão
+    assert '2020-01-01T00:00:0,' in le_csv(arquivo)
+    del sys.modules['eye_jud_biblioteca']
+
+
+class SaidaLista:
+    def __init__(self):
+        self.linhas = []
+
+    def grava_eventos(self, eventos):
+        self.linhas.extend(eventos)
+
+    def close(self):
+        pass
+
+
+def test_ordenacao_externa_igual_a_ordenacao_em_memoria(tmp_path):
+    modulo = carrega_modulo('eye_jud_ordenacao')
+    colunas = list(modulo.CAMPOS_ORDENACAO) + ['Sequencia']
+    # Muitas linhas com a mesma chave, para verificar que a intercalação das sequências mantém a ordem de geração
+    linhas = [('{:05d}'.format((i * 7919) % 50), '2020-01-{:02d}T00:00:00'.format(1 + i % 3), str(i % 2), i)
+              for i in range(3 * modulo.TAMANHO_LOTE_ORDENACAO + 500)]
+    em_memoria = SaidaLista()
+    with modulo.SaidaOrdenada(em_memoria, colunas, memoria=1024, pasta=str(tmp_path)) as saida:
+        saida.grava_eventos(linhas)
+        assert saida.sequencias == []
+    externa = SaidaLista()
+    with modulo.SaidaOrdenada(externa, colunas, memoria=1, pasta=str(tmp_path)) as saida:
+        for inicio in range(0, len(linhas), 1000):
+            saida.grava_eventos(linhas[inicio:inicio + 1000])
+        assert len(saida.sequencias) == 3
+    assert externa.linhas == em_memoria.linhas == sorted(linhas, key=lambda linha: linha[:3])
+    # Os arquivos temporários das sequências são removidos no fechamento
+    assert os.listdir(str(tmp_path)) == []
+    del sys.modules['eye_jud_ordenacao']
+
+
+@pytest.mark.parametrize('opcoes', [{}, {'ordenar': True}, {'deduplicacao': 'mesclar'}])
+def test_conversao_paralela_igual_a_serial(tmp_path, opcoes):
+    modulo = carrega_modulo('eye_jud_paralela')
+    raiz = cria_pasta_raiz(tmp_path)
+    serial = le_csv(modulo.Converter(raiz, 'justica_militar', **opcoes).gera_csv()[None])
+    paralela = le_csv(modulo.Converter(raiz, 'justica_militar', workers=2, **opcoes).gera_csv()[None])
+    assert paralela == serial
+    assert serial.count('\n') - 1 == (27 if 'deduplicacao' not in opcoes else 26)
+    del sys.modules['eye_jud_paralela']
+
+
+def test_saida_normalizada(tmp_path):
+    modulo = carrega_modulo('eye_jud_normalizada')
+    raiz = cria_pasta_raiz(tmp_path)
+    plano = le_csv(modulo.Converter(raiz, 'justica_militar').gera_csv()[None])
+    arquivo = modulo.Converter(raiz, 'justica_militar', normalizado=True, incluir_plano=True).gera_csv()[None]
+    processos, movimentos = [le_csv(nome).splitlines() for nome in modulo.arquivos_normalizados(arquivo)]
+    assert le_csv(arquivo) == plano
+    # Uma linha por processo (número, grau e tribunal), mesmo com o processo repetido em dois arquivos JSON
+    assert processos[0].split(',') == modulo.COLUNAS_PROCESSO
+    chaves = [tuple(linha.split(',')[:3]) for linha in processos[1:]]
+    assert sorted(chaves) == [('0000001-10.2020.826.0001', 'G1', 'TJMSP'), ('0000002-10.2020.826.0001', 'G1', 'TJMSP'),
+                              ('0000002-10.2020.826.0001', 'G2', 'TJMSP'), ('0000003-10.2020.826.0001', 'G1', 'TJMSP')]
+    # Uma linha por movimento do arquivo plano, com a chave de um processo da tabela de processos
+    assert movimentos[0].split(',') == modulo.COLUNAS_MOVIMENTO
+    assert len(movimentos) == plano.count('\n') == 28
+    assert {tuple(linha.split(',')[:3]) for linha in movimentos[1:]} == set(chaves)
+    paralela = modulo.Converter(raiz, 'justica_militar', normalizado=True, workers=2).gera_csv()[None]
+    assert [le_csv(nome).splitlines() for nome in modulo.arquivos_normalizados(paralela)] == [processos, movimentos]
+    del sys.modules['eye_jud_normalizada']
+
+
+def abre_compactado(arquivo, modo, compressao):
+    if compressao == 'gz':
+        return gzip.open(arquivo, modo, encoding='utf8')
+    if compressao == 'bz2':
+        return bz2.open(arquivo, modo, encoding='utf8')
+    return pytest.importorskip('zstandard').open(arquivo, modo, encoding='utf8')
+
+
+@pytest.mark.parametrize('compressao', ['gz', 'bz2', 'zst'])
+def test_compactacao_entrada_e_saida(tmp_path, compressao):
+    if compressao == 'zst':
+        pytest.importorskip('zstandard')
+    modulo = carrega_modulo('eye_jud_compactacao')
+    raiz = cria_pasta_raiz(tmp_path)
+    # A ordenação torna o resultado independente da ordem em que os arquivos JSON são listados
+    esperado = le_csv(modulo.Converter(raiz, 'justica_militar', ordenar=True).gera_csv()[None])
+    for arquivo in glob.glob(os.path.join(raiz, 'justica_militar', '**', '*.json'), recursive=True):
+        with open(arquivo, encoding='utf8') as f, abre_compactado(arquivo + '.' + compressao, 'wt', compressao) as compactado:
+            compactado.write(f.read())
+        os.remove(arquivo)
+    arquivo = modulo.Converter(raiz, 'justica_militar', ordenar=True, compressao=compressao).gera_csv()[None]
+    assert arquivo.endswith('.csv.' + compressao)
+    with abre_compactado(arquivo, 'rt', compressao) as f:
+        assert f.read() == esperado
+    del sys.modules['eye_jud_compactacao']